@@ -0,0 +1,196 @@
+"""
+Sistema de Análise Financeira B3 - Relatório em Lote (sem interface gráfica)
+Gera os gráficos e a tabela de resumo de vários tickers em arquivos, sem abrir janelas
+
+Exemplo:
+    python GerarRelatorio.py PETR4.SA VALE3.SA --saida relatorio --formatos png,svg,html
+"""
+
+import os
+
+# Backend sem janela: precisa ser definido antes de importar o matplotlib
+os.environ['MPLBACKEND'] = 'Agg'
+
+import argparse
+import html
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Gráficos gerados por ticker: (nome do arquivo, método que monta a figura)
+GRAFICOS = [
+    ('volatilidade_semana', 'figura_volatilidade_semana'),
+    ('volatilidade_mes', 'figura_volatilidade_mes'),
+    ('retorno_semanal', 'figura_retorno_semanal'),
+    ('retorno_mensal', 'figura_retorno_mensal'),
+]
+
+FORMATOS_VALIDOS = ('png', 'svg', 'html')
+
+
+def _pagina_html(titulo, tabela_html, imagens):
+    """Monta uma página HTML simples com a tabela de resumo e os gráficos"""
+    figuras = "\n".join(
+        f'<figure><img src="{html.escape(arquivo)}" alt="{html.escape(nome)}"></figure>'
+        for nome, arquivo in imagens
+    )
+    return f"""<!DOCTYPE html>
+<html lang="pt-BR">
+<head><meta charset="utf-8"><title>{html.escape(titulo)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; }}
+td, th {{ border: 1px solid #ccc; padding: 4px 10px; }}
+img {{ max-width: 100%; }}
+</style></head>
+<body>
+<h1>{html.escape(titulo)}</h1>
+{tabela_html}
+{figuras}
+</body>
+</html>
+"""
+
+
+def gerar_relatorio_acao(codigo, nome, saida, formatos, descritor=None):
+    """Gera os arquivos de um ticker (executado em um processo separado)
+
+    Com `descritor`, lê as cotações da matriz em memória compartilhada (sem cópia
+    do universo); sem ele, carrega o ticker do cache.
+    """
+    from financial_analysis import AnalisadorB3
+    import matplotlib.pyplot as plt
+
+    # A página HTML precisa de imagens: sem png/svg pedidos, gera png
+    if 'html' in formatos and 'png' not in formatos and 'svg' not in formatos:
+        formatos = tuple(formatos) + ('png',)
+
+    analisador = AnalisadorB3()
+    if descritor is not None:
+        from memoria_compartilhada import anexar
+        analisador.usar_dados(codigo, nome or codigo, anexar(descritor).acao(codigo))
+    elif not analisador.baixar_dados_acao(codigo, nome or codigo):
+        raise RuntimeError(f"Sem dados para {codigo}")
+
+    pasta = os.path.join(saida, codigo)
+    os.makedirs(pasta, exist_ok=True)
+    arquivos = []
+
+    tabela = analisador.tabela_resumo()
+    tabela.to_csv(os.path.join(pasta, 'resumo.csv'), index=False)
+    arquivos.append('resumo.csv')
+
+    imagens = []
+    for nome_arquivo, metodo in GRAFICOS:
+        fig = getattr(analisador, metodo)()
+        for formato in formatos:
+            if formato == 'html':
+                continue
+            arquivo = f"{nome_arquivo}.{formato}"
+            fig.savefig(os.path.join(pasta, arquivo), format=formato, dpi=100)
+            arquivos.append(arquivo)
+        plt.close(fig)
+
+        # Na página HTML usa SVG se disponível, senão PNG
+        formato_html = 'svg' if 'svg' in formatos else 'png'
+        imagens.append((nome_arquivo, f"{nome_arquivo}.{formato_html}"))
+
+    if 'html' in formatos:
+        titulo = f"{analisador.nome_empresa} ({codigo})"
+        pagina = _pagina_html(titulo, tabela.to_html(index=False), imagens)
+        with open(os.path.join(pasta, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(pagina)
+        arquivos.append('index.html')
+
+    return arquivos
+
+
+def gerar_relatorios(empresas, saida='relatorio', formatos=('png', 'html'), max_workers=None,
+                     memoria_compartilhada=True):
+    """Gera os relatórios de uma lista [(codigo, nome)] em processos paralelos
+
+    Com `memoria_compartilhada`, as cotações são carregadas uma vez neste processo
+    e os processos de trabalho as leem de um bloco compartilhado.
+    """
+    os.makedirs(saida, exist_ok=True)
+    resultados, falhas = {}, {}
+    compartilhado = None
+
+    if memoria_compartilhada:
+        from financial_analysis import AnalisadorB3
+        from memoria_compartilhada import PrecosCompartilhados
+
+        carregador = AnalisadorB3()
+        dados_por_ticker = carregador.carregar_varios([codigo for codigo, _ in empresas])
+        carregador.encerrar_segundo_plano()
+        for codigo, _ in empresas:
+            if codigo not in dados_por_ticker:
+                falhas[codigo] = "sem dados"
+                print(f"❌ {codigo}: sem dados")
+        empresas = [(codigo, nome) for codigo, nome in empresas if codigo in dados_por_ticker]
+        compartilhado = PrecosCompartilhados.de_dataframes(dados_por_ticker)
+        del dados_por_ticker
+
+    descritor = compartilhado.descritor if compartilhado is not None else None
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = {
+                executor.submit(gerar_relatorio_acao, codigo, nome, saida, tuple(formatos), descritor): codigo
+                for codigo, nome in empresas
+            }
+            for futuro in as_completed(futuros):
+                codigo = futuros[futuro]
+                try:
+                    resultados[codigo] = futuro.result()
+                    print(f"✅ {codigo}: {len(resultados[codigo])} arquivos")
+                except Exception as e:
+                    falhas[codigo] = str(e)
+                    print(f"❌ {codigo}: {e}")
+    finally:
+        if compartilhado is not None:
+            compartilhado.fechar()
+
+    # Índice geral com links para as páginas de cada ticker
+    if 'html' in formatos:
+        links = "\n".join(
+            f'<li><a href="{html.escape(codigo)}/index.html">{html.escape(nome or codigo)} ({html.escape(codigo)})</a></li>'
+            for codigo, nome in empresas if codigo in resultados
+        )
+        with open(os.path.join(saida, 'index.html'), 'w', encoding='utf-8') as f:
+            f.write(_pagina_html("Relatório B3", f"<ul>\n{links}\n</ul>", []))
+
+    return resultados, falhas
+
+
+def main():
+    """Linha de comando do relatório em lote"""
+    parser = argparse.ArgumentParser(description="Gera gráficos e resumos em arquivos, sem interface gráfica")
+    parser.add_argument('tickers', nargs='*',
+                        help="Tickers a processar (padrão: as 20 empresas pré-selecionadas)")
+    parser.add_argument('--saida', default='relatorio', help="Pasta de saída")
+    parser.add_argument('--formatos', default='png,html',
+                        help="Formatos separados por vírgula: png, svg, html")
+    parser.add_argument('--workers', type=int, default=None, help="Número de processos")
+    parser.add_argument('--sem-memoria-compartilhada', action='store_true',
+                        help="Cada processo carrega seu ticker do cache")
+    args = parser.parse_args()
+
+    formatos = [f.strip().lower() for f in args.formatos.split(',') if f.strip()]
+    invalidos = [f for f in formatos if f not in FORMATOS_VALIDOS]
+    if invalidos:
+        parser.error(f"Formatos inválidos: {', '.join(invalidos)}")
+
+    from financial_analysis import AnalisadorB3
+    analisador = AnalisadorB3()
+    codigos = args.tickers or analisador.codigos_padrao()
+
+    inicio = time.perf_counter()
+    resultados, falhas = gerar_relatorios([(c, analisador.universo.nome(c)) for c in codigos],
+                                          args.saida, formatos, args.workers,
+                                          memoria_compartilhada=not args.sem_memoria_compartilhada)
+    print(f"\n📁 {len(resultados)} relatórios gerados em '{args.saida}' "
+          f"({time.perf_counter() - inicio:.1f}s, {len(falhas)} falhas)")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,29 +1,81 @@
 """
 Sistema de Análise Financeira B3 - Executável Principal
 Execute este arquivo para iniciar o sistema interativo
+
+Use `python StartApp.py --tempos` para ver o tempo de cada fase da inicialização,
+`--instrumentar` para medir downloads, cálculos e gráficos durante o uso e
+`--perfil arquivo.prof` para gravar também um perfil cProfile.
 """
 
-from financial_analysis import AnalisadorB3
+import time
+
+_INICIO = time.perf_counter()
+
+import importlib.util
 import os
+import sys
+
+# Bibliotecas necessárias (verificadas sem importar: a importação fica para o primeiro uso)
+DEPENDENCIAS = ['pandas', 'numpy', 'matplotlib', 'yfinance']
+
+
+class TemposInicializacao:
+    """Registra a duração de cada fase da inicialização"""
+
+    def __init__(self, inicio):
+        self.inicio = self.ultimo = inicio
+        self.fases = []
+
+    def marcar(self, fase):
+        agora = time.perf_counter()
+        self.fases.append((fase, agora - self.ultimo))
+        self.ultimo = agora
+
+    def imprimir(self):
+        print("\n⏱️  Tempos de inicialização:")
+        for fase, duracao in self.fases:
+            print(f"   {fase:32s} {duracao * 1000:8.1f} ms")
+        print(f"   {'total':32s} {(self.ultimo - self.inicio) * 1000:8.1f} ms")
+
 
 def main():
-    """Função principal"""    
+    """Função principal"""
+    tempos = TemposInicializacao(_INICIO)
+    mostrar_tempos = '--tempos' in sys.argv or bool(os.environ.get('B3_TEMPOS'))
+    
+    # A instrumentação é decidida na importação dos módulos: definir antes de importá-los
+    if '--instrumentar' in sys.argv:
+        os.environ['B3_INSTRUMENTACAO'] = '1'
+    if '--perfil' in sys.argv:
+        posicao = sys.argv.index('--perfil') + 1
+        os.environ['B3_PERFIL'] = sys.argv[posicao] if posicao < len(sys.argv) else 'b3.prof'
+
     try:
-        # Testar importações
         os.system('cls' if os.name == 'nt' else 'clear')
+        tempos.marcar("limpar tela")
+
+        # Verificar dependências
         print("Verificando configurações...")
-        import matplotlib.pyplot as plt
-        import yfinance as yf
-        import pandas as pd
-        import numpy as np
-        
-        print("Todas as bibliotecas carregadas com sucesso!")
-        
+        faltando = [nome for nome in DEPENDENCIAS if importlib.util.find_spec(nome) is None]
+        if faltando:
+            raise ImportError(f"Bibliotecas não encontradas: {', '.join(faltando)}")
+        tempos.marcar("verificar dependências")
+
+        from financial_analysis import AnalisadorB3
+        tempos.marcar("importar financial_analysis")
+
+        print("Todas as bibliotecas encontradas!")
+
         # Iniciar sistema
         print("🚀 Iniciando Sistema de Análise Financeira B3...")
         analisador = AnalisadorB3()
+        tempos.marcar("criar AnalisadorB3")
+
+        if mostrar_tempos:
+            tempos.imprimir()
+            input("\nPressione Enter para continuar...")
         analisador.executar()
-        
+
     except ImportError as e:
         print(f"Erro de importação: {e}")
         print("Instale as dependências com: pip install -r requirements.txt")
@@ -0,0 +1,198 @@
+"""
+Agendador de consultas ao provedor de dados: limite de taxa, deduplicação e novas tentativas
+Envolve qualquer ProvedorDados (ver provedores.py):
+
+- pedidos simultâneos do mesmo ticker/trecho/intervalo viram uma única consulta em andamento
+- um balde de fichas limita as consultas por segundo (com rajadas até a capacidade)
+- erros temporários (limite de requisições/HTTP 429, rede) são repetidos com espera
+  exponencial, dentro de um orçamento total de tempo por consulta
+- ao receber 429, o balde é pausado para todas as threads (respeitando o Retry-After)
+"""
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from http.client import HTTPException
+from urllib.error import HTTPError, URLError
+
+from instrumentacao import contar
+from provedores import ProvedorDados
+
+# Padrões (podem ser alterados por B3_TAXA_REQUISICOES, B3_RAJADA e B3_ORCAMENTO_TENTATIVAS)
+TAXA_PADRAO = 2.0         # consultas por segundo
+RAJADA_PADRAO = 5         # consultas seguidas permitidas com o balde cheio
+ORCAMENTO_PADRAO = 30.0   # segundos para uma consulta, somando esperas e tentativas
+
+
+class ErroLimiteRequisicoes(ConnectionError):
+    """O provedor recusou a consulta por excesso de requisições (HTTP 429)"""
+
+    def __init__(self, mensagem="Limite de requisições atingido (HTTP 429)", espera=None):
+        super().__init__(mensagem)
+        self.espera = espera  # Retry-After, em segundos, quando informado
+
+
+class OrcamentoEsgotado(ConnectionError):
+    """As novas tentativas não couberam no orçamento de tempo da consulta"""
+
+
+def _limite_requisicoes(erro):
+    """429 do provedor: ErroLimiteRequisicoes ou o YFRateLimitError do yfinance"""
+    return isinstance(erro, ErroLimiteRequisicoes) or 'RateLimit' in type(erro).__name__
+
+
+# Classes de falha de transporte de requests e curl_cffi (ConnectTimeout, SSLError... derivam delas)
+_FALHAS_DE_REDE = {'ConnectionError', 'Timeout', 'ChunkedEncodingError', 'ProxyError'}
+
+
+def _status_temporario(status):
+    """HTTP 429 e 5xx (sem status: a conexão falhou antes da resposta)"""
+    return status is None or status == 429 or status >= 500
+
+
+def erro_temporario(erro):
+    """Erros temporários (limite de requisições, rede, orçamento esgotado): valem nova tentativa
+    mais tarde e permitem usar os dados antigos do cache enquanto isso
+
+    Só falhas de rede contam: conexão, tempo esgotado, HTTP 429/5xx (biblioteca padrão,
+    requests e curl_cffi). Outros OSError (arquivo ausente, permissão) falham na hora.
+    """
+    if _limite_requisicoes(erro):
+        return True
+    if isinstance(erro, HTTPError):
+        return _status_temporario(erro.code)
+    if isinstance(erro, (ConnectionError, TimeoutError, HTTPException, URLError)):
+        return True
+    # requests e curl_cffi: exceções próprias derivadas de OSError (e não das da biblioteca padrão)
+    if isinstance(erro, OSError) and type(erro).__module__.split('.')[0] in ('requests', 'curl_cffi'):
+        status = getattr(getattr(erro, 'response', None), 'status_code', None)
+        if status is not None:
+            return _status_temporario(status)
+        classes = {classe.__name__ for classe in type(erro).__mro__}
+        return bool(classes & _FALHAS_DE_REDE) or type(erro).__name__ == 'CurlError'
+    return False
+
+
+class BaldeDeFichas:
+    """Limite de taxa: `taxa` fichas por segundo, acumulando no máximo `capacidade`"""
+
+    def __init__(self, taxa, capacidade=None):
+        self.taxa = float(taxa)
+        self.capacidade = float(capacidade or max(1.0, self.taxa))
+        self._fichas = self.capacidade
+        self._atualizado = time.monotonic()
+        self._pausado_ate = 0.0
+        self._trava = threading.Lock()
+
+    def _repor(self, agora):
+        self._fichas = min(self.capacidade, self._fichas + (agora - self._atualizado) * self.taxa)
+        self._atualizado = agora
+
+    def retirar(self, prazo=None):
+        """Espera uma ficha; devolve False se ela não sair antes do `prazo` (time.monotonic)"""
+        while True:
+            with self._trava:
+                agora = time.monotonic()
+                self._repor(agora)
+                if agora >= self._pausado_ate and self._fichas >= 1:
+                    self._fichas -= 1
+                    return True
+                espera = max(self._pausado_ate - agora, (1 - self._fichas) / self.taxa)
+            if prazo is not None and agora + espera > prazo:
+                return False
+            time.sleep(espera)
+
+    def pausar(self, segundos):
+        """Suspende as consultas de todas as threads (ex.: depois de um 429)"""
+        with self._trava:
+            self._pausado_ate = max(self._pausado_ate, time.monotonic() + segundos)
+            self._fichas = 0.0
+
+
+class ProvedorAgendado(ProvedorDados):
+    """Provedor que passa pelo agendador antes de consultar o provedor envolvido
+
+    `estatisticas` conta consultas pedidas, deduplicadas, enviadas ao provedor,
+    repetidas, recusadas por limite (429) e falhas definitivas.
+    """
+
+    def __init__(self, provedor, taxa=None, capacidade=None, orcamento=None,
+                 espera_inicial=0.5, espera_maxima=8.0):
+        self.provedor = provedor
+        self.nome = provedor.nome
+        taxa = taxa or float(os.environ.get('B3_TAXA_REQUISICOES', TAXA_PADRAO))
+        capacidade = capacidade or float(os.environ.get('B3_RAJADA', RAJADA_PADRAO))
+        self.balde = BaldeDeFichas(taxa, capacidade)
+        self.orcamento = orcamento or float(os.environ.get('B3_ORCAMENTO_TENTATIVAS', ORCAMENTO_PADRAO))
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+
+        self._em_andamento = {}  # (codigo, inicio, fim, intervalo) -> Future
+        self._trava = threading.Lock()
+        self.estatisticas = dict.fromkeys(
+            ('pedidas', 'deduplicadas', 'enviadas', 'repetidas', 'limitadas', 'falhas'), 0)
+
+    def _contar(self, nome):
+        with self._trava:
+            self.estatisticas[nome] += 1
+        contar(f'agendador.{nome}')
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        self._contar('pedidas')
+        chave = (codigo, inicio, fim, intervalo)
+        with self._trava:
+            futuro = self._em_andamento.get(chave)
+            dono = futuro is None
+            if dono:
+                futuro = self._em_andamento[chave] = Future()
+
+        if not dono:
+            # Mesma consulta já em andamento em outra thread: espera o resultado dela
+            self._contar('deduplicadas')
+            return futuro.result().copy()
+
+        try:
+            dados = self._com_tentativas(codigo, inicio, fim, intervalo)
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        else:
+            futuro.set_result(dados)
+            return dados
+        finally:
+            with self._trava:
+                del self._em_andamento[chave]
+
+    def _com_tentativas(self, codigo, inicio, fim, intervalo):
+        """Consulta o provedor respeitando o balde, repetindo erros temporários até o prazo"""
+        prazo = time.monotonic() + self.orcamento
+        tentativa = 0
+        while True:
+            if not self.balde.retirar(prazo):
+                self._contar('falhas')
+                raise OrcamentoEsgotado(
+                    f"{codigo}: sem vaga no limite de requisições em {self.orcamento:g}s")
+            tentativa += 1
+            self._contar('enviadas')
+            try:
+                return self.provedor.historico(codigo, inicio, fim, intervalo)
+            except Exception as e:
+                if not erro_temporario(e):
+                    self._contar('falhas')
+                    raise
+
+                espera = min(self.espera_maxima, self.espera_inicial * 2 ** (tentativa - 1))
+                espera += random.uniform(0, espera)
+                if _limite_requisicoes(e):
+                    self._contar('limitadas')
+                    espera = max(espera, getattr(e, 'espera', None) or 0)
+                    self.balde.pausar(espera)
+
+                if time.monotonic() + espera > prazo:
+                    self._contar('falhas')
+                    raise OrcamentoEsgotado(
+                        f"{codigo}: {tentativa} tentativas sem sucesso em {self.orcamento:g}s ({e})") from e
+                self._contar('repetidas')
+                time.sleep(espera)
@@ -0,0 +1,37 @@
+"""
+Agregados semanais e mensais (OHLCV) a partir das barras diárias/intraday
+São calculados uma vez e guardados no cache junto das barras (ver CachePrecos.ler_agregado);
+quando chegam barras novas, só o período atual (e os seguintes) é recalculado
+"""
+
+import pandas as pd
+
+# Regras de reamostragem do pandas (rótulo = último dia do período)
+REGRAS = {'semanal': 'W', 'mensal': 'ME'}
+
+AGREGACAO = {'Open': 'first', 'High': 'max', 'Low': 'min', 'Close': 'last', 'Volume': 'sum'}
+
+
+def agregar_ohlcv(dados, regra='W'):
+    """Barras OHLCV por período: abertura do 1º pregão, máxima, mínima, último fechamento e volume total"""
+    # Dados compactos não têm 'Open': agrega só as colunas presentes
+    agregacao = {coluna: funcao for coluna, funcao in AGREGACAO.items() if coluna in dados.columns}
+    agregado = dados[list(agregacao)].resample(regra).agg(agregacao)
+    # Períodos sem pregão (feriados longos) não viram barra
+    return agregado.dropna(subset=['Close'])
+
+
+def inicio_do_periodo_de(data, regra='W'):
+    """Primeiro instante do período (semana de segunda a domingo ou mês) que contém `data`"""
+    dia = data.normalize()
+    if regra == 'W':
+        return dia - pd.Timedelta(days=dia.weekday())
+    if regra == 'ME':
+        return dia.replace(day=1)
+    raise ValueError(f"Regra de agregação inválida: {regra}")
+
+
+def retornos_periodo(agregado):
+    """Retornos (%) de fechamento a fechamento entre períodos consecutivos"""
+    fechamento = agregado['Close']
+    return (fechamento / fechamento.shift(1) - 1) * 100
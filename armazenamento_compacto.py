@@ -0,0 +1,113 @@
+"""
+Armazenamento compacto de cotações em memória
+Guarda apenas Close/High/Low/Volume em float32, em matrizes com um índice de datas único
+"""
+
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# Únicas colunas usadas pelas métricas e gráficos
+COLUNAS_COMPACTAS = ['Close', 'High', 'Low', 'Volume']
+TIPO_COMPACTO = np.float32
+
+
+def compactar_dados(dados):
+    """Reduz um DataFrame do yfinance às colunas usadas, em float32"""
+    return dados[COLUNAS_COMPACTAS].astype(TIPO_COMPACTO)
+
+
+def memoria_dataframes(dados_por_ticker):
+    """Memória (bytes) ocupada por um dicionário {ticker: DataFrame}"""
+    return int(sum(dados.memory_usage(index=True, deep=True).sum() for dados in dados_por_ticker.values()))
+
+
+class PrecosCompactos:
+    """Universo de tickers em matrizes float32 (datas × tickers) com índice de datas compartilhado"""
+
+    def __init__(self, datas, tickers, colunas):
+        self.datas = datas                      # DatetimeIndex comum a todos os tickers
+        self.tickers = list(tickers)
+        self.posicoes = {codigo: i for i, codigo in enumerate(self.tickers)}
+        self.colunas = colunas                  # {'Close': ndarray (datas × tickers), ...}
+
+    @staticmethod
+    def datas_comuns(dados_por_ticker):
+        """União dos índices de datas de todos os tickers
+
+        Começa pelo índice do primeiro ticker (e não por um índice vazio sem fuso) para
+        que a união continue um DatetimeIndex com o fuso dos dados.
+        """
+        indices = [dados.index for dados in dados_por_ticker.values()]
+        if not indices:
+            return pd.DatetimeIndex([])
+        return reduce(pd.Index.union, indices[1:], indices[0])
+
+    @classmethod
+    def de_dataframes(cls, dados_por_ticker):
+        """Monta o armazenamento a partir de {ticker: DataFrame do yfinance}"""
+        datas = cls.datas_comuns(dados_por_ticker)
+        colunas = {
+            coluna: np.full((len(datas), len(dados_por_ticker)), np.nan, dtype=TIPO_COMPACTO)
+            for coluna in COLUNAS_COMPACTAS
+        }
+        precos = cls(datas, dados_por_ticker, colunas)
+        precos.preencher(dados_por_ticker)
+        return precos
+
+    def preencher(self, dados_por_ticker):
+        """Copia os DataFrames para as matrizes (as posições sem pregão continuam NaN)"""
+        for codigo, dados in dados_por_ticker.items():
+            j = self.posicoes[codigo]
+            linhas = self.datas.get_indexer(dados.index)
+            for coluna, matriz in self.colunas.items():
+                matriz[linhas, j] = dados[coluna].to_numpy(dtype=TIPO_COMPACTO)
+
+    def matriz(self, coluna='Close'):
+        """Matriz datas × tickers de uma coluna como DataFrame (sem copiar os dados)"""
+        return pd.DataFrame(self.colunas[coluna], index=self.datas, columns=self.tickers, copy=False)
+
+    def acao(self, codigo):
+        """DataFrame de um ticker com Close/High/Low/Volume, apenas nas datas em que negociou"""
+        j = self.posicoes[codigo]
+        dados = pd.DataFrame({coluna: self.colunas[coluna][:, j] for coluna in COLUNAS_COMPACTAS},
+                             index=self.datas)
+        return dados[~np.isnan(dados['Close'].to_numpy())]
+
+    def __getitem__(self, codigo):
+        return self.acao(codigo)
+
+    def __contains__(self, codigo):
+        return codigo in self.posicoes
+
+    def __len__(self):
+        return len(self.tickers)
+
+    def memoria(self):
+        """Memória (bytes) das matrizes e do índice de datas"""
+        return int(sum(m.nbytes for m in self.colunas.values()) + self.datas.memory_usage(deep=True))
+
+
+def relatorio_memoria(dados_por_ticker):
+    """Compara a memória dos DataFrames originais com a do armazenamento compacto"""
+    original = memoria_dataframes(dados_por_ticker)
+    compacto = PrecosCompactos.de_dataframes(dados_por_ticker).memoria()
+    return {
+        'tickers': len(dados_por_ticker),
+        'bytes_original': original,
+        'bytes_compacto': compacto,
+        'reducao': 1 - compacto / original,
+    }
+
+
+if __name__ == "__main__":
+    # Relatório de memória para um universo sintético de 500 tickers e 5 anos
+    from dados_sinteticos import gerar_universo
+
+    universo = gerar_universo(500, anos=5)
+    r = relatorio_memoria(universo)
+    print(f"Tickers: {r['tickers']}")
+    print(f"DataFrames do yfinance: {r['bytes_original'] / 2**20:8.1f} MiB")
+    print(f"Armazenamento compacto: {r['bytes_compacto'] / 2**20:8.1f} MiB")
+    print(f"Redução: {r['reducao']:.0%}")
@@ -0,0 +1,266 @@
+"""
+Backtest vetorizado de regras simples sobre a matriz de preços
+Avalia muitas combinações de parâmetros × tickers de uma vez, com broadcasting do NumPy
+
+Regras:
+- cruzamento de médias: comprado quando a média curta está acima da longa
+- rompimento de volatilidade: comprado no dia seguinte a um retorno > k × volatilidade
+- limiar de retorno: comprado quando o retorno dos últimos N dias passa do limiar
+
+O sinal do dia t define a posição do dia t+1 (sem olhar o futuro).
+
+Exemplo:
+    python backtest.py --regra medias --periodo 10y --top 10
+"""
+
+import argparse
+import itertools
+
+import numpy as np
+import pandas as pd
+
+DIAS_POR_ANO = 252
+
+# Combinações avaliadas por bloco (limita a memória: bloco × datas × tickers)
+COMBINACOES_POR_BLOCO = 100
+
+COLUNAS_RESULTADO = ['retorno_total', 'retorno_anual', 'volatilidade_anual', 'sharpe',
+                     'max_drawdown', 'operacoes']
+
+
+class ResultadoBacktest:
+    """Resultado de uma varredura de parâmetros"""
+
+    def __init__(self, metricas, carteira, curvas):
+        self.metricas = metricas    # por (parâmetros..., ticker)
+        self.carteira = carteira    # carteira igualmente ponderada, por combinação
+        self.curvas = curvas        # patrimônio da carteira (datas × combinações)
+
+    def melhores(self, coluna='sharpe', top=10):
+        """Combinações com os maiores valores da coluna na carteira"""
+        return self.carteira.sort_values(coluna, ascending=False, na_position='last').head(top)
+
+
+def _somas_moveis(valores, janela):
+    """Somas móveis de `janela` linhas ao longo do eixo 0
+
+    NaN (ex.: antes da listagem do ticker) não contamina as somas seguintes:
+    o resultado é NaN apenas nas janelas que não têm `janela` valores válidos.
+    Com menos linhas que `janela` (histórico curto), todas as somas são NaN.
+    """
+    if janela > len(valores):
+        return np.full(np.shape(valores), np.nan)
+    validos = ~np.isnan(valores)
+    acumulado = np.cumsum(np.where(validos, valores, 0.0), axis=0)
+    contagem = np.cumsum(validos, axis=0)
+    somas = np.full_like(acumulado, np.nan)
+    somas[janela - 1] = acumulado[janela - 1]
+    somas[janela:] = acumulado[janela:] - acumulado[:-janela]
+    completas = np.zeros(contagem.shape, dtype=bool)
+    completas[janela - 1] = contagem[janela - 1] == janela
+    completas[janela:] = contagem[janela:] - contagem[:-janela] == janela
+    somas[~completas] = np.nan
+    return somas
+
+
+def _medias_moveis(valores, janelas):
+    """Médias móveis para várias janelas: array (janelas × datas × tickers)"""
+    return np.stack([_somas_moveis(valores, janela) / janela for janela in janelas])
+
+
+def _volatilidades_moveis(retornos, janelas):
+    """Desvios padrão móveis para várias janelas (janelas × datas × tickers)"""
+    resultado = []
+    for janela in janelas:
+        soma = _somas_moveis(retornos, janela)
+        soma_quadrados = _somas_moveis(retornos ** 2, janela)
+        variancia = (soma_quadrados - soma ** 2 / janela) / (janela - 1)
+        resultado.append(np.sqrt(np.maximum(variancia, 0.0)))
+    return np.stack(resultado)
+
+
+def _avaliar_sinais(sinais, retornos, custo):
+    """Retornos diários da estratégia para um bloco de sinais (combinações × datas × tickers)"""
+    posicao = np.zeros(sinais.shape, dtype=np.float32)
+    posicao[:, 1:] = sinais[:, :-1]
+    trocas = np.abs(np.diff(posicao, axis=1, prepend=0.0))
+    return posicao * retornos[None] - trocas * custo, trocas.sum(axis=1)
+
+
+def _estatisticas(retornos_estrategia, eixo_tempo=1):
+    """Retorno total, retorno anual, volatilidade anual, Sharpe e drawdown máximo"""
+    patrimonio = np.cumprod(1 + retornos_estrategia, axis=eixo_tempo)
+    n_dias = retornos_estrategia.shape[eixo_tempo]
+    final = np.take(patrimonio, -1, axis=eixo_tempo)
+
+    media = retornos_estrategia.mean(axis=eixo_tempo)
+    desvio = retornos_estrategia.std(axis=eixo_tempo, ddof=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(desvio > 0, media / desvio * np.sqrt(DIAS_POR_ANO), np.nan)
+
+    pico = np.maximum.accumulate(patrimonio, axis=eixo_tempo)
+    drawdown = (1 - patrimonio / pico).max(axis=eixo_tempo)
+
+    return {
+        'retorno_total': (final - 1) * 100,
+        'retorno_anual': (final ** (DIAS_POR_ANO / n_dias) - 1) * 100,
+        'volatilidade_anual': desvio * np.sqrt(DIAS_POR_ANO) * 100,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown * 100,
+    }, patrimonio
+
+
+def _varrer(fechamento, nomes_parametros, combinacoes, gerar_sinais, custo_bps=0.0,
+            combinacoes_por_bloco=COMBINACOES_POR_BLOCO):
+    """Avalia todas as combinações em blocos; gerar_sinais(bloco) -> sinais (bloco × datas × tickers)"""
+    precos = fechamento.ffill().to_numpy(dtype=float)
+    retornos = np.zeros_like(precos)
+    retornos[1:] = precos[1:] / precos[:-1] - 1
+    retornos = np.nan_to_num(retornos)
+    custo = custo_bps / 10000
+    # A carteira igualmente ponderada só inclui cada ticker a partir da sua listagem
+    listados = ~np.isnan(precos)
+    n_listados = listados.sum(axis=1)
+
+    tickers = list(fechamento.columns)
+    linhas_metricas, linhas_carteira, curvas = [], [], []
+
+    for inicio in range(0, len(combinacoes), combinacoes_por_bloco):
+        bloco = combinacoes[inicio:inicio + combinacoes_por_bloco]
+        sinais = gerar_sinais(bloco)
+        retornos_estrategia, operacoes = _avaliar_sinais(sinais, retornos, custo)
+
+        por_ticker, _ = _estatisticas(retornos_estrategia)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            media_listados = np.where(n_listados > 0, (retornos_estrategia * listados).sum(axis=2)
+                                      / n_listados, 0.0)
+        carteira, patrimonio = _estatisticas(media_listados)
+        curvas.append(patrimonio)
+
+        for b, combinacao in enumerate(bloco):
+            linhas_carteira.append(combinacao + tuple(v[b] for v in carteira.values())
+                                   + (operacoes[b].sum(),))
+            for j, ticker in enumerate(tickers):
+                linhas_metricas.append(combinacao + (ticker,) + tuple(v[b, j] for v in por_ticker.values())
+                                       + (operacoes[b, j],))
+
+    colunas = COLUNAS_RESULTADO
+    metricas = pd.DataFrame(linhas_metricas, columns=nomes_parametros + ['ticker'] + colunas)
+    metricas = metricas.set_index(nomes_parametros + ['ticker'])
+    carteira = pd.DataFrame(linhas_carteira, columns=nomes_parametros + colunas).set_index(nomes_parametros)
+    curvas = pd.DataFrame(np.concatenate(curvas).T, index=fechamento.index, columns=carteira.index)
+    return ResultadoBacktest(metricas, carteira, curvas)
+
+
+def backtest_cruzamento_medias(fechamento, curtas=(5, 10, 20), longas=(50, 100, 200), custo_bps=0.0):
+    """Comprado quando a média móvel curta está acima da longa"""
+    janelas = sorted(set(curtas) | set(longas))
+    posicao_janela = {janela: i for i, janela in enumerate(janelas)}
+    medias = _medias_moveis(fechamento.ffill().to_numpy(dtype=float), janelas)
+
+    combinacoes = [(c, l) for c, l in itertools.product(curtas, longas) if c < l]
+
+    def gerar_sinais(bloco):
+        curta = np.array([posicao_janela[c] for c, _ in bloco])
+        longa = np.array([posicao_janela[l] for _, l in bloco])
+        return medias[curta] > medias[longa]
+
+    return _varrer(fechamento, ['curta', 'longa'], combinacoes, gerar_sinais, custo_bps)
+
+
+def backtest_rompimento_volatilidade(fechamento, janelas=(7, 20, 30), multiplicadores=(1.0, 1.5, 2.0),
+                                     custo_bps=0.0):
+    """Comprado no dia seguinte a um retorno maior que k × a volatilidade móvel"""
+    precos = fechamento.ffill().to_numpy(dtype=float)
+    retornos = np.full_like(precos, np.nan)
+    retornos[1:] = precos[1:] / precos[:-1] - 1
+    volatilidades = _volatilidades_moveis(retornos, janelas)
+    posicao_janela = {janela: i for i, janela in enumerate(janelas)}
+
+    combinacoes = list(itertools.product(janelas, multiplicadores))
+
+    def gerar_sinais(bloco):
+        janela = np.array([posicao_janela[j] for j, _ in bloco])
+        k = np.array([k for _, k in bloco])[:, None, None]
+        # Volatilidade até o dia anterior (o retorno do dia não entra na própria referência)
+        referencia = np.full_like(volatilidades[janela], np.nan)
+        referencia[:, 1:] = volatilidades[janela][:, :-1]
+        return retornos[None] > k * referencia
+
+    return _varrer(fechamento, ['janela', 'multiplicador'], combinacoes, gerar_sinais, custo_bps)
+
+
+def backtest_limiar_retorno(fechamento, periodos=(5, 10, 20), limiares=(0.0, 2.0, 5.0), custo_bps=0.0):
+    """Comprado quando o retorno dos últimos N dias (%) está acima do limiar"""
+    precos = fechamento.ffill().to_numpy(dtype=float)
+    retornos_periodo = np.full((len(periodos),) + precos.shape, np.nan)
+    for i, periodo in enumerate(periodos):
+        retornos_periodo[i, periodo:] = (precos[periodo:] / precos[:-periodo] - 1) * 100
+    posicao_periodo = {periodo: i for i, periodo in enumerate(periodos)}
+
+    combinacoes = list(itertools.product(periodos, limiares))
+
+    def gerar_sinais(bloco):
+        periodo = np.array([posicao_periodo[p] for p, _ in bloco])
+        limiar = np.array([l for _, l in bloco])[:, None, None]
+        return retornos_periodo[periodo] > limiar
+
+    return _varrer(fechamento, ['periodo', 'limiar'], combinacoes, gerar_sinais, custo_bps)
+
+
+def _faixa(texto, tipo=int):
+    """Converte '5,10,20' ou '5:50:5' (início:fim:passo) em lista"""
+    if ':' in texto:
+        inicio, fim, passo = (float(v) for v in texto.split(':'))
+        return [tipo(v) for v in np.arange(inicio, fim + passo / 2, passo)]
+    return [tipo(v) for v in texto.split(',')]
+
+
+def main():
+    """Linha de comando do backtest"""
+    parser = argparse.ArgumentParser(description="Backtest vetorizado de regras simples")
+    parser.add_argument('tickers', nargs='*', help="Tickers (padrão: as 20 empresas pré-selecionadas)")
+    parser.add_argument('--regra', choices=['medias', 'volatilidade', 'retorno'], default='medias')
+    parser.add_argument('--a', help="1º parâmetro: curtas | janelas | períodos (ex.: 5,10 ou 5:50:5)")
+    parser.add_argument('--b', help="2º parâmetro: longas | multiplicadores | limiares")
+    parser.add_argument('--periodo', default='10y')
+    parser.add_argument('--custo-bps', type=float, default=0.0, help="Custo por troca de posição (bps)")
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--ordenar', default='sharpe')
+    args = parser.parse_args()
+
+    from financial_analysis import AnalisadorB3
+    from metricas import montar_matriz
+
+    analisador = AnalisadorB3(periodo=args.periodo)
+    dados = analisador.carregar_varios(args.tickers or analisador.codigos_padrao())
+    analisador.encerrar_segundo_plano()
+    if not dados:
+        print("❌ Nenhum ticker com dados")
+        return 1
+    fechamento = montar_matriz(dados)
+
+    if args.regra == 'medias':
+        resultado = backtest_cruzamento_medias(
+            fechamento, _faixa(args.a) if args.a else (5, 10, 20),
+            _faixa(args.b) if args.b else (50, 100, 200), args.custo_bps)
+    elif args.regra == 'volatilidade':
+        resultado = backtest_rompimento_volatilidade(
+            fechamento, _faixa(args.a) if args.a else (7, 20, 30),
+            _faixa(args.b, float) if args.b else (1.0, 1.5, 2.0), args.custo_bps)
+    else:
+        resultado = backtest_limiar_retorno(
+            fechamento, _faixa(args.a) if args.a else (5, 10, 20),
+            _faixa(args.b, float) if args.b else (0.0, 2.0, 5.0), args.custo_bps)
+
+    print("="*60)
+    print(f"📊 BACKTEST ({args.regra}) - {len(fechamento.columns)} tickers, "
+          f"{len(resultado.carteira)} combinações, carteira igualmente ponderada")
+    print("="*60)
+    print(resultado.melhores(args.ordenar, args.top).round(2).to_string())
+    print("="*60)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
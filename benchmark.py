@@ -0,0 +1,165 @@
+"""
+Sistema de Análise Financeira B3 - Benchmark
+Mede tempo, pico de memória e vazão dos caminhos principais com dados sintéticos (sem rede)
+
+Exemplo:
+    python benchmark.py --tickers 1,10,100 --anos 0.5,5 --saida bench.json
+"""
+
+import os
+
+# Benchmark roda sem janelas
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+
+from cache_dados import CachePrecos
+from dados_sinteticos import gerar_universo
+
+
+def _periodo_para_anos(anos):
+    """Converte anos em um período do yfinance em meses ('6mo', '60mo'...)"""
+    return f"{round(anos * 12)}mo"
+
+
+def medir(funcao, repeticoes=3, itens=1):
+    """Executa a função algumas vezes; devolve tempo mediano, pico de memória e vazão"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append(time.perf_counter() - inicio)
+
+    # Pico de memória medido em uma execução separada (tracemalloc deixa o código mais lento)
+    tracemalloc.start()
+    funcao()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    mediana = statistics.median(tempos)
+    return {
+        'tempo_s': mediana,
+        'tempo_min_s': min(tempos),
+        'pico_memoria_bytes': pico,
+        'itens_por_s': itens / mediana if mediana > 0 else None,
+    }
+
+
+def benchmark_universo(n_tickers, anos, repeticoes=3, diretorio=None):
+    """Mede todos os caminhos para um universo sintético de n_tickers e `anos` de histórico"""
+    from financial_analysis import AnalisadorB3
+    from metricas import calcular_metricas_dados
+    import matplotlib.pyplot as plt
+
+    universo = gerar_universo(n_tickers, anos=anos)
+    periodo = _periodo_para_anos(anos)
+    barras = sum(len(d) for d in universo.values())
+
+    with tempfile.TemporaryDirectory(dir=diretorio) as pasta:
+        # Validade infinita: o benchmark nunca tenta atualizar pela rede
+        cache = CachePrecos(pasta, validade=float('inf'))
+        for codigo, dados in universo.items():
+            cache.importar(codigo, dados)
+
+        analisador = AnalisadorB3(periodo=periodo, cache=cache)
+        codigo = next(iter(universo))
+        resultados = {}
+
+        def carregar_todos():
+            # baixar_dados_acao reaproveita carregamentos concluídos: esquece-os para
+            # que cada repetição leia de fato o cache
+            with analisador._trava_carregamentos:
+                analisador._carregamentos.clear()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for c in universo:
+                    analisador.baixar_dados_acao(c, c)
+
+        resultados['baixar_dados_acao'] = medir(carregar_todos, repeticoes, itens=n_tickers)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            analisador.baixar_dados_acao(codigo, codigo)
+        n_barras = len(analisador.dados_acao)
+
+        def sem_memoria(funcao):
+            # As séries derivadas são memorizadas: limpa antes de medir o cálculo
+            def executar():
+                analisador._series_calculadas.clear()
+                funcao()
+            return executar
+
+        resultados['calcular_retornos'] = medir(sem_memoria(analisador.calcular_retornos),
+                                                repeticoes, itens=n_barras)
+        resultados['calcular_volatilidade'] = medir(sem_memoria(lambda: analisador.calcular_volatilidade(7)),
+                                                    repeticoes, itens=n_barras)
+
+        def resumo():
+            with contextlib.redirect_stdout(io.StringIO()):
+                analisador.mostrar_resumo_acoes()
+
+        resultados['mostrar_resumo_acoes'] = medir(sem_memoria(resumo), repeticoes, itens=n_barras)
+
+        for metodo in ('figura_volatilidade_semana', 'figura_volatilidade_mes',
+                       'figura_retorno_semanal', 'figura_retorno_mensal'):
+            def desenhar(metodo=metodo):
+                fig = getattr(analisador, metodo)()
+                fig.canvas.draw()
+                plt.close(fig)
+            resultados[metodo.replace('figura_', 'grafico_')] = medir(sem_memoria(desenhar), repeticoes)
+
+        resultados['metricas_universo'] = medir(lambda: calcular_metricas_dados(universo),
+                                                repeticoes, itens=n_tickers)
+
+    return {'tickers': n_tickers, 'anos': anos, 'barras': barras, 'resultados': resultados}
+
+
+def _commit_atual():
+    """Hash do commit atual (para comparar resultados entre versões)"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    """Linha de comando do benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos principais com dados sintéticos")
+    parser.add_argument('--tickers', default='1,10,100', help="Tamanhos do universo (ex.: 1,10,100,1000)")
+    parser.add_argument('--anos', default='0.5,5', help="Tamanhos do histórico em anos (ex.: 0.5,5,20)")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--saida', default='bench_output.json', help="Arquivo JSON de resultados")
+    args = parser.parse_args()
+
+    execucao = {
+        'commit': _commit_atual(),
+        'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'casos': [],
+    }
+
+    for n_tickers in (int(t) for t in args.tickers.split(',')):
+        for anos in (float(a) for a in args.anos.split(',')):
+            print(f"⏱️  {n_tickers} tickers × {anos:g} anos...")
+            caso = benchmark_universo(n_tickers, anos, args.repeticoes)
+            execucao['casos'].append(caso)
+            for nome, r in caso['resultados'].items():
+                print(f"   {nome:28s} {r['tempo_s'] * 1000:10.1f} ms  "
+                      f"{r['pico_memoria_bytes'] / 2**20:8.1f} MiB")
+
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(execucao, f, indent=2, ensure_ascii=False)
+    print(f"\n📁 Resultados gravados em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""
+Cache local de cotações (SQLite) com atualização incremental
+Evita baixar novamente do provedor de dados (Yahoo Finance) barras que já estão em disco
+Históricos longos são baixados e lidos em pedaços, sem montar um DataFrame gigante
+Agregados semanais/mensais ficam ao lado das barras e são atualizados junto com elas
+"""
+
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from agendador import erro_temporario
+from agregados import REGRAS, agregar_ohlcv, inicio_do_periodo_de
+from instrumentacao import contar, cronometrar, fase
+from provedores import SemCotacoes, criar_provedor
+
+# Diretório padrão do cache (pode ser alterado pela variável B3_CACHE_DIR)
+DIRETORIO_CACHE_PADRAO = os.environ.get(
+    'B3_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dados_cache')
+)
+
+# Tempo (em segundos) durante o qual o cache é considerado atualizado
+VALIDADE_PADRAO = 15 * 60
+
+COLUNAS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+# Tamanho máximo de cada requisição ao Yahoo por intervalo (limites da API para intraday)
+TAMANHO_LOTE = {
+    '1m': pd.Timedelta(days=7),
+    '2m': pd.Timedelta(days=30), '5m': pd.Timedelta(days=30),
+    '15m': pd.Timedelta(days=30), '30m': pd.Timedelta(days=30), '90m': pd.Timedelta(days=30),
+    '60m': pd.Timedelta(days=180), '1h': pd.Timedelta(days=180),
+}
+TAMANHO_LOTE_PADRAO = pd.Timedelta(days=5 * 365)
+
+# Linhas lidas do SQLite por vez em ler_em_lotes
+LINHAS_POR_LOTE = 50000
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS precos (
+    ticker TEXT NOT NULL,
+    intervalo TEXT NOT NULL,
+    data INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL,
+    volume REAL, dividends REAL, splits REAL,
+    PRIMARY KEY (ticker, intervalo, data)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS series (
+    ticker TEXT NOT NULL,
+    intervalo TEXT NOT NULL,
+    fuso TEXT,
+    inicio_coberto INTEGER,
+    atualizado_em REAL,
+    PRIMARY KEY (ticker, intervalo)
+);
+
+CREATE TABLE IF NOT EXISTS agregados (
+    ticker TEXT NOT NULL,
+    intervalo TEXT NOT NULL,
+    regra TEXT NOT NULL,
+    data INTEGER NOT NULL,
+    open REAL, high REAL, low REAL, close REAL, volume REAL,
+    PRIMARY KEY (ticker, intervalo, regra, data)
+) WITHOUT ROWID;
+"""
+
+
+def inicio_do_periodo(periodo, agora=None):
+    """Converte um período no formato do yfinance ('6mo', '1y', '5d', 'max'...) em data inicial"""
+    agora = agora if agora is not None else pd.Timestamp.now(tz='UTC')
+    periodo = periodo.lower().strip()
+
+    if periodo == 'max':
+        return None
+    if periodo == 'ytd':
+        return pd.Timestamp(year=agora.year, month=1, day=1, tz='UTC')
+
+    for sufixo, unidade in (('mo', 'months'), ('y', 'years'), ('wk', 'weeks'), ('d', 'days')):
+        if periodo.endswith(sufixo) and periodo[:-len(sufixo)].isdigit():
+            quantidade = int(periodo[:-len(sufixo)])
+            return (agora - pd.DateOffset(**{unidade: quantidade})).normalize()
+
+    raise ValueError(f"Período inválido: {periodo}")
+
+
+def _como_utc(data):
+    """Converte uma data (str, datetime ou Timestamp) em Timestamp UTC"""
+    if data is None:
+        return None
+    data = pd.Timestamp(data)
+    return data.tz_localize('UTC') if data.tz is None else data.tz_convert('UTC')
+
+
+def _para_ns(indice):
+    """Converte um DatetimeIndex em inteiros (nanossegundos UTC)"""
+    if indice.tz is None:
+        indice = indice.tz_localize('UTC')
+    return indice.tz_convert('UTC').tz_localize(None).values.astype('datetime64[ns]').view('int64')
+
+
+def _agregavel(intervalo):
+    """Barras diárias e intraday podem ser agregadas em semanas/meses"""
+    return not (intervalo.endswith('wk') or intervalo.endswith('mo') or intervalo == '5d')
+
+
+class CachePrecos:
+    """Armazena séries OHLCV por ticker em SQLite e atualiza apenas as barras novas"""
+
+    def __init__(self, diretorio=None, validade=VALIDADE_PADRAO, provedor=None):
+        self.diretorio = diretorio or DIRETORIO_CACHE_PADRAO
+        self.validade = validade
+        # Origem das barras novas (Yahoo Finance por padrão, ver provedores.py)
+        self.provedor = provedor or criar_provedor()
+        os.makedirs(self.diretorio, exist_ok=True)
+        self.caminho = os.path.join(self.diretorio, 'precos.sqlite3')
+
+        with self._conectar() as conexao:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.executescript(_ESQUEMA)
+
+    def _conectar(self):
+        """Abre uma conexão nova (uma por operação, seguro entre threads)"""
+        return sqlite3.connect(self.caminho, timeout=30)
+
+    def _metadados(self, conexao, codigo, intervalo):
+        """Retorna (fuso, inicio_coberto, atualizado_em, ultima_data) da série em cache"""
+        linha = conexao.execute(
+            "SELECT fuso, inicio_coberto, atualizado_em FROM series WHERE ticker=? AND intervalo=?",
+            (codigo, intervalo)
+        ).fetchone()
+        if linha is None:
+            return None
+
+        ultima = conexao.execute(
+            "SELECT MAX(data) FROM precos WHERE ticker=? AND intervalo=?",
+            (codigo, intervalo)
+        ).fetchone()[0]
+        return linha + (ultima,)
+
+    def _gravar(self, conexao, codigo, intervalo, dados):
+        """Insere (ou substitui) as barras de um DataFrame do yfinance"""
+        if len(dados) == 0:
+            return 0
+
+        dados = dados.reindex(columns=COLUNAS, fill_value=0.0)
+        registros = zip(
+            [codigo] * len(dados),
+            [intervalo] * len(dados),
+            _para_ns(dados.index).tolist(),
+            *(dados[coluna].astype(float).tolist() for coluna in COLUNAS)
+        )
+        conexao.executemany(
+            "INSERT OR REPLACE INTO precos VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            registros
+        )
+        return len(dados)
+
+    def _montar_dataframe(self, linhas, fuso):
+        """Converte linhas do SQLite em um DataFrame no formato do yfinance"""
+        dados = pd.DataFrame(linhas, columns=['data'] + COLUNAS)
+        indice = pd.to_datetime(dados.pop('data'), unit='ns', utc=True)
+        dados.index = pd.DatetimeIndex(indice).tz_convert(fuso or 'UTC')
+        dados.index.name = 'Date'
+        return dados
+
+    def ler_em_lotes(self, codigo, inicio=None, intervalo='1d', fim=None, linhas_por_lote=LINHAS_POR_LOTE):
+        """Lê do disco a série de um ticker em pedaços (memória constante para históricos longos)"""
+        with self._conectar() as conexao:
+            meta = self._metadados(conexao, codigo, intervalo)
+            if meta is None:
+                return
+
+            consulta = ("SELECT data, open, high, low, close, volume, dividends, splits "
+                        "FROM precos WHERE ticker=? AND intervalo=?")
+            parametros = [codigo, intervalo]
+            if inicio is not None:
+                consulta += " AND data>=?"
+                parametros.append(int(_para_ns(pd.DatetimeIndex([inicio]))[0]))
+            if fim is not None:
+                consulta += " AND data<?"
+                parametros.append(int(_para_ns(pd.DatetimeIndex([fim]))[0]))
+
+            cursor = conexao.execute(consulta + " ORDER BY data", parametros)
+            while True:
+                linhas = cursor.fetchmany(linhas_por_lote)
+                if not linhas:
+                    break
+                yield self._montar_dataframe(linhas, meta[0])
+
+    @cronometrar('cache.ler')
+    def ler(self, codigo, inicio=None, intervalo='1d', fim=None):
+        """Lê do disco a série de um ticker a partir de uma data (sem acessar a rede)"""
+        lotes = list(self.ler_em_lotes(codigo, inicio, intervalo, fim))
+        if not lotes:
+            with self._conectar() as conexao:
+                meta = self._metadados(conexao, codigo, intervalo)
+            return None if meta is None else self._montar_dataframe([], meta[0])
+        return lotes[0] if len(lotes) == 1 else pd.concat(lotes)
+
+    def _historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        """Busca barras no provedor (contando downloads e bytes recebidos na instrumentação)"""
+        with fase('cache.download'):
+            try:
+                dados = self.provedor.historico(codigo, inicio, fim, intervalo)
+            except SemCotacoes:
+                # Trecho sem pregão (fim de semana, feriado) ou ticker sem cotações: nada a gravar
+                dados = pd.DataFrame(columns=COLUNAS)
+        contar('cache.downloads')
+        # Tamanho do DataFrame recebido (o yfinance não expõe os bytes da resposta HTTP)
+        contar('cache.bytes_baixados', int(dados.memory_usage(index=True).sum()))
+        return dados
+
+    def _baixar_em_lotes(self, conexao, codigo, intervalo, inicio, fim=None):
+        """Baixa o intervalo [inicio, fim) em pedaços e grava cada pedaço assim que chega"""
+        tamanho = TAMANHO_LOTE.get(intervalo, TAMANHO_LOTE_PADRAO)
+        # Fim fixo ao longo do dia: pedidos simultâneos das mesmas barras novas têm a mesma
+        # chave e são deduplicados pelo agendador (ver agendador.py)
+        fim = fim if fim is not None else pd.Timestamp.now(tz='UTC').normalize() + pd.Timedelta(days=2)
+        gravadas, fuso = 0, None
+
+        while inicio < fim:
+            fim_lote = min(inicio + tamanho, fim)
+            dados = self._historico(codigo, inicio, fim_lote, intervalo)
+            gravadas += self._gravar(conexao, codigo, intervalo, dados)
+            if len(dados) and dados.index.tz is not None:
+                fuso = str(dados.index.tz)
+            conexao.commit()
+            inicio = fim_lote
+
+        return gravadas, fuso
+
+    def _eventos(self, conexao, codigo, intervalo, desde):
+        """Quantidade de barras com dividendo ou desdobramento a partir de `desde` (ns UTC)"""
+        return conexao.execute(
+            "SELECT COUNT(*) FROM precos WHERE ticker=? AND intervalo=? AND data>=? "
+            "AND (dividends != 0 OR splits != 0)",
+            (codigo, intervalo, desde)
+        ).fetchone()[0]
+
+    def _baixar_de_novo(self, conexao, codigo, intervalo, inicio_coberto):
+        """Baixa de novo todo o trecho coberto e troca as barras e agregados do ticker
+
+        Os pedaços são baixados antes de apagar qualquer coisa: se a rede falhar no meio,
+        o cache antigo continua intacto.
+        """
+        if not inicio_coberto:
+            pedacos = [self._historico(codigo, intervalo=intervalo)]
+        else:
+            inicio = pd.Timestamp(inicio_coberto, unit='ns', tz='UTC')
+            fim = pd.Timestamp.now(tz='UTC').normalize() + pd.Timedelta(days=2)
+            tamanho = TAMANHO_LOTE.get(intervalo, TAMANHO_LOTE_PADRAO)
+            pedacos = []
+            while inicio < fim:
+                pedacos.append(self._historico(codigo, inicio, min(inicio + tamanho, fim), intervalo))
+                inicio += tamanho
+
+        for tabela in ('precos', 'agregados'):
+            conexao.execute(f"DELETE FROM {tabela} WHERE ticker=? AND intervalo=?", (codigo, intervalo))
+        return sum(self._gravar(conexao, codigo, intervalo, dados) for dados in pedacos)
+
+    @cronometrar('cache.atualizar')
+    def atualizar(self, codigo, periodo='6mo', intervalo='1d', forcar=False, inicio=None, fim=None):
+        """Baixa somente o que falta no cache: o trecho inicial não coberto e as barras novas"""
+        inicio = inicio_do_periodo(periodo) if inicio is None else _como_utc(inicio)
+        fim = _como_utc(fim)
+        baixadas = 0
+        desde = 0  # primeira barra baixada (os agregados são recalculados a partir dela)
+
+        with self._conectar() as conexao:
+            meta = self._metadados(conexao, codigo, intervalo)
+
+            if meta is None or meta[3] is None:
+                # Primeira vez: baixa o período completo
+                if inicio is None:
+                    dados = self._historico(codigo, fim=fim, intervalo=intervalo)
+                    baixadas += self._gravar(conexao, codigo, intervalo, dados)
+                    fuso = str(dados.index.tz) if len(dados) and dados.index.tz is not None else None
+                else:
+                    baixadas, fuso = self._baixar_em_lotes(conexao, codigo, intervalo, inicio, fim)
+                inicio_coberto = 0 if inicio is None else int(_para_ns(pd.DatetimeIndex([inicio]))[0])
+            else:
+                fuso, inicio_coberto, atualizado_em, ultima = meta
+                limite = 0 if inicio is None else int(_para_ns(pd.DatetimeIndex([inicio]))[0])
+
+                # Trecho anterior ao que já está em cache
+                if limite < inicio_coberto:
+                    fim_trecho = pd.Timestamp(inicio_coberto, unit='ns', tz='UTC')
+                    if inicio is None:
+                        dados = self._historico(codigo, fim=fim_trecho, intervalo=intervalo)
+                        baixadas += self._gravar(conexao, codigo, intervalo, dados)
+                    else:
+                        baixadas += self._baixar_em_lotes(conexao, codigo, intervalo, inicio, fim_trecho)[0]
+                    inicio_coberto = limite
+
+                # Barras novas (a última barra é baixada de novo pois pode estar incompleta)
+                if forcar or atualizado_em is None or time.time() - atualizado_em > self.validade:
+                    ultima_data = pd.Timestamp(ultima, unit='ns', tz='UTC')
+                    if intervalo.endswith('d') or intervalo.endswith('wk') or intervalo.endswith('mo'):
+                        ultima_data = ultima_data.normalize()
+                    desde_ultima = int(_para_ns(pd.DatetimeIndex([ultima_data]))[0])
+                    if baixadas == 0:
+                        desde = desde_ultima
+                    eventos = self._eventos(conexao, codigo, intervalo, desde_ultima)
+                    baixadas += self._baixar_em_lotes(conexao, codigo, intervalo, ultima_data)[0]
+
+                    # Dividendo ou desdobramento nas barras novas: o provedor devolve preços
+                    # ajustados, então o histórico em cache mudou de base e é baixado de novo
+                    if self._eventos(conexao, codigo, intervalo, desde_ultima) > eventos:
+                        contar('cache.reajustes')
+                        baixadas = self._baixar_de_novo(conexao, codigo, intervalo, inicio_coberto)
+                        desde = 0
+                elif baixadas == 0:
+                    contar('cache.acertos')
+                    return 0
+
+            conexao.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?)",
+                (codigo, intervalo, fuso, inicio_coberto, time.time())
+            )
+            if baixadas:
+                self._atualizar_agregados(conexao, codigo, intervalo, fuso, desde)
+
+        contar('cache.atualizacoes')
+        return baixadas
+
+    def importar(self, codigo, dados, intervalo='1d', inicio_coberto=None):
+        """Grava uma série obtida de outra fonte (arquivo, dados sintéticos) e a marca como atualizada
+
+        Sem `inicio_coberto`, a série é tratada como o histórico completo do ticker.
+        """
+        fuso = str(dados.index.tz) if dados.index.tz is not None else None
+        coberto = 0 if inicio_coberto is None else int(_para_ns(pd.DatetimeIndex([_como_utc(inicio_coberto)]))[0])
+
+        with self._conectar() as conexao:
+            gravadas = self._gravar(conexao, codigo, intervalo, dados)
+            conexao.execute(
+                "INSERT OR REPLACE INTO series VALUES (?, ?, ?, ?, ?)",
+                (codigo, intervalo, fuso, coberto, time.time())
+            )
+            if gravadas:
+                self._atualizar_agregados(conexao, codigo, intervalo, fuso, int(_para_ns(dados.index[:1])[0]))
+        return gravadas
+
+    @cronometrar('cache.agregados')
+    def _atualizar_agregados(self, conexao, codigo, intervalo, fuso, desde=0):
+        """Recalcula os agregados dos períodos a partir do que contém `desde` (ns UTC; 0 = tudo)"""
+        if not _agregavel(intervalo):
+            return
+
+        inicios = {}
+        if desde:
+            data = pd.Timestamp(desde, unit='ns', tz='UTC').tz_convert(fuso or 'UTC')
+            inicios = {regra: inicio_do_periodo_de(data, regra) for regra in REGRAS.values()}
+
+        consulta = ("SELECT data, open, high, low, close, volume, dividends, splits "
+                    "FROM precos WHERE ticker=? AND intervalo=? AND data>=? ORDER BY data")
+        leitura = int(_para_ns(pd.DatetimeIndex([min(inicios.values())]))[0]) if inicios else 0
+        dados = self._montar_dataframe(conexao.execute(consulta, (codigo, intervalo, leitura)).fetchall(), fuso)
+
+        for regra in REGRAS.values():
+            inicio = inicios.get(regra)
+            # Só os períodos completos na leitura (o mais antigo pode ter começado antes)
+            agregado = agregar_ohlcv(dados if inicio is None else dados[dados.index >= inicio], regra)
+            limite = 0 if inicio is None else int(_para_ns(pd.DatetimeIndex([inicio]))[0])
+
+            conexao.execute(
+                "DELETE FROM agregados WHERE ticker=? AND intervalo=? AND regra=? AND data>=?",
+                (codigo, intervalo, regra, limite)
+            )
+            conexao.executemany(
+                "INSERT OR REPLACE INTO agregados VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                zip([codigo] * len(agregado), [intervalo] * len(agregado), [regra] * len(agregado),
+                    _para_ns(agregado.index).tolist(),
+                    *(agregado[coluna].astype(float).tolist() for coluna in ['Open', 'High', 'Low',
+                                                                             'Close', 'Volume']))
+            )
+
+    def ler_agregado(self, codigo, regra='W', intervalo='1d', inicio=None, fim=None):
+        """Barras semanais ('W'/'semanal') ou mensais ('ME'/'mensal') guardadas no cache
+
+        O índice é o último dia de cada período; o período atual é parcial. Devolve
+        None se o ticker não estiver em cache ou o intervalo não puder ser agregado.
+        """
+        regra = REGRAS.get(regra, regra)
+        if not _agregavel(intervalo):
+            return None
+
+        with self._conectar() as conexao:
+            meta = self._metadados(conexao, codigo, intervalo)
+            if meta is None:
+                return None
+
+            # Cache criado antes dos agregados: monta tudo uma vez
+            existe = conexao.execute(
+                "SELECT 1 FROM agregados WHERE ticker=? AND intervalo=? AND regra=? LIMIT 1",
+                (codigo, intervalo, regra)
+            ).fetchone()
+            if existe is None and meta[3] is not None:
+                self._atualizar_agregados(conexao, codigo, intervalo, meta[0])
+
+            consulta = ("SELECT data, open, high, low, close, volume FROM agregados "
+                        "WHERE ticker=? AND intervalo=? AND regra=?")
+            parametros = [codigo, intervalo, regra]
+            if inicio is not None:
+                consulta += " AND data>=?"
+                parametros.append(int(_para_ns(pd.DatetimeIndex([_como_utc(inicio)]))[0]))
+            if fim is not None:
+                consulta += " AND data<?"
+                parametros.append(int(_para_ns(pd.DatetimeIndex([_como_utc(fim)]))[0]))
+            linhas = conexao.execute(consulta + " ORDER BY data", parametros).fetchall()
+
+        agregado = pd.DataFrame(linhas, columns=['data', 'Open', 'High', 'Low', 'Close', 'Volume'])
+        indice = pd.to_datetime(agregado.pop('data'), unit='ns', utc=True)
+        agregado.index = pd.DatetimeIndex(indice).tz_convert(meta[0] or 'UTC')
+        agregado.index.name = 'Date'
+        return agregado
+
+    def atualizado_em(self, codigo, intervalo='1d'):
+        """Momento (time.time()) da última atualização da série, ou None se não estiver em cache"""
+        with self._conectar() as conexao:
+            meta = self._metadados(conexao, codigo, intervalo)
+        return None if meta is None else meta[2]
+
+    def obter(self, codigo, periodo='6mo', intervalo='1d', forcar=False, inicio=None, fim=None,
+              aceitar_desatualizado=True):
+        """Atualiza o cache se necessário e devolve a série do período pedido
+
+        Se a atualização falhar por um erro temporário (limite de requisições, rede) e
+        houver barras em cache, devolve as barras antigas marcadas em dados.attrs:
+        'desatualizado' (True), 'erro' (mensagem) e 'atualizado_em' (time.time()).
+        """
+        try:
+            self.atualizar(codigo, periodo, intervalo, forcar, inicio, fim)
+            erro = None
+        except Exception as e:
+            if not aceitar_desatualizado or not erro_temporario(e):
+                raise
+            erro = e
+        inicio = inicio_do_periodo(periodo) if inicio is None else _como_utc(inicio)
+        fim = _como_utc(fim)
+        dados = self.ler(codigo, inicio, intervalo, fim)
+
+        if erro is not None:
+            if dados is None or len(dados) == 0:
+                raise erro
+            contar('cache.desatualizados')
+            dados.attrs.update(desatualizado=True, erro=str(erro),
+                               atualizado_em=self.atualizado_em(codigo, intervalo))
+        return dados
+
+    def obter_em_lotes(self, codigo, periodo='6mo', intervalo='1d', forcar=False, inicio=None, fim=None):
+        """Como obter(), mas devolve a série em pedaços (para históricos longos)"""
+        self.atualizar(codigo, periodo, intervalo, forcar, inicio, fim)
+        inicio = inicio_do_periodo(periodo) if inicio is None else _como_utc(inicio)
+        fim = _como_utc(fim)
+        return self.ler_em_lotes(codigo, inicio, intervalo, fim)
@@ -0,0 +1,134 @@
+"""
+Correlação e covariância entre tickers
+Matrizes estáticas e móveis dos retornos diários, calculadas de forma vetorizada
+"""
+
+import numpy as np
+import pandas as pd
+
+from metricas import retornos_diarios
+
+# Memória aproximada (bytes) usada por bloco no cálculo das matrizes móveis
+MEMORIA_POR_BLOCO = 64 * 2**20
+
+
+def alinhar_retornos(fechamento, alinhamento='ffill'):
+    """Retornos diários (%) alinhados em um calendário comum
+
+    Ações locais e BDRs têm calendários diferentes. Opções:
+    - 'ffill': calendário unido; em dias sem pregão o ticker repete o preço (retorno 0)
+    - 'intersecao': apenas as datas em que todos os tickers negociaram
+    - 'pares': mantém NaN nos dias sem pregão (a matriz estática usa os pares disponíveis)
+    """
+    if alinhamento == 'ffill':
+        # Antes do primeiro pregão de cada ticker o retorno continua NaN
+        return retornos_diarios(fechamento.ffill()).iloc[1:]
+    if alinhamento == 'intersecao':
+        return retornos_diarios(fechamento.dropna(how='any')).iloc[1:]
+    if alinhamento == 'pares':
+        return retornos_diarios(fechamento).iloc[1:]
+    raise ValueError(f"Alinhamento inválido: {alinhamento}")
+
+
+def correlacao_covariancia(retornos, min_periodos=20):
+    """Matrizes de correlação e covariância (usa, para cada par, as datas em que ambos têm dado)"""
+    return retornos.corr(min_periods=min_periodos), retornos.cov(min_periods=min_periodos)
+
+
+def covariancia_movel_em_blocos(retornos, janela=60, passo=1, memoria_bloco=MEMORIA_POR_BLOCO):
+    """Gera (datas, covariâncias, desvios) das janelas móveis, bloco a bloco
+
+    Para cada data t (a cada `passo` datas) a covariância usa os retornos de
+    [t-janela+1, t]. As somas dos produtos cruzados (tickers × tickers) são mantidas
+    de uma data para a outra: somam-se as linhas que entram na janela e subtraem-se
+    as que saem, então cada data custa O(tickers²) e não O(janela × tickers²).
+    Cada bloco guarda as matrizes de no máximo `memoria_bloco` bytes de datas.
+    Janelas em que um ticker tem algum retorno ausente ficam NaN para esse ticker.
+    """
+    datas = retornos.index
+    x = retornos.to_numpy(dtype=float)
+    n_datas, n_tickers = x.shape
+    if n_datas < janela:
+        return
+
+    ausente = np.isnan(x)
+    # Centraliza pelas médias para reduzir erro numérico das somas
+    with np.errstate(invalid='ignore'):
+        medias = np.nanmean(np.where(ausente.all(axis=0), 0.0, x), axis=0)
+    x = np.where(ausente, 0.0, x - medias)
+    faltando = ausente.astype(np.int64)
+
+    produtos = np.zeros((n_tickers, n_tickers))
+    somas = np.zeros(n_tickers)
+    faltas = np.zeros(n_tickers, dtype=np.int64)
+    fim = -1  # última linha já somada
+
+    alvos = np.arange(janela - 1, n_datas, passo)
+    datas_por_bloco = max(1, memoria_bloco // (8 * n_tickers * n_tickers))
+
+    for inicio_bloco in range(0, len(alvos), datas_por_bloco):
+        bloco = alvos[inicio_bloco:inicio_bloco + datas_por_bloco]
+        cov = np.empty((len(bloco), n_tickers, n_tickers))
+        invalido = np.empty((len(bloco), n_tickers), dtype=bool)
+
+        for k, data in enumerate(bloco):
+            primeira = data - janela + 1
+            if primeira > fim:
+                # Janela nova sem sobreposição com a anterior (passo >= janela): do zero
+                produtos[:], somas[:], faltas[:] = 0.0, 0.0, 0
+                entram, saem = slice(primeira, data + 1), slice(0, 0)
+            else:
+                entram, saem = slice(fim + 1, data + 1), slice(max(fim - janela + 1, 0), primeira)
+            # Um único produto de matrizes: [entram; saem]ᵀ · [entram; -saem]
+            linhas = np.concatenate([x[entram], x[saem]])
+            sinais = np.concatenate([x[entram], -x[saem]])
+            produtos += linhas.T @ sinais
+            somas += x[entram].sum(axis=0) - x[saem].sum(axis=0)
+            faltas += faltando[entram].sum(axis=0) - faltando[saem].sum(axis=0)
+            fim = data
+
+            np.subtract(produtos, np.outer(somas, somas / janela), out=cov[k])
+            invalido[k] = faltas > 0
+
+        cov /= janela - 1
+        cov[invalido[:, :, None] | invalido[:, None, :]] = np.nan
+        desvios = np.sqrt(np.maximum(np.einsum('tii->ti', cov), 0.0))
+
+        yield datas[bloco], cov, desvios
+
+
+def correlacao_movel(retornos, janela=60, passo=1, covariancia=False):
+    """Matrizes móveis (datas × tickers × tickers) de correlação (ou covariância)
+
+    Devolve (datas, array 3D). Para universos grandes, prefira
+    covariancia_movel_em_blocos e processe um bloco por vez.
+    """
+    todas_datas, matrizes = [], []
+    for datas, cov, desvios in covariancia_movel_em_blocos(retornos, janela, passo):
+        if not covariancia:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                cov = cov / (desvios[:, :, None] * desvios[:, None, :])
+        todas_datas.append(datas)
+        matrizes.append(cov)
+
+    n = retornos.shape[1]
+    if not matrizes:
+        return pd.DatetimeIndex([]), np.empty((0, n, n))
+    return todas_datas[0].append(todas_datas[1:]), np.concatenate(matrizes)
+
+
+def correlacao_media_movel(retornos, janela=60, passo=1):
+    """Correlação média entre os pares (fora da diagonal) ao longo do tempo"""
+    valores, indice = [], []
+    n = retornos.shape[1]
+    fora_diagonal = ~np.eye(n, dtype=bool)
+
+    for datas, cov, desvios in covariancia_movel_em_blocos(retornos, janela, passo):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = cov / (desvios[:, :, None] * desvios[:, None, :])
+        valores.append(np.nanmean(corr[:, fora_diagonal], axis=1))
+        indice.append(datas)
+
+    if not valores:
+        return pd.Series(dtype=float)
+    return pd.Series(np.concatenate(valores), index=indice[0].append(indice[1:]))
@@ -0,0 +1,51 @@
+"""
+Dados OHLCV sintéticos no formato do yfinance
+Usados para medir memória/desempenho sem depender do Yahoo Finance
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def gerar_ohlcv(codigo, inicio, fim, intervalo='1d', fuso='America/Sao_Paulo', semente=None):
+    """Gera um DataFrame igual ao de yf.Ticker().history() com um passeio aleatório de preços"""
+    if semente is None:
+        semente = sum(ord(c) for c in codigo)
+    aleatorio = np.random.default_rng(semente)
+
+    if intervalo == '1d':
+        datas = pd.bdate_range(inicio, fim, tz=fuso)
+    else:
+        # Barras intraday apenas no horário do pregão (10h às 17h), dias úteis
+        datas = pd.date_range(inicio, fim, freq=intervalo.replace('m', 'min'), tz=fuso)
+        datas = datas[(datas.dayofweek < 5) & (datas.hour >= 10) & (datas.hour < 17)]
+
+    n = len(datas)
+    retornos = aleatorio.normal(0.0003, 0.02, n)
+    fechamento = 20 * np.exp(np.cumsum(retornos))
+    abertura = fechamento * (1 + aleatorio.normal(0, 0.005, n))
+    maxima = np.maximum(abertura, fechamento) * (1 + np.abs(aleatorio.normal(0, 0.01, n)))
+    minima = np.minimum(abertura, fechamento) * (1 - np.abs(aleatorio.normal(0, 0.01, n)))
+    volume = aleatorio.integers(1_000_000, 50_000_000, n)
+
+    dados = pd.DataFrame({
+        'Open': abertura,
+        'High': maxima,
+        'Low': minima,
+        'Close': fechamento,
+        'Volume': volume,
+        'Dividends': 0.0,
+        'Stock Splits': 0.0,
+    }, index=datas)
+    dados.index.name = 'Date'
+    return dados
+
+
+def gerar_universo(n_tickers, anos=1, intervalo='1d', fim=None):
+    """Gera {ticker: DataFrame} para um universo sintético de n_tickers terminando hoje"""
+    fim = pd.Timestamp(fim) if fim is not None else pd.Timestamp.now().normalize()
+    inicio = fim - pd.DateOffset(months=round(anos * 12))
+    return {
+        f"SINT{i:04d}.SA": gerar_ohlcv(f"SINT{i:04d}.SA", inicio, fim, intervalo, semente=i)
+        for i in range(n_tickers)
+    }
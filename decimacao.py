@@ -0,0 +1,147 @@
+"""
+Decimação de séries longas para os gráficos
+Desenha no máximo alguns pontos por pixel da largura do eixo, preservando a forma
+(mín/máx por faixa ou LTTB), e volta a buscar o detalhe da série completa ao dar zoom
+"""
+
+import numpy as np
+
+# Pontos desenhados por pixel de largura do eixo
+PONTOS_POR_PIXEL = 2
+
+# Acima disso os rótulos de texto por ponto/barra deixam de ser desenhados
+LIMITE_ROTULOS = 40
+
+
+def indices_minmax(y, n_pontos):
+    """Índices do mínimo e do máximo de cada faixa (mantém picos e vales exatos)"""
+    n = len(y)
+    faixas = max(1, n_pontos // 2)
+    if n <= n_pontos or faixas >= n:
+        return np.arange(n)
+
+    tamanho = -(-n // faixas)
+    faixas = -(-n // tamanho)
+    completo = np.full(faixas * tamanho, np.nan)
+    completo[:n] = y
+    blocos = completo.reshape(faixas, tamanho)
+    inicio = np.arange(faixas) * tamanho
+
+    maximos = inicio + np.argmax(np.where(np.isnan(blocos), -np.inf, blocos), axis=1)
+    minimos = inicio + np.argmin(np.where(np.isnan(blocos), np.inf, blocos), axis=1)
+    return np.unique(np.concatenate(([0, n - 1], minimos, maximos)))
+
+
+def indices_lttb(x, y, n_pontos):
+    """Largest-Triangle-Three-Buckets: escolhe o ponto que forma o maior triângulo em cada faixa"""
+    n = len(y)
+    if n <= n_pontos or n_pontos < 3:
+        return np.arange(n)
+
+    limites = np.linspace(1, n - 1, n_pontos - 1).astype(int)
+    escolhidos = np.empty(n_pontos, dtype=int)
+    escolhidos[0], escolhidos[-1] = 0, n - 1
+    anterior = 0
+
+    for i in range(n_pontos - 2):
+        inicio, fim = limites[i], limites[i + 1]
+        # Vértice seguinte: média da próxima faixa (ou o último ponto)
+        proximo_fim = limites[i + 2] if i + 2 < len(limites) else n
+        proximo_inicio = fim if i + 2 < len(limites) else n - 1
+        x_medio = x[proximo_inicio:proximo_fim].mean()
+        y_medio = np.nanmean(y[proximo_inicio:proximo_fim])
+
+        areas = np.abs((x[anterior] - x_medio) * (y[inicio:fim] - y[anterior])
+                       - (x[anterior] - x[inicio:fim]) * (y_medio - y[anterior]))
+        anterior = inicio + int(np.nanargmax(areas)) if not np.all(np.isnan(areas)) else inicio
+        escolhidos[i + 1] = anterior
+
+    # O LTTB não garante os extremos: inclui o máximo e o mínimo exatos
+    extremos = [int(np.nanargmax(y)), int(np.nanargmin(y))]
+    return np.unique(np.concatenate((escolhidos, extremos)))
+
+
+def decimar(x, y, n_pontos, metodo='minmax'):
+    """Índices da série reduzida a no máximo ~n_pontos pontos"""
+    if metodo == 'lttb':
+        return indices_lttb(x, y, n_pontos)
+    if metodo == 'minmax':
+        return indices_minmax(y, n_pontos)
+    raise ValueError(f"Método de decimação inválido: {metodo}")
+
+
+def _pontos_na_largura(ax, pontos_por_pixel=PONTOS_POR_PIXEL):
+    """Quantidade de pontos para a largura atual do eixo em pixels"""
+    return max(3, int(ax.bbox.width * pontos_por_pixel))
+
+
+def faixa_visivel(ax, x):
+    """(início, fim) dos índices dentro do limite do eixo x, com um ponto de margem de cada lado"""
+    x0, x1 = sorted(ax.get_xlim())
+    inicio = max(0, int(np.searchsorted(x, x0)) - 1)
+    fim = min(len(x), int(np.searchsorted(x, x1, side='right')) + 1)
+    return inicio, fim
+
+
+class SerieDecimada:
+    """Mantém a série completa e redesenha a linha (e o preenchimento) decimados ao mudar o zoom"""
+
+    def __init__(self, ax, x, y, linha, preenchimento=None, metodo='minmax', marcador='None',
+                 pontos_por_pixel=PONTOS_POR_PIXEL):
+        self.ax = ax
+        self.x = x
+        self.y = y
+        self.linha = linha
+        self.preenchimento = preenchimento
+        self.metodo = metodo
+        self.marcador = marcador
+        self.pontos_por_pixel = pontos_por_pixel
+
+        ax.callbacks.connect('xlim_changed', lambda _ax: self.atualizar())
+        ax.figure.canvas.mpl_connect('resize_event', lambda _evento: self.atualizar())
+
+    def atualizar(self):
+        """Troca os dados desenhados pelos da faixa visível, com mais detalhe no zoom"""
+        inicio, fim = faixa_visivel(self.ax, self.x)
+        if fim <= inicio:
+            return
+        n_pontos = _pontos_na_largura(self.ax, self.pontos_por_pixel)
+        indices = inicio + decimar(self.x[inicio:fim], self.y[inicio:fim], n_pontos, self.metodo)
+        x, y = self.x[indices], self.y[indices]
+
+        self.linha.set_data(x, y)
+        # Marcadores só quando todos os pontos da faixa estão desenhados
+        self.linha.set_marker(self.marcador if len(indices) == fim - inicio else 'None')
+
+        if self.preenchimento is not None:
+            validos = ~np.isnan(y)
+            xv, yv = x[validos], y[validos]
+            if len(xv):
+                vertices = np.concatenate(([[xv[0], 0.0]], np.column_stack((xv, yv)), [[xv[-1], 0.0]]))
+                self.preenchimento.set_verts([vertices])
+        self.ax.figure.canvas.draw_idle()
+
+
+def plotar_decimado(ax, serie, preencher=None, metodo='minmax', **kwargs):
+    """Como ax.plot(serie.index, serie.values, **kwargs), desenhando só os pontos necessários
+
+    `preencher` recebe os argumentos de fill_between (área até o zero).
+    Devolve o SerieDecimada (a linha fica em .linha).
+    """
+    import matplotlib.dates
+
+    y = np.asarray(serie.values, dtype=float)
+    x = matplotlib.dates.date2num(serie.index.to_pydatetime())
+
+    # Primeiro desenho: a série inteira cabe no eixo
+    indices = decimar(x, y, _pontos_na_largura(ax), metodo)
+    marcador = kwargs.pop('marker', 'None')
+
+    # Plota com as datas para o eixo usar o formato de data
+    linha, = ax.plot(serie.index[indices], y[indices],
+                     marker=marcador if len(indices) == len(y) else 'None', **kwargs)
+    preenchimento = None
+    if preencher is not None:
+        preenchimento = ax.fill_between(serie.index[indices], y[indices], **preencher)
+
+    return SerieDecimada(ax, x, y, linha, preenchimento, metodo, marcador)
@@ -0,0 +1,121 @@
+"""
+Download em lote da lista de empresas
+Atualiza o cache local de vários tickers em paralelo, com novas tentativas e relatório de falhas
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from agendador import OrcamentoEsgotado
+from cache_dados import CachePrecos
+
+
+class RelatorioDownload:
+    """Resultado de um download em lote"""
+
+    def __init__(self):
+        self.sucessos = {}   # codigo -> barras gravadas
+        self.falhas = {}     # codigo -> mensagem do último erro
+        self.tentativas = {}  # codigo -> número de tentativas usadas
+        self.duracao = 0.0
+
+    def imprimir(self):
+        """Mostra o resumo do lote no console"""
+        total = len(self.sucessos) + len(self.falhas)
+        print("="*60)
+        print(f"📦 DOWNLOAD EM LOTE: {len(self.sucessos)}/{total} tickers em {self.duracao:.1f}s")
+        print(f"   Barras novas gravadas: {sum(self.sucessos.values())}")
+
+        if self.falhas:
+            print(f"❌ Falhas ({len(self.falhas)}):")
+            for codigo, erro in sorted(self.falhas.items()):
+                print(f"   {codigo} ({self.tentativas[codigo]} tentativas): {erro}")
+        print("="*60)
+
+
+class FalhaDownload(RuntimeError):
+    """Um ticker falhou depois de `tentativas` tentativas"""
+
+    def __init__(self, mensagem, tentativas):
+        super().__init__(mensagem)
+        self.tentativas = tentativas
+
+
+def _atualizar_com_tentativas(cache, codigo, periodo, intervalo, tentativas, espera_inicial):
+    """Atualiza um ticker, repetindo com espera exponencial (com jitter) em caso de erro"""
+    for tentativa in range(1, tentativas + 1):
+        try:
+            return cache.atualizar(codigo, periodo, intervalo), tentativa
+        except Exception as e:
+            # O agendador já repetiu dentro do seu orçamento: outra rodada só somaria esperas
+            if tentativa == tentativas or isinstance(e, OrcamentoEsgotado):
+                raise FalhaDownload(str(e), tentativa) from e
+            espera = espera_inicial * (2 ** (tentativa - 1))
+            time.sleep(espera + random.uniform(0, espera))
+
+
+def baixar_lote(codigos, periodo='6mo', intervalo='1d', max_workers=8,
+                tentativas=3, espera_inicial=1.0, cache=None, mostrar_progresso=True):
+    """Atualiza o cache de todos os tickers em paralelo e devolve um RelatorioDownload"""
+    cache = cache or CachePrecos()
+    codigos = list(dict.fromkeys(codigos))  # remove duplicados mantendo a ordem
+    relatorio = RelatorioDownload()
+    inicio = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futuros = {
+            executor.submit(_atualizar_com_tentativas, cache, codigo, periodo,
+                            intervalo, tentativas, espera_inicial): codigo
+            for codigo in codigos
+        }
+
+        for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+            codigo = futuros[futuro]
+            try:
+                barras, usadas = futuro.result()
+                relatorio.sucessos[codigo] = barras
+                relatorio.tentativas[codigo] = usadas
+                status = f"✅ {barras} barras novas"
+            except Exception as e:
+                relatorio.falhas[codigo] = str(e)
+                relatorio.tentativas[codigo] = getattr(e, 'tentativas', tentativas)
+                status = f"❌ {e}"
+
+            if mostrar_progresso:
+                print(f"[{concluidos:3d}/{len(codigos)}] {codigo}: {status}")
+
+    relatorio.duracao = time.perf_counter() - inicio
+    return relatorio
+
+
+def main():
+    """Linha de comando: atualiza a lista padrão de empresas e/ou tickers informados"""
+    parser = argparse.ArgumentParser(description="Download em lote de cotações para o cache local")
+    parser.add_argument('tickers', nargs='*', help="Tickers adicionais (ex.: PETR4.SA VALE3.SA)")
+    parser.add_argument('--arquivo', help="Arquivo texto com um ticker por linha")
+    parser.add_argument('--somente-lista', action='store_true',
+                        help="Ignora as 20 empresas padrão e usa apenas os tickers informados")
+    parser.add_argument('--periodo', default='6mo')
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--tentativas', type=int, default=3)
+    args = parser.parse_args()
+
+    codigos = list(args.tickers)
+    if args.arquivo:
+        with open(args.arquivo, encoding='utf-8') as f:
+            codigos += [linha.strip() for linha in f if linha.strip() and not linha.startswith('#')]
+
+    if not args.somente_lista:
+        from financial_analysis import AnalisadorB3
+        codigos = AnalisadorB3().codigos_padrao() + codigos
+
+    relatorio = baixar_lote(codigos, periodo=args.periodo, max_workers=args.workers,
+                            tentativas=args.tentativas)
+    relatorio.imprimir()
+    return 1 if relatorio.falhas else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
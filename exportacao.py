@@ -0,0 +1,282 @@
+"""
+Exportação de cotações, séries derivadas e tabela de resumo para Parquet, CSV e Excel
+Os tickers são lidos do cache e gravados um de cada vez: só um ticker fica em memória,
+então universos com milhares de tickers podem ser exportados.
+
+Estrutura gerada em <saida>/:
+    parquet/precos/intervalo=1d/ticker=PETR4.SA/ano=2024/parte.parquet   (particionado)
+    parquet/series/intervalo=1d/ticker=PETR4.SA/ano=2024/parte.parquet
+    parquet/resumo.parquet
+    csv/precos.csv, csv/series.csv, csv/resumo.csv                       (coluna 'ticker')
+    dados.xlsx                                  (abas Resumo, Precos, Series; modo write-only)
+
+A pasta parquet/ pode ser lida de volta como cache (ProvedorArquivos ou importar_parquet):
+    B3_PROVEDOR=arquivos B3_DADOS_DIR=exportacao/parquet python StartApp.py
+    python exportacao.py --importar exportacao/parquet
+
+Exemplos:
+    python exportacao.py PETR4.SA VALE3.SA --formatos parquet,csv,xlsx
+    python exportacao.py --universo --formatos parquet --periodo 5y --sem-atualizar
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import time
+
+import pandas as pd
+
+FORMATOS_VALIDOS = ('parquet', 'csv', 'xlsx')
+
+# Limite de linhas de uma aba do Excel (com o cabeçalho)
+LINHAS_EXCEL = 1_048_576
+
+
+def series_derivadas(dados):
+    """Retorno diário (%), volatilidades móveis de 7 e 30 dias e retorno acumulado (%)"""
+    fechamento = dados['Close'].astype(float)
+    retornos = fechamento.pct_change() * 100
+    return pd.DataFrame({
+        'retorno': retornos,
+        'volatilidade_7': retornos.rolling(7).std(),
+        'volatilidade_30': retornos.rolling(30).std(),
+        'retorno_acumulado': (fechamento / fechamento.iloc[0] - 1) * 100,
+    }, index=dados.index)
+
+
+def _sem_fuso(indice):
+    """Datas no horário local, sem fuso (Excel e CSV não guardam o fuso)"""
+    return indice.tz_localize(None) if getattr(indice, 'tz', None) is not None else indice
+
+
+def _exigir_parquet():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ImportError("Exportar Parquet requer o pyarrow: pip install pyarrow") from None
+
+
+class EscritorParquet:
+    """Um diretório por ticker e um arquivo por ano (partições ticker=/ano=, no estilo Hive)"""
+
+    def __init__(self, diretorio, intervalo):
+        _exigir_parquet()
+        self.diretorio = diretorio
+        self.intervalo = intervalo
+        self.resumos = []  # uma linha por ticker: pequeno mesmo para milhares de tickers
+
+    def _gravar_particoes(self, tabela, codigo, dados):
+        pasta = os.path.join(self.diretorio, tabela, f'intervalo={self.intervalo}', f'ticker={codigo}')
+        # Exportação anterior do ticker é substituída (sem partições de anos que não existem mais)
+        shutil.rmtree(pasta, ignore_errors=True)
+        for ano, parte in dados.groupby(dados.index.year):
+            os.makedirs(os.path.join(pasta, f'ano={ano}'), exist_ok=True)
+            parte.to_parquet(os.path.join(pasta, f'ano={ano}', 'parte.parquet'))
+
+    def escrever(self, codigo, precos, series, resumo):
+        self._gravar_particoes('precos', codigo, precos)
+        self._gravar_particoes('series', codigo, series)
+        self.resumos.append(resumo)
+
+    def fechar(self):
+        if self.resumos:
+            pd.DataFrame(self.resumos).to_parquet(os.path.join(self.diretorio, 'resumo.parquet'), index=False)
+
+
+class EscritorCSV:
+    """Arquivos CSV abertos uma vez e completados ticker a ticker (cabeçalho só no primeiro)"""
+
+    def __init__(self, diretorio):
+        os.makedirs(diretorio, exist_ok=True)
+        self.arquivos = {nome: open(os.path.join(diretorio, f'{nome}.csv'), 'w', encoding='utf-8', newline='')
+                         for nome in ('precos', 'series', 'resumo')}
+        self.cabecalhos = set()
+
+    def _anexar(self, nome, tabela):
+        tabela.to_csv(self.arquivos[nome], header=nome not in self.cabecalhos, index=False)
+        self.cabecalhos.add(nome)
+
+    def escrever(self, codigo, precos, series, resumo):
+        for nome, tabela in (('precos', precos), ('series', series)):
+            tabela = tabela.set_axis(_sem_fuso(tabela.index)).rename_axis('data').reset_index()
+            tabela.insert(0, 'ticker', codigo)
+            self._anexar(nome, tabela)
+        self._anexar('resumo', pd.DataFrame([resumo]))
+
+    def fechar(self):
+        for arquivo in self.arquivos.values():
+            arquivo.close()
+
+
+class EscritorExcel:
+    """Pasta de trabalho openpyxl em modo write-only: as linhas vão para disco ao serem anexadas"""
+
+    def __init__(self, caminho):
+        from openpyxl import Workbook
+
+        self.caminho = caminho
+        self.livro = Workbook(write_only=True)
+        self.abas = {}  # nome -> [aba atual, linhas escritas, número da aba]
+
+    def _anexar(self, nome, cabecalho, linhas):
+        estado = self.abas.get(nome)
+        for linha in linhas:
+            if estado is None or estado[1] >= LINHAS_EXCEL:
+                # Aba cheia (ou primeira): continua em 'Precos (2)', 'Precos (3)'...
+                numero = 1 if estado is None else estado[2] + 1
+                aba = self.livro.create_sheet(nome if numero == 1 else f'{nome} ({numero})')
+                aba.append(cabecalho)
+                estado = self.abas[nome] = [aba, 1, numero]
+            estado[0].append(linha)
+            estado[1] += 1
+
+    @staticmethod
+    def _linhas(codigo, tabela):
+        datas = _sem_fuso(tabela.index).to_pydatetime()
+        for data, valores in zip(datas, tabela.itertuples(index=False, name=None)):
+            yield [codigo, data] + [None if pd.isna(v) else v for v in valores]
+
+    def escrever(self, codigo, precos, series, resumo):
+        # Resumo primeiro: é a aba aberta ao abrir o arquivo
+        self._anexar('Resumo', list(resumo), [[None if pd.isna(v) else v for v in resumo.values()]])
+        self._anexar('Precos', ['ticker', 'data'] + list(precos.columns), self._linhas(codigo, precos))
+        self._anexar('Series', ['ticker', 'data'] + list(series.columns), self._linhas(codigo, series))
+
+    def fechar(self):
+        if not self.abas:
+            self.livro.create_sheet('Resumo')
+        self.livro.save(self.caminho)
+
+
+def exportar(codigos, saida='exportacao', formatos=FORMATOS_VALIDOS, periodo='1y', intervalo='1d',
+             cache=None, atualizar=True, mostrar_progresso=True):
+    """Exporta os tickers um a um; devolve ({ticker: barras exportadas}, {ticker: erro})"""
+    from cache_dados import CachePrecos, inicio_do_periodo
+    from metricas import calcular_metricas_dados
+    from universo import carregar_universo
+
+    formatos = [f.lower() for f in formatos]
+    invalidos = [f for f in formatos if f not in FORMATOS_VALIDOS]
+    if invalidos:
+        raise ValueError(f"Formatos inválidos: {', '.join(invalidos)}")
+
+    codigos = list(dict.fromkeys(codigos))
+    cache = cache or CachePrecos()
+    universo = carregar_universo()
+    erros_download = {}
+    if atualizar:
+        from download_lote import baixar_lote
+        erros_download = baixar_lote(codigos, periodo, intervalo, cache=cache,
+                                     mostrar_progresso=mostrar_progresso).falhas
+
+    os.makedirs(saida, exist_ok=True)
+    escritores = []
+    try:
+        if 'parquet' in formatos:
+            escritores.append(EscritorParquet(os.path.join(saida, 'parquet'), intervalo))
+        if 'csv' in formatos:
+            escritores.append(EscritorCSV(os.path.join(saida, 'csv')))
+        if 'xlsx' in formatos:
+            escritores.append(EscritorExcel(os.path.join(saida, 'dados.xlsx')))
+
+        inicio = inicio_do_periodo(periodo)
+        exportados, falhas = {}, {}
+        for i, codigo in enumerate(codigos, 1):
+            dados = cache.ler(codigo, inicio, intervalo)
+            if dados is None or len(dados) == 0:
+                falhas[codigo] = erros_download.get(codigo, "sem dados")
+                continue
+
+            series = series_derivadas(dados)
+            metricas = calcular_metricas_dados({codigo: dados}).iloc[0]
+            resumo = {'ticker': codigo, 'nome': universo.nome(codigo), **metricas.to_dict()}
+            for escritor in escritores:
+                escritor.escrever(codigo, dados, series, resumo)
+            exportados[codigo] = len(dados)
+
+            if mostrar_progresso:
+                print(f"\r📤 Exportando... {i}/{len(codigos)} ({codigo})", end="", flush=True)
+        if mostrar_progresso and codigos:
+            print()
+    finally:
+        for escritor in escritores:
+            escritor.fechar()
+    return exportados, falhas
+
+
+def tickers_exportados(diretorio, intervalo='1d'):
+    """Tickers presentes em uma exportação Parquet (pasta parquet/)"""
+    pastas = glob.glob(os.path.join(diretorio, 'precos', f'intervalo={intervalo}', 'ticker=*'))
+    return sorted(os.path.basename(pasta)[len('ticker='):] for pasta in pastas)
+
+
+def importar_parquet(diretorio, cache=None, intervalo='1d', codigos=None):
+    """Grava no cache local os preços de uma exportação Parquet; devolve {ticker: barras}"""
+    from cache_dados import CachePrecos
+    from provedores import ProvedorArquivos
+
+    cache = cache or CachePrecos()
+    provedor = ProvedorArquivos(diretorio)
+    importados = {}
+    for codigo in codigos or tickers_exportados(diretorio, intervalo):
+        dados = provedor.historico(codigo, intervalo=intervalo)
+        if len(dados):
+            importados[codigo] = cache.importar(codigo, dados, intervalo, inicio_coberto=dados.index[0])
+    return importados
+
+
+def main():
+    """Linha de comando da exportação"""
+    parser = argparse.ArgumentParser(description="Exporta cotações, séries e resumo para Parquet, CSV e Excel")
+    parser.add_argument('tickers', nargs='*', help="Tickers (padrão: as empresas em destaque)")
+    parser.add_argument('--arquivo', help="Arquivo texto com um ticker por linha")
+    parser.add_argument('--universo', action='store_true', help="Todos os tickers do arquivo de universo")
+    parser.add_argument('--tipo', help="Só tickers do universo deste tipo (acao, bdr, etf, fii)")
+    parser.add_argument('--setor', help="Só tickers do universo deste setor")
+    parser.add_argument('--formatos', default='parquet,csv,xlsx',
+                        help=f"Formatos separados por vírgula ({', '.join(FORMATOS_VALIDOS)})")
+    parser.add_argument('--saida', default='exportacao', help="Diretório de saída")
+    parser.add_argument('--periodo', default='1y')
+    parser.add_argument('--intervalo', default='1d')
+    parser.add_argument('--sem-atualizar', action='store_true',
+                        help="Usa apenas o cache local, sem baixar barras novas")
+    parser.add_argument('--importar', metavar='DIRETORIO',
+                        help="Em vez de exportar, grava no cache uma exportação Parquet (pasta parquet/)")
+    args = parser.parse_args()
+
+    if args.importar:
+        importados = importar_parquet(args.importar, intervalo=args.intervalo, codigos=args.tickers or None)
+        print(f"📥 {len(importados)} tickers importados para o cache "
+              f"({sum(importados.values())} barras)")
+        return 0 if importados else 1
+
+    formatos = [f.strip().lower() for f in args.formatos.split(',') if f.strip()]
+    invalidos = [f for f in formatos if f not in FORMATOS_VALIDOS]
+    if invalidos:
+        parser.error(f"Formatos inválidos: {', '.join(invalidos)}")
+
+    codigos = list(args.tickers)
+    if args.arquivo:
+        with open(args.arquivo, encoding='utf-8') as f:
+            codigos += [linha.strip() for linha in f if linha.strip() and not linha.startswith('#')]
+    if args.universo or args.tipo or args.setor:
+        from universo import carregar_universo
+        codigos += [e.codigo for e in carregar_universo()
+                    if (not args.tipo or e.tipo == args.tipo) and (not args.setor or e.setor == args.setor)]
+    if not codigos:
+        from financial_analysis import AnalisadorB3
+        codigos = AnalisadorB3().codigos_padrao()
+
+    inicio = time.perf_counter()
+    exportados, falhas = exportar(codigos, args.saida, formatos, args.periodo, args.intervalo,
+                                  atualizar=not args.sem_atualizar)
+    print(f"\n📁 {len(exportados)} tickers ({sum(exportados.values())} barras) exportados em "
+          f"'{args.saida}' ({time.perf_counter() - inicio:.1f}s, {len(falhas)} falhas)")
+    for codigo, erro in sorted(falhas.items()):
+        print(f"   ❌ {codigo}: {erro}")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
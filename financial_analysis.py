@@ -3,64 +3,236 @@ Sistema de Análise Financeira B3 - Menu Interativo
 Análise das maiores empresas brasileiras e estrangeiras da B3
 """
 
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib
-import matplotlib.dates
-import seaborn as sns
-import yfinance as yf
-from datetime import datetime, timedelta
 import warnings
 import sys
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from instrumentacao import ATIVO as INSTRUMENTACAO_ATIVA, contar, cronometrar, evento, fase
+
+# Bibliotecas pesadas (pandas, matplotlib, yfinance) são importadas apenas quando
+# um download, cálculo ou gráfico precisa delas: o menu abre sem esperar por elas.
 
 warnings.filterwarnings('ignore')
 
 # Configurar matplotlib para exibir gráficos na tela
-matplotlib.use('TkAgg')  # Backend mais compatível
-plt.ion()  # Modo interativo ativado
+# (se MPLBACKEND estiver definido, ex.: 'Agg' no modo relatório, ele é respeitado)
+MODO_INTERATIVO = not os.environ.get('MPLBACKEND')
+
+_plt = None
+
+def _pyplot():
+    """Importa e configura o matplotlib na primeira vez que um gráfico é pedido"""
+    global _plt
+    if _plt is None:
+        import matplotlib
+        if MODO_INTERATIVO:
+            matplotlib.use('TkAgg')  # Backend mais compatível
+        
+        import matplotlib.pyplot as plt
+        if MODO_INTERATIVO:
+            plt.ion()  # Modo interativo ativado
+        
+        # Configurações para gráficos
+        plt.style.use('default')
+        plt.rcParams['figure.figsize'] = (12, 8)
+        plt.rcParams['font.size'] = 10
+        _plt = plt
+    return _plt
+
+# Períodos e intervalos aceitos pelo Yahoo Finance
+PERIODOS_VALIDOS = ['5d', '1mo', '3mo', '6mo', '1y', '2y', '5y', '10y', '20y', 'ytd', 'max']
+INTERVALOS_VALIDOS = ['1m', '2m', '5m', '15m', '30m', '60m', '90m', '1h', '1d', '5d', '1wk', '1mo']
+
+# Tickers por página nos menus de listagem do universo
+TAMANHO_PAGINA = 20
 
-# Configurações para gráficos
-plt.style.use('default')
-plt.rcParams['figure.figsize'] = (12, 8)
-plt.rcParams['font.size'] = 10
+# Gráficos de indicadores do menu da ação (opções 7 em diante): nome -> (título, especificações)
+GRAFICOS_INDICADORES = {
+    'medias': ('Médias Móveis (SMA 20 / EMA 50)', ['sma20', 'ema50']),
+    'bollinger': ('Bandas de Bollinger (20, 2σ)', ['bollinger20']),
+    'rsi': ('RSI (14)', ['rsi14']),
+    'macd': ('MACD (12, 26, 9)', ['macd']),
+    'atr': ('ATR (14)', ['atr14']),
+    'obv': ('OBV (On-Balance Volume)', ['obv']),
+}
 
 class AnalisadorB3:
-    def __init__(self):
+    def __init__(self, periodo='6mo', intervalo='1d', compacto=False, cache=None, provedor=None,
+                 universo=None):
         """Inicializa o analisador da B3"""
         
-        # 10 maiores empresas brasileiras na B3
-        self.empresas_brasileiras = {
-            1: ("Petrobras", "PETR4.SA"),
-            2: ("Vale", "VALE3.SA"),
-            3: ("Itaú Unibanco", "ITUB4.SA"),
-            4: ("Banco do Brasil", "BBAS3.SA"),
-            5: ("Bradesco", "BBDC4.SA"),
-            6: ("Ambev", "ABEV3.SA"),
-            7: ("Magazine Luiza", "MGLU3.SA"),
-            8: ("WEG", "WEGE3.SA"),
-            9: ("JBS", "JBSS3.SA"),
-            10: ("Suzano", "SUZB3.SA")
-        }
-        
-        # 10 maiores empresas estrangeiras na B3 (BDRs)
-        self.empresas_estrangeiras = {
-            1: ("Apple", "AAPL34.SA"),
-            2: ("Microsoft", "MSFT34.SA"),
-            3: ("Amazon", "AMZO34.SA"),
-            4: ("Google/Alphabet", "GOGL34.SA"),
-            5: ("Tesla", "TSLA34.SA"),
-            6: ("Meta/Facebook", "FBOK34.SA"),
-            7: ("Netflix", "NFLX34.SA"),
-            8: ("Nvidia", "NVDC34.SA"),
-            9: ("Coca-Cola", "COCA34.SA"),
-            10: ("Disney", "DISB34.SA")
-        }
+        # Universo de tickers (universo.py): lido do arquivo no primeiro uso
+        # (ver propriedade `universo`)
+        self._universo = universo
         
         self.acao_atual = None
         self.dados_acao = None
         self.nome_empresa = None
+        
+        # Histórico carregado por baixar_dados_acao
+        self.periodo = periodo
+        self.intervalo = intervalo
+        
+        # Se True, guarda só Close/High/Low/Volume em float32 (menos memória)
+        self.compacto = compacto
+        
+        # Cache local de cotações (evita baixar novamente o histórico inteiro);
+        # o provedor define de onde vêm as barras novas (ver provedores.py).
+        # Criado no primeiro uso (ver propriedade `cache`)
+        self._cache = cache
+        self._provedor = provedor
+        
+        # Carregamentos em segundo plano: (ticker, período, intervalo) -> (Future, criado_em),
+        # em ordem de uso; os concluídos mais antigos saem acima do limite
+        self._carregamentos = OrderedDict()
+        self.limite_carregamentos = 128
+        self._trava_carregamentos = threading.Lock()
+        self._executor = None
+        self.max_downloads_simultaneos = 4
+        
+        # Séries derivadas já calculadas (retornos, volatilidade...), em ordem LRU
+        # chave: (ticker, data da última barra, nome da série, janela)
+        self._series_calculadas = OrderedDict()
+        self.limite_series_calculadas = 64
+        # Assinatura (barras, primeira/última data, hash do fechamento) dos últimos dados
+        # de cada ticker, em ordem LRU: detecta barras novas sem guardar os DataFrames
+        self._assinaturas = OrderedDict()
+        self.limite_assinaturas = 256
+        
+        # Indicadores técnicos com estado, em ordem LRU: (ticker, intervalo, especificações) ->
+        # (CalculadoraIndicadores, primeira data, última barra processada, seu fechamento,
+        # resultado); barras novas só continuam o cálculo
+        self._indicadores = OrderedDict()
+        self.limite_indicadores = 32
+    
+    @property
+    def cache(self):
+        """Cache local de cotações, criado (e pandas importado) apenas no primeiro uso"""
+        if self._cache is None:
+            from cache_dados import CachePrecos
+            self._cache = CachePrecos(provedor=self._provedor)
+        return self._cache
+    
+    @cache.setter
+    def cache(self, cache):
+        self._cache = cache
+    
+    @property
+    def universo(self):
+        """Universo de tickers com metadados (arquivo B3_UNIVERSO ou universo_b3.csv)"""
+        if self._universo is None:
+            from universo import carregar_universo
+            self._universo = carregar_universo()
+        return self._universo
+    
+    def _carregar_em_segundo_plano(self, codigo_acao):
+        """Inicia (ou reaproveita) o carregamento de um ticker em uma thread de fundo"""
+        chave = (codigo_acao, self.periodo, self.intervalo)
+        
+        with self._trava_carregamentos:
+            existente = self._carregamentos.get(chave)
+            if existente is not None:
+                futuro, criado_em = existente
+                # Reaproveita se ainda está baixando ou se terminou bem e recentemente
+                # (dados antigos servidos do cache após uma falha são pedidos de novo)
+                if not futuro.done() or (futuro.exception() is None
+                                         and not futuro.result().attrs.get('desatualizado')
+                                         and time.time() - criado_em < self.cache.validade):
+                    contar('carregamentos.reaproveitados')
+                    self._carregamentos.move_to_end(chave)
+                    return futuro
+            
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_downloads_simultaneos,
+                                                    thread_name_prefix='b3-download')
+            
+            contar('carregamentos.iniciados')
+            futuro = self._executor.submit(self.cache.obter, codigo_acao,
+                                           periodo=self.periodo, intervalo=self.intervalo)
+            self._carregamentos[chave] = (futuro, time.time())
+            self._carregamentos.move_to_end(chave)
+            self._podar_carregamentos()
+            return futuro
+    
+    def _podar_carregamentos(self):
+        """Esquece os carregamentos concluídos mais antigos acima do limite (chamado com a trava)"""
+        excesso = len(self._carregamentos) - self.limite_carregamentos
+        if excesso <= 0:
+            return
+        for chave in [c for c, (futuro, _) in self._carregamentos.items() if futuro.done()][:excesso]:
+            del self._carregamentos[chave]
+    
+    def pre_carregar(self, codigos):
+        """Começa a carregar os tickers em segundo plano enquanto o usuário lê o menu"""
+        for codigo in codigos:
+            self._carregar_em_segundo_plano(codigo)
+    
+    def status_carregamento(self, codigo_acao):
+        """Símbolo do estado do carregamento em segundo plano de um ticker"""
+        existente = self._carregamentos.get((codigo_acao, self.periodo, self.intervalo))
+        if existente is None:
+            return " "
+        futuro = existente[0]
+        if not futuro.done():
+            return "⏳"
+        if futuro.exception() is not None:
+            return "❌"
+        return "🕒" if futuro.result().attrs.get('desatualizado') else "✅"
+    
+    def _aguardar_com_progresso(self, futuro):
+        """Mostra o tempo de espera enquanto o download termina"""
+        inicio = time.time()
+        while not futuro.done():
+            wait([futuro], timeout=0.2)
+            print(f"\r⏳ Aguardando download... {time.time() - inicio:4.1f}s", end="", flush=True)
+        print()
+    
+    def encerrar_segundo_plano(self):
+        """Cancela os carregamentos pendentes (chamado ao sair)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    def sair(self, mensagem="Encerrando aplicação..."):
+        """Encerra a aplicação sem esperar pelos downloads em segundo plano"""
+        print(mensagem)
+        self.encerrar_segundo_plano()
+        sys.exit()
+    
+    def codigos_padrao(self):
+        """Lista os tickers em destaque no universo (ações brasileiras e depois BDRs)"""
+        return [e.codigo for e in self.universo.destaques('acao') + self.universo.destaques('bdr')]
+    
+    def aquecer_cache(self, codigos_extras=None, max_workers=8):
+        """Baixa em paralelo todas as empresas (e tickers extras) para o cache local"""
+        from download_lote import baixar_lote
+        
+        codigos = self.codigos_padrao() + list(codigos_extras or [])
+        relatorio = baixar_lote(codigos, periodo=self.periodo, intervalo=self.intervalo,
+                                max_workers=max_workers, cache=self.cache)
+        relatorio.imprimir()
+        return relatorio
+    
+    def exportar_dados(self, codigos=None, saida='exportacao', atualizar=True):
+        """Exporta preços, séries derivadas e resumo para `saida` (Parquet, CSV e Excel; ver exportacao.py)"""
+        from exportacao import FORMATOS_VALIDOS, exportar
+        
+        formatos = list(FORMATOS_VALIDOS)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("⚠️  pyarrow não instalado: exportando só CSV e Excel")
+            formatos.remove('parquet')
+        
+        exportados, falhas = exportar(codigos or self.codigos_padrao(), saida, formatos,
+                                      self.periodo, self.intervalo, cache=self.cache, atualizar=atualizar)
+        print(f"📁 {len(exportados)} tickers exportados em '{saida}' ({', '.join(formatos)})")
+        for codigo, erro in sorted(falhas.items()):
+            print(f"   ❌ {codigo}: {erro}")
     
     def limpar_tela(self):
         """Limpa a tela do console"""
@@ -73,134 +245,340 @@ class AnalisadorB3:
         print("  Feche a janela do gráfico para continuar...")
         
         # Aguarda todas as figuras serem fechadas
+        plt = _pyplot()
         while plt.get_fignums():
             plt.pause(0.1)
         
         print("✅ Gráfico fechado. Continuando...")
     
-    def adicionar_interatividade(self, ax, dados, formato_valor=":.2f", prefixo="", sufixo=""):
-        """Adiciona interatividade ao gráfico para mostrar valores com o mouse"""
+    def _ajustar_layout(self, fig, datas=False):
+        """Inclina as datas do eixo x (opcional) e ajusta o layout da figura"""
+        with fase('grafico.layout'):
+            if datas:
+                fig.autofmt_xdate()
+            fig.tight_layout()
+    
+    def _mostrar_figura(self, fig, nome):
+        """Exibe a figura e aguarda o fechamento (com instrumentação, mede o primeiro desenho)"""
+        if INSTRUMENTACAO_ATIVA:
+            # Desenho síncrono apenas para medir; sem instrumentação o show desenha normalmente
+            with fase(f'{nome}.desenho'):
+                fig.canvas.draw()
+        _pyplot().show()
+        self.aguardar_fechamento_grafico()
+    
+    def adicionar_interatividade(self, ax, dados, formato_valor=":.2f", prefixo="", sufixo="", posicoes=None):
+        """Adiciona interatividade ao gráfico para mostrar valores com o mouse
+        
+        As posições x são convertidas uma única vez em um array numérico ordenado;
+        a cada movimento do mouse o ponto mais próximo é achado por busca binária
+        e uma única anotação é redesenhada com blitting (sem redesenhar a figura).
+        Para gráficos de barras, `posicoes` informa o x de cada barra.
+        """
+        import numpy as np
+        import pandas as pd
+        import matplotlib.dates
+        
+        fig = ax.figure
+        canvas = fig.canvas
+        formato = formato_valor.lstrip(':')
+        
+        valores = np.asarray(dados, dtype=float)
+        datas = dados.index if isinstance(getattr(dados, 'index', None), pd.DatetimeIndex) else None
+        
+        if posicoes is not None:
+            xs = np.asarray(posicoes, dtype=float)
+        elif datas is not None:
+            xs = matplotlib.dates.date2num(datas.to_pydatetime())
+        else:
+            xs = np.arange(len(valores), dtype=float)
+        
+        if len(xs) == 0:
+            return
+        
+        # Anotação única, desenhada fora do ciclo normal de desenho (animated)
+        anotacao = ax.annotate("", xy=(xs[0], valores[0]),
+                               xytext=(10, 10),
+                               textcoords='offset points',
+                               bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.8),
+                               arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'),
+                               fontsize=9, animated=True)
+        anotacao.set_visible(False)
+        estado = {'fundo': None, 'indice': None}
+        
+        def on_draw(event):
+            # Guarda a imagem da figura sem a anotação para restaurar a cada movimento
+            if getattr(canvas, 'supports_blit', False):
+                estado['fundo'] = canvas.copy_from_bbox(fig.bbox)
+            if anotacao.get_visible():
+                ax.draw_artist(anotacao)
+        
+        def redesenhar():
+            evento('hover.redesenhos')
+            if estado['fundo'] is None:
+                canvas.draw_idle()
+                return
+            canvas.restore_region(estado['fundo'])
+            if anotacao.get_visible():
+                ax.draw_artist(anotacao)
+            canvas.blit(fig.bbox)
         
         def on_hover(event):
-            if event.inaxes == ax:
-                # Remover anotações anteriores
-                for child in ax.get_children():
-                    if hasattr(child, 'get_text') and child.get_text().startswith('📊'):
-                        child.remove()
-                
-                # Encontrar ponto mais próximo
-                if hasattr(event, 'xdata') and hasattr(event, 'ydata'):
-                    if event.xdata is not None and event.ydata is not None:
-                        try:
-                            # Para dados com índice datetime
-                            if hasattr(dados, 'index') and hasattr(dados.index, 'to_pydatetime'):
-                                # Converter coordenada x para data
-                                x_date = matplotlib.dates.num2date(event.xdata)
-                                
-                                # Encontrar índice mais próximo
-                                diferencias = abs(dados.index - x_date)
-                                idx_proximo = diferencias.argmin()
-                                
-                                valor = dados.iloc[idx_proximo]
-                                data = dados.index[idx_proximo]
-                                
-                                # Criar anotação
-                                texto = f"📊 {data.strftime('%d/%m/%Y')}\n{prefixo}{valor:{formato_valor}}{sufixo}"
-                                ax.annotate(texto, 
-                                          xy=(matplotlib.dates.date2num(data), valor),
-                                          xytext=(10, 10), 
-                                          textcoords='offset points',
-                                          bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.8),
-                                          arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'),
-                                          fontsize=9)
-                                
-                            # Para dados simples (listas)
-                            else:
-                                # Encontrar índice mais próximo baseado na posição x
-                                if len(dados) > 0:
-                                    idx = int(round(event.xdata))
-                                    if 0 <= idx < len(dados):
-                                        valor = dados[idx] if hasattr(dados, '__getitem__') else dados.iloc[idx]
-                                        texto = f"📊 Índice: {idx}\n{prefixo}{valor:{formato_valor}}{sufixo}"
-                                        ax.annotate(texto,
-                                                  xy=(idx, valor),
-                                                  xytext=(10, 10),
-                                                  textcoords='offset points',
-                                                  bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.8),
-                                                  arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'),
-                                                  fontsize=9)
-                        except:
-                            pass
-                        
-                        plt.draw()
-        
-        # Conectar evento de movimento do mouse
-        plt.connect('motion_notify_event', on_hover)
+            if event.inaxes != ax or event.xdata is None:
+                if anotacao.get_visible():
+                    anotacao.set_visible(False)
+                    estado['indice'] = None
+                    redesenhar()
+                return
+            
+            # Busca binária do ponto mais próximo
+            idx = int(np.searchsorted(xs, event.xdata))
+            if idx >= len(xs) or (idx > 0 and event.xdata - xs[idx - 1] < xs[idx] - event.xdata):
+                idx -= 1
+            
+            if idx == estado['indice']:
+                return
+            estado['indice'] = idx
+            
+            valor = valores[idx]
+            if datas is not None:
+                texto = f"📊 {datas[idx].strftime('%d/%m/%Y')}\n{prefixo}{valor:{formato}}{sufixo}"
+            else:
+                texto = f"📊 Índice: {idx}\n{prefixo}{valor:{formato}}{sufixo}"
+            
+            anotacao.xy = (xs[idx], valor)
+            anotacao.set_text(texto)
+            anotacao.set_visible(True)
+            redesenhar()
+        
+        # Conectar eventos de desenho e de movimento do mouse
+        canvas.mpl_connect('draw_event', on_draw)
+        canvas.mpl_connect('motion_notify_event', on_hover)
     
+    @cronometrar('baixar_dados_acao')
     def baixar_dados_acao(self, codigo_acao, nome_empresa):
-        """Baixa dados de uma ação específica"""
-        print(f"\n📥 Baixando dados de {nome_empresa} ({codigo_acao})...")
+        """Carrega dados de uma ação específica (cache local + barras novas do Yahoo)"""
+        print(f"\n📥 Carregando dados de {nome_empresa} ({codigo_acao})...")
         
         try:
-            ticker = yf.Ticker(codigo_acao)
-            # Baixar 6 meses de dados para ter informações suficientes
-            dados = ticker.history(period='6mo')
+            # Período configurado (6 meses por padrão): lido do cache local,
+            # baixando apenas as barras novas (em pedaços, para históricos longos).
+            # Normalmente já foi pré-carregado em segundo plano pelo menu de empresas
+            futuro = self._carregar_em_segundo_plano(codigo_acao)
+            with fase('baixar_dados_acao.espera'):
+                if not futuro.done():
+                    self._aguardar_com_progresso(futuro)
+                dados = futuro.result()
             
             if len(dados) == 0:
                 print(f"❌ Nenhum dado encontrado para {codigo_acao}")
                 return False
             
-            self.acao_atual = codigo_acao
-            self.dados_acao = dados
-            self.nome_empresa = nome_empresa
+            if dados.attrs.get('desatualizado'):
+                atualizado_em = dados.attrs.get('atualizado_em')
+                quando = time.strftime('%d/%m/%Y %H:%M', time.localtime(atualizado_em)) if atualizado_em else '?'
+                print(f"⚠️  Dados desatualizados (cache de {quando}): a atualização falhou - {dados.attrs.get('erro')}")
             
-            print(f"Dados baixados: {len(dados)} registros")
+            if self.compacto:
+                from armazenamento_compacto import compactar_dados
+                dados = compactar_dados(dados)
+            
+            self.usar_dados(codigo_acao, nome_empresa, dados)
+            print(f"Dados carregados: {len(dados)} registros")
             return True
             
         except Exception as e:
-            print(f"Erro ao baixar dados: {e}")
+            from agendador import erro_temporario
+            
+            if erro_temporario(e):
+                # Limite de requisições ou rede, sem barras em cache para mostrar
+                print(f"⏳ Yahoo Finance indisponível ou limitando requisições, e {codigo_acao} "
+                      f"não está em cache: {e}")
+            elif isinstance(e, (LookupError, ValueError)):
+                print(f"❌ Erro ao baixar dados de {codigo_acao}: {e}")
+            else:
+                # Erro inesperado: mostra o rastreamento em vez de escondê-lo
+                import traceback
+                print(f"❌ Erro inesperado ao carregar {codigo_acao}: {type(e).__name__}: {e}")
+                traceback.print_exc()
             return False
     
+    def usar_dados(self, codigo_acao, nome_empresa, dados):
+        """Define a ação atual a partir de dados já carregados (ex.: matriz em memória compartilhada)"""
+        self._invalidar_series(codigo_acao, dados)
+        self.acao_atual = codigo_acao
+        self.dados_acao = dados
+        self.nome_empresa = nome_empresa
+    
+    @staticmethod
+    def _assinatura(dados):
+        """Identifica os dados sem guardá-los: barras, primeira/última data e hash do fechamento"""
+        import pandas as pd
+        
+        if len(dados) == 0:
+            return (0,)
+        fechamento = int(pd.util.hash_pandas_object(dados['Close'], index=False).sum())
+        return (len(dados), dados.index[0], dados.index[-1], fechamento)
+    
+    def _invalidar_series(self, codigo_acao, dados):
+        """Descarta as séries calculadas de um ticker quando chegam barras novas"""
+        assinatura = self._assinatura(dados)
+        if self._assinaturas.get(codigo_acao) == assinatura:
+            self._assinaturas.move_to_end(codigo_acao)
+            return
+        
+        self._assinaturas[codigo_acao] = assinatura
+        self._assinaturas.move_to_end(codigo_acao)
+        if len(self._assinaturas) > self.limite_assinaturas:
+            self._assinaturas.popitem(last=False)
+        for chave in [c for c in self._series_calculadas if c[0] == codigo_acao]:
+            del self._series_calculadas[chave]
+    
+    def _memorizar(self, nome, janela, calcular):
+        """Devolve a série memorizada para a ação atual ou a calcula e guarda (LRU)"""
+        chave = (self.acao_atual, self.dados_acao.index[-1], nome, janela)
+        
+        if chave in self._series_calculadas:
+            contar('series.acertos')
+            self._series_calculadas.move_to_end(chave)
+            return self._series_calculadas[chave]
+        
+        contar('series.calculadas')
+        resultado = calcular()
+        self._series_calculadas[chave] = resultado
+        if len(self._series_calculadas) > self.limite_series_calculadas:
+            self._series_calculadas.popitem(last=False)
+        return resultado
+    
+    @cronometrar('calcular_retornos')
     def calcular_retornos(self):
         """Calcula retornos diários e semanais"""
         if self.dados_acao is None:
             return None, None
+        
+        def calcular():
+            retornos_diarios = self.dados_acao['Close'].pct_change().dropna() * 100
+            # Semanais: consulta aos agregados guardados, sem reamostrar a série diária
+            retornos_semanais = self.calcular_agregado('W')['Retorno'].dropna()
+            return retornos_diarios, retornos_semanais
+        
+        return self._memorizar('retornos', None, calcular)
+    
+    @cronometrar('calcular_agregado')
+    def calcular_agregado(self, regra='W'):
+        """Barras semanais ('W') ou mensais ('ME') da ação atual com o retorno (%) de cada período"""
+        if self.dados_acao is None:
+            return None
+        
+        def calcular():
+            import pandas as pd
+            from agregados import agregar_ohlcv, retornos_periodo
             
-        retornos_diarios = self.dados_acao['Close'].pct_change().dropna() * 100
-        retornos_semanais = self.dados_acao['Close'].resample('W').last().pct_change().dropna() * 100
+            inicio = self.dados_acao.index[0]
+            # Inclui o período anterior ao início para calcular o retorno do primeiro período
+            agregado = self.cache.ler_agregado(self.acao_atual, regra, self.intervalo,
+                                               inicio - pd.Timedelta(days=32))
+            if agregado is None or len(agregado) == 0:
+                # Intervalos semanais/mensais ou dados fora do cache: agrega na hora
+                agregado = agregar_ohlcv(self.dados_acao, regra)
+            agregado = agregado.assign(Retorno=retornos_periodo(agregado))
+            return agregado[agregado.index >= inicio]
         
-        return retornos_diarios, retornos_semanais
+        return self._memorizar('agregado', regra, calcular)
     
+    @cronometrar('calcular_volatilidade')
     def calcular_volatilidade(self, janela=7):
         """Calcula volatilidade móvel"""
         if self.dados_acao is None:
             return None
-            
-        retornos_diarios, _ = self.calcular_retornos()
-        volatilidade = retornos_diarios.rolling(janela).std()
         
-        return volatilidade
+        def calcular():
+            retornos_diarios, _ = self.calcular_retornos()
+            return retornos_diarios.rolling(janela).std()
+        
+        return self._memorizar('volatilidade', janela, calcular)
     
-    def mostrar_resumo_acoes(self):
-        """Opção 1: Mostra resumo da ação atual"""
+    @cronometrar('calcular_retorno_acumulado')
+    def calcular_retorno_acumulado(self):
+        """Calcula o retorno acumulado (%) desde o início do período"""
         if self.dados_acao is None:
-            print("Nenhuma ação carregada!")
-            return
+            return None
         
-        print(f"\nRESUMO - {self.nome_empresa} ({self.acao_atual})")
-        print("="*60)
+        def calcular():
+            precos = self.dados_acao['Close']
+            return (precos / precos.iloc[0] - 1) * 100
+        
+        return self._memorizar('retorno_acumulado', None, calcular)
+    
+    @cronometrar('calcular_indicadores')
+    def calcular_indicadores(self, especificacoes):
+        """Indicadores técnicos da ação atual (DataFrame, uma coluna por série; ver indicadores.py)
+        
+        Quando os dados só ganharam barras novas desde o último cálculo, os filtros
+        continuam do estado guardado em vez de recalcular o histórico.
+        """
+        if self.dados_acao is None:
+            return None
+        
+        especificacoes = tuple(especificacoes)
+        
+        def calcular():
+            import pandas as pd
+            from indicadores import CalculadoraIndicadores, indicadores_dados
+            
+            dados = self.dados_acao
+            chave = (self.acao_atual, self.intervalo, especificacoes)
+            anterior = self._indicadores.get(chave)
+            if anterior is not None:
+                calculadora, primeira, ultima, fechamento_ultima, resultado = anterior
+                # Continua só se os dados começam dentro do trecho já processado e a última
+                # barra processada não mudou (a barra do dia pode estar incompleta)
+                if (dados.index[0] >= primeira and ultima in dados.index
+                        and dados.at[ultima, 'Close'] == fechamento_ultima):
+                    novos = dados[dados.index > ultima]
+                    if len(novos):
+                        contar('indicadores.incrementais')
+                        resultado = pd.concat([resultado, indicadores_dados(novos, especificacoes, calculadora)])
+                    resultado = resultado[resultado.index >= dados.index[0]]
+                    self._guardar_indicadores(chave, calculadora, dados, resultado)
+                    return resultado
+            
+            calculadora = CalculadoraIndicadores(especificacoes)
+            resultado = indicadores_dados(dados, especificacoes, calculadora)
+            self._guardar_indicadores(chave, calculadora, dados, resultado)
+            return resultado
+        
+        return self._memorizar('indicadores', especificacoes, calcular)
+    
+    def _guardar_indicadores(self, chave, calculadora, dados, resultado):
+        """Guarda o estado dos indicadores (LRU): primeira data, última barra e seu fechamento"""
+        self._indicadores[chave] = (calculadora, resultado.index[0], dados.index[-1],
+                                    dados['Close'].iloc[-1], resultado)
+        self._indicadores.move_to_end(chave)
+        if len(self._indicadores) > self.limite_indicadores:
+            self._indicadores.popitem(last=False)
+    
+    @cronometrar('tabela_resumo')
+    def tabela_resumo(self):
+        """Monta a tabela de métricas da ação atual (DataFrame Métrica/Valor)"""
+        if self.dados_acao is None:
+            return None
         
-        # Dados básicos
-        ultimo_preco = self.dados_acao['Close'].iloc[-1]
-        primeiro_preco = self.dados_acao['Close'].iloc[0]
-        variacao_periodo = ((ultimo_preco - primeiro_preco) / primeiro_preco) * 100
+        import pandas as pd
+        from metricas import calcular_metricas_dados
         
-        # Retornos
-        retornos_diarios, retornos_semanais = self.calcular_retornos()
+        # Todas as métricas em uma passada (os retornos diários são calculados uma vez;
+        # os semanais vêm dos agregados guardados no cache)
+        m = self._memorizar(
+            'metricas', None,
+            lambda: calcular_metricas_dados(
+                {self.acao_atual: self.dados_acao},
+                semanais=self.calcular_retornos()[1].to_frame(self.acao_atual)
+            ).iloc[0]
+        )
         
-        # Volatilidade
-        volatilidade_semanal = self.calcular_volatilidade(7)
-        volatilidade_mensal = self.calcular_volatilidade(30)
+        def fmt(valor, casas=2):
+            return "N/A" if pd.isna(valor) else f"{valor:.{casas}f}"
         
         # Criar tabela resumo
         resumo = {
@@ -218,38 +596,51 @@ class AnalisadorB3:
                 'Último Volume'
             ],
             'Valor': [
-                f"{ultimo_preco:.2f}",
-                f"{primeiro_preco:.2f}",
-                f"{variacao_periodo:.2f}",
-                f"{self.dados_acao['High'].max():.2f}",
-                f"{self.dados_acao['Low'].min():.2f}",
-                f"{self.dados_acao['Volume'].mean():.0f}",
-                f"{retornos_diarios.mean():.2f}",
-                f"{retornos_semanais.mean():.2f}",
-                f"{volatilidade_semanal.iloc[-1]:.2f}" if not volatilidade_semanal.empty else "N/A",
-                f"{volatilidade_mensal.iloc[-1]:.2f}" if not volatilidade_mensal.empty else "N/A",
-                f"{self.dados_acao['Volume'].iloc[-1]:.0f}"
+                fmt(m['preco_atual']),
+                fmt(m['preco_inicial']),
+                fmt(m['variacao_periodo']),
+                fmt(m['maior_preco']),
+                fmt(m['menor_preco']),
+                fmt(m['volume_medio'], 0),
+                fmt(m['retorno_medio_diario']),
+                fmt(m['retorno_medio_semanal']),
+                fmt(m['volatilidade_semanal']),
+                fmt(m['volatilidade_mensal']),
+                fmt(m['ultimo_volume'], 0)
             ]
         }
         
-        df_resumo = pd.DataFrame(resumo)
-        print(df_resumo.to_string(index=False))
-        print("="*60)
+        return pd.DataFrame(resumo)
     
-    def grafico_volatilidade_semana(self):
-        """Opção 2: Gráfico de volatilidade da última semana"""
+    @cronometrar('mostrar_resumo_acoes')
+    def mostrar_resumo_acoes(self):
+        """Opção 1: Mostra resumo da ação atual"""
         if self.dados_acao is None:
             print("Nenhuma ação carregada!")
             return
         
+        print(f"\nRESUMO - {self.nome_empresa} ({self.acao_atual})")
+        print("="*60)
+        print(self.tabela_resumo().to_string(index=False))
+        print("="*60)
+    
+    @cronometrar('figura_volatilidade_semana')
+    def figura_volatilidade_semana(self):
+        """Monta a figura da opção 2 (sem exibir)"""
+        if self.dados_acao is None:
+            return None
+        
         volatilidade = self.calcular_volatilidade(7)
         
         # Últimos 7 dias
         volatilidade_semana = volatilidade.tail(7)
         
+        from decimacao import plotar_decimado, LIMITE_ROTULOS
+        
+        plt = _pyplot()
         fig, ax = plt.subplots(figsize=(12, 6))
-        line = ax.plot(volatilidade_semana.index, volatilidade_semana.values, 
-                      marker='o', linewidth=2, markersize=8, color='red', alpha=0.8)
+        plotar_decimado(ax, volatilidade_semana,
+                        marker='o', linewidth=2, markersize=8, color='red', alpha=0.8)
         
         # Adicionar interatividade
         self.adicionar_interatividade(ax, volatilidade_semana, formato_valor=":.2f", sufixo="%")
@@ -260,11 +651,9 @@ class AnalisadorB3:
         ax.set_ylabel('Volatilidade (%)')
         ax.grid(True, alpha=0.3)
         
-        # Melhorar formatação das datas
-        fig.autofmt_xdate()
-        
-        # Adicionar valores nos pontos
-        for i, (data, valor) in enumerate(volatilidade_semana.items()):
+        # Adicionar valores nos pontos (só em séries curtas: um texto por ponto é caro)
+        rotulos = volatilidade_semana.items() if len(volatilidade_semana) <= LIMITE_ROTULOS else []
+        for i, (data, valor) in enumerate(rotulos):
             ax.annotate(f'{valor:.1f}%', 
                        (data, valor),
                        textcoords="offset points",
@@ -273,26 +662,35 @@ class AnalisadorB3:
                        fontsize=8,
                        alpha=0.7)
         
-        plt.tight_layout()
-        plt.show()
-        self.aguardar_fechamento_grafico()
+        self._ajustar_layout(fig, datas=True)
+        return fig
     
-    def grafico_volatilidade_mes(self):
-        """Opção 3: Gráfico de volatilidade do último mês"""
+    def grafico_volatilidade_semana(self):
+        """Opção 2: Gráfico de volatilidade da última semana"""
         if self.dados_acao is None:
             print("Nenhuma ação carregada!")
             return
         
+        self._mostrar_figura(self.figura_volatilidade_semana(), 'grafico_volatilidade_semana')
+    
+    @cronometrar('figura_volatilidade_mes')
+    def figura_volatilidade_mes(self):
+        """Monta a figura da opção 3 (sem exibir)"""
+        if self.dados_acao is None:
+            return None
+        
         volatilidade = self.calcular_volatilidade(7)
         
         # Últimos 30 dias
         volatilidade_mes = volatilidade.tail(30)
         
+        from decimacao import plotar_decimado
+        
+        plt = _pyplot()
         fig, ax = plt.subplots(figsize=(14, 8))
-        ax.plot(volatilidade_mes.index, volatilidade_mes.values, 
-               linewidth=2, color='orange')
-        ax.fill_between(volatilidade_mes.index, volatilidade_mes.values, 
-                       alpha=0.3, color='orange')
+        # Linha e área decimadas para a largura do eixo (o zoom busca o detalhe)
+        plotar_decimado(ax, volatilidade_mes, preencher=dict(alpha=0.3, color='orange'),
+                        linewidth=2, color='orange')
         
         # Adicionar interatividade
         self.adicionar_interatividade(ax, volatilidade_mes, formato_valor=":.2f", sufixo="%")
@@ -303,9 +701,6 @@ class AnalisadorB3:
         ax.set_ylabel('Volatilidade (%)')
         ax.grid(True, alpha=0.3)
         
-        # Melhorar formatação das datas
-        fig.autofmt_xdate()
-        
         # Destacar valores máximo e mínimo
         val_max = volatilidade_mes.max()
         val_min = volatilidade_mes.min()
@@ -326,31 +721,30 @@ class AnalisadorB3:
                    bbox=dict(boxstyle='round,pad=0.3', fc='green', alpha=0.7),
                    arrowprops=dict(arrowstyle='->', color='green'))
         
-        plt.tight_layout()
-        plt.show()
-        self.aguardar_fechamento_grafico()
+        self._ajustar_layout(fig, datas=True)
+        return fig
     
-    def grafico_retorno_semanal(self):
-        """Opção 4: Gráfico de retorno semanal"""
+    def grafico_volatilidade_mes(self):
+        """Opção 3: Gráfico de volatilidade do último mês"""
         if self.dados_acao is None:
             print("Nenhuma ação carregada!")
             return
         
-        retornos_diarios, retornos_semanais = self.calcular_retornos()
-        
-        # Últimas 4 semanas de retornos diários
-        retornos_4_semanas = retornos_diarios.tail(28)
-        
-        fig, ax = plt.subplots(figsize=(14, 8))
+        self._mostrar_figura(self.figura_volatilidade_mes(), 'grafico_volatilidade_mes')
+    
+    def _barras_retorno(self, ax, retornos, formato_data='%d/%m'):
+        """Barras verdes/vermelhas de retornos (%) com valores e interatividade"""
+        from decimacao import LIMITE_ROTULOS
         
         # Cores para barras (verde para positivo, vermelho para negativo)
-        cores = ['green' if x >= 0 else 'red' for x in retornos_4_semanas]
+        cores = ['green' if x >= 0 else 'red' for x in retornos]
         
-        bars = ax.bar(range(len(retornos_4_semanas)), retornos_4_semanas.values, 
+        bars = ax.bar(range(len(retornos)), retornos.values, 
                      color=cores, alpha=0.7, edgecolor='black', linewidth=0.5)
         
-        # Adicionar valores nas barras
-        for i, (bar, valor) in enumerate(zip(bars, retornos_4_semanas.values)):
+        # Adicionar valores nas barras (só com poucas barras)
+        rotulos = zip(bars, retornos.values) if len(bars) <= LIMITE_ROTULOS else []
+        for i, (bar, valor) in enumerate(rotulos):
             altura = bar.get_height()
             ax.annotate(f'{valor:.1f}%',
                        xy=(bar.get_x() + bar.get_width()/2, altura),
@@ -360,76 +754,81 @@ class AnalisadorB3:
                        fontsize=7, rotation=90 if abs(altura) > 3 else 0)
         
         # Adicionar interatividade para barras
-        def on_hover_bars(event):
-            if event.inaxes == ax and event.xdata is not None:
-                idx = int(round(event.xdata))
-                if 0 <= idx < len(retornos_4_semanas):
-                    # Remover anotações anteriores
-                    for child in ax.get_children():
-                        if hasattr(child, 'get_text') and child.get_text().startswith('📊'):
-                            child.remove()
-                    
-                    valor = retornos_4_semanas.iloc[idx]
-                    data = retornos_4_semanas.index[idx]
-                    
-                    ax.annotate(f'📊 {data.strftime("%d/%m/%Y")}\nRetorno: {valor:.2f}%',
-                              xy=(idx, valor),
-                              xytext=(10, 10),
-                              textcoords='offset points',
-                              bbox=dict(boxstyle='round,pad=0.5', fc='yellow', alpha=0.8),
-                              arrowprops=dict(arrowstyle='->', connectionstyle='arc3,rad=0'),
-                              fontsize=9)
-                    plt.draw()
-        
-        plt.connect('motion_notify_event', on_hover_bars)
-        
-        ax.set_title(f'Retornos Diários - Últimas 4 Semanas\n{self.nome_empresa} ({self.acao_atual})', 
-                    fontsize=14, pad=20)
-        ax.set_xlabel('Dias')
+        self.adicionar_interatividade(ax, retornos, formato_valor=":.2f",
+                                      prefixo="Retorno: ", sufixo="%",
+                                      posicoes=list(range(len(retornos))))
+        
         ax.set_ylabel('Retorno (%)')
         ax.axhline(y=0, color='black', linestyle='-', alpha=0.3)
         ax.grid(True, alpha=0.3, axis='y')
         
         # Configurar eixo x com algumas datas
-        step = max(1, len(retornos_4_semanas) // 10)
-        indices = list(range(0, len(retornos_4_semanas), step))
-        labels = [retornos_4_semanas.index[i].strftime('%d/%m') for i in indices]
+        step = max(1, len(retornos) // 10)
+        indices = list(range(0, len(retornos), step))
+        labels = [retornos.index[i].strftime(formato_data) for i in indices]
         ax.set_xticks(indices)
         ax.set_xticklabels(labels, rotation=45)
+    
+    @cronometrar('figura_retorno_semanal')
+    def figura_retorno_semanal(self):
+        """Monta a figura da opção 4 (sem exibir)"""
+        if self.dados_acao is None:
+            return None
         
-        plt.tight_layout()
-        plt.show()
-        self.aguardar_fechamento_grafico()
+        # Retornos de fechamento a fechamento de cada semana (a semana atual é parcial)
+        _, retornos_semanais = self.calcular_retornos()
+        
+        plt = _pyplot()
+        fig, ax = plt.subplots(figsize=(14, 8))
+        self._barras_retorno(ax, retornos_semanais, '%d/%m/%y')
+        
+        ax.set_title(f'Retornos Semanais - Período Completo\n{self.nome_empresa} ({self.acao_atual})', 
+                    fontsize=14, pad=20)
+        ax.set_xlabel('Semana (último dia)')
+        
+        self._ajustar_layout(fig)
+        return fig
     
-    def grafico_retorno_mensal(self):
-        """Opção 5: Gráfico de retorno mensal"""
+    def grafico_retorno_semanal(self):
+        """Opção 4: Gráfico de retorno semanal"""
         if self.dados_acao is None:
             print("Nenhuma ação carregada!")
             return
         
-        # Calcular retorno acumulado do período
-        precos = self.dados_acao['Close']
-        retorno_acumulado = (precos / precos.iloc[0] - 1) * 100
+        self._mostrar_figura(self.figura_retorno_semanal(), 'grafico_retorno_semanal')
+    
+    @cronometrar('figura_retorno_mensal')
+    def figura_retorno_mensal(self):
+        """Monta a figura da opção 5 (sem exibir)"""
+        if self.dados_acao is None:
+            return None
         
-        fig, ax = plt.subplots(figsize=(14, 8))
-        line = ax.plot(retorno_acumulado.index, retorno_acumulado.values, 
-                      linewidth=3, color='blue', marker='o', markersize=3, alpha=0.8)
-        ax.fill_between(retorno_acumulado.index, retorno_acumulado.values, 
-                       alpha=0.2, color='blue')
+        # Retorno de cada mês (fechamento a fechamento) e retorno acumulado do período
+        retornos_mensais = self.calcular_agregado('ME')['Retorno'].dropna()
+        retorno_acumulado = self.calcular_retorno_acumulado()
+        
+        from decimacao import plotar_decimado
+        
+        plt = _pyplot()
+        fig, (ax_meses, ax) = plt.subplots(2, 1, figsize=(14, 10), height_ratios=(2, 3))
+        
+        self._barras_retorno(ax_meses, retornos_mensais, '%m/%Y')
+        ax_meses.set_title(f'Retornos Mensais\n{self.nome_empresa} ({self.acao_atual})', 
+                          fontsize=14, pad=20)
+        
+        # Histórico longo/intraday: desenha só os pontos necessários (mín/máx exatos preservados)
+        plotar_decimado(ax, retorno_acumulado, preencher=dict(alpha=0.2, color='blue'),
+                        linewidth=3, color='blue', marker='o', markersize=3, alpha=0.8)
         
         # Adicionar interatividade
         self.adicionar_interatividade(ax, retorno_acumulado, formato_valor=":.2f", sufixo="%")
         
-        ax.set_title(f'Retorno Acumulado - Período Completo\n{self.nome_empresa} ({self.acao_atual})', 
-                    fontsize=14, pad=20)
+        ax.set_title('Retorno Acumulado - Período Completo', fontsize=14, pad=20)
         ax.set_xlabel('Data')
         ax.set_ylabel('Retorno Acumulado (%)')
         ax.axhline(y=0, color='black', linestyle='--', alpha=0.5)
         ax.grid(True, alpha=0.3)
         
-        # Melhorar formatação das datas
-        fig.autofmt_xdate()
-        
         # Destacar valores importantes
         retorno_final = retorno_acumulado.iloc[-1]
         retorno_max = retorno_acumulado.max()
@@ -464,9 +863,290 @@ class AnalisadorB3:
                        bbox=dict(boxstyle='round,pad=0.3', fc='red', alpha=0.7),
                        arrowprops=dict(arrowstyle='->', color='red'))
         
-        plt.tight_layout()
+        self._ajustar_layout(fig, datas=True)
+        return fig
+    
+    def grafico_retorno_mensal(self):
+        """Opção 5: Gráfico de retorno mensal"""
+        if self.dados_acao is None:
+            print("Nenhuma ação carregada!")
+            return
+        
+        self._mostrar_figura(self.figura_retorno_mensal(), 'grafico_retorno_mensal')
+    
+    @cronometrar('figura_indicador')
+    def figura_indicador(self, nome):
+        """Monta a figura de um indicador técnico (GRAFICOS_INDICADORES) sem exibir
+        
+        Médias e Bollinger são desenhadas sobre o preço; RSI, MACD, ATR e OBV em um
+        painel abaixo do preço, com o mesmo eixo de datas.
+        """
+        if self.dados_acao is None:
+            return None
+        
+        from decimacao import plotar_decimado
+        
+        titulo, especificacoes = GRAFICOS_INDICADORES[nome]
+        indicadores = self.calcular_indicadores(especificacoes)
+        fechamento = self.dados_acao['Close']
+        especificacao = especificacoes[0]
+        
+        plt = _pyplot()
+        if nome in ('medias', 'bollinger'):
+            fig, ax_preco = plt.subplots(figsize=(14, 8))
+            ax = ax_preco
+        else:
+            fig, (ax_preco, ax) = plt.subplots(2, 1, figsize=(14, 10), sharex=True, height_ratios=(3, 2))
+        
+        plotar_decimado(ax_preco, fechamento, linewidth=1.5, color='gray', label='Fechamento')
+        
+        if nome == 'medias':
+            for especificacao, cor in zip(especificacoes, ('blue', 'orange')):
+                plotar_decimado(ax, indicadores[especificacao].dropna(), linewidth=2, color=cor,
+                                label=especificacao.upper())
+            principal, formato = fechamento, ":.2f"
+        
+        elif nome == 'bollinger':
+            media = indicadores[f'{especificacao}_media'].dropna()
+            superior = indicadores[f'{especificacao}_superior'].dropna()
+            inferior = indicadores[f'{especificacao}_inferior'].dropna()
+            ax.fill_between(superior.index, inferior.values, superior.values, color='purple', alpha=0.1)
+            plotar_decimado(ax, media, linewidth=1.5, color='purple', label='Média (20)')
+            plotar_decimado(ax, superior, linewidth=1, color='purple', linestyle='--', label='Banda superior')
+            plotar_decimado(ax, inferior, linewidth=1, color='purple', linestyle='--', label='Banda inferior')
+            principal, formato = fechamento, ":.2f"
+        
+        elif nome == 'rsi':
+            principal, formato = indicadores[especificacao].dropna(), ":.1f"
+            plotar_decimado(ax, principal, linewidth=1.5, color='purple', label=especificacao.upper())
+            ax.axhline(y=70, color='red', linestyle='--', alpha=0.6)
+            ax.axhline(y=30, color='green', linestyle='--', alpha=0.6)
+            ax.set_ylim(0, 100)
+        
+        elif nome == 'macd':
+            principal, formato = indicadores[especificacao].dropna(), ":.3f"
+            sinal = indicadores[f'{especificacao}_sinal'].dropna()
+            histograma = indicadores[f'{especificacao}_histograma'].dropna()
+            # Histograma como área em degraus (barras seriam caras em séries longas)
+            ax.fill_between(histograma.index, histograma.values, 0, step='mid',
+                            where=histograma.values >= 0, color='green', alpha=0.4)
+            ax.fill_between(histograma.index, histograma.values, 0, step='mid',
+                            where=histograma.values < 0, color='red', alpha=0.4)
+            plotar_decimado(ax, principal, linewidth=1.5, color='blue', label='MACD')
+            plotar_decimado(ax, sinal, linewidth=1.5, color='orange', label='Sinal')
+            ax.axhline(y=0, color='black', linestyle='--', alpha=0.5)
+        
+        else:
+            principal = indicadores[especificacao].dropna()
+            formato = ":.2f" if nome == 'atr' else ":,.0f"
+            plotar_decimado(ax, principal, linewidth=1.5, color='teal', label=especificacao.upper())
+        
+        # Adicionar interatividade
+        self.adicionar_interatividade(ax, principal, formato_valor=formato)
+        
+        ax_preco.set_title(f'{titulo}\n{self.nome_empresa} ({self.acao_atual})', fontsize=14, pad=20)
+        ax_preco.set_ylabel('Preço (R$)')
+        if ax is not ax_preco:
+            ax.set_ylabel(especificacao.upper())
+        ax.set_xlabel('Data')
+        for eixo in ([ax_preco] if ax is ax_preco else [ax_preco, ax]):
+            eixo.grid(True, alpha=0.3)
+            eixo.legend(loc='upper left')
+        
+        self._ajustar_layout(fig, datas=True)
+        return fig
+    
+    def grafico_indicador(self, nome):
+        """Opções 7 em diante: gráfico de um indicador técnico"""
+        if self.dados_acao is None:
+            print("Nenhuma ação carregada!")
+            return
+        
+        self._mostrar_figura(self.figura_indicador(nome), f'grafico_indicador_{nome}')
+    
+    def carregar_varios(self, codigos):
+        """Carrega vários tickers em paralelo (reaproveitando o pré-carregamento); ignora falhas"""
+        futuros = {codigo: self._carregar_em_segundo_plano(codigo) for codigo in codigos}
+        dados_por_ticker = {}
+        for codigo, futuro in futuros.items():
+            try:
+                dados = futuro.result()
+                if dados is not None and len(dados):
+                    dados_por_ticker[codigo] = dados
+            except Exception as e:
+                print(f"❌ {codigo}: {e}")
+        return dados_por_ticker
+    
+    @cronometrar('figura_correlacao')
+    def figura_correlacao(self, codigos=None, janela=60, alinhamento='ffill'):
+        """Monta o mapa de calor de correlação dos retornos diários e a correlação média móvel"""
+        from metricas import montar_matriz
+        from correlacao import alinhar_retornos, correlacao_covariancia, correlacao_media_movel
+        
+        codigos = codigos or self.codigos_padrao()
+        dados_por_ticker = self.carregar_varios(codigos)
+        if len(dados_por_ticker) < 2:
+            return None
+        
+        # Ações e BDRs podem ter fusos diferentes: compara pela data do pregão
+        fechamento = montar_matriz({
+            codigo: dados.set_axis(dados.index.tz_localize(None).normalize()
+                                   if dados.index.tz is not None else dados.index.normalize())
+            for codigo, dados in dados_por_ticker.items()
+        })
+        retornos = alinhar_retornos(fechamento, alinhamento)
+        correlacao, _ = correlacao_covariancia(retornos)
+        media_movel = correlacao_media_movel(retornos, janela)
+        
+        plt = _pyplot()
+        fig, (ax, ax_movel) = plt.subplots(1, 2, figsize=(18, 8), gridspec_kw={'width_ratios': [3, 2]})
+        rotulos = [codigo.replace('.SA', '') for codigo in correlacao.columns]
+        
+        imagem = ax.imshow(correlacao.to_numpy(), cmap='RdBu_r', vmin=-1, vmax=1)
+        fig.colorbar(imagem, ax=ax, fraction=0.046, pad=0.04, label='Correlação')
+        ax.set_xticks(range(len(rotulos)))
+        ax.set_xticklabels(rotulos, rotation=90, fontsize=8)
+        ax.set_yticks(range(len(rotulos)))
+        ax.set_yticklabels(rotulos, fontsize=8)
+        ax.set_title('Correlação dos Retornos Diários', fontsize=14, pad=20)
+        
+        # Valores nas células (apenas para universos pequenos)
+        if len(rotulos) <= 25:
+            for i in range(len(rotulos)):
+                for j in range(len(rotulos)):
+                    valor = correlacao.iat[i, j]
+                    if valor == valor:  # não é NaN
+                        ax.text(j, i, f'{valor:.1f}', ha='center', va='center', fontsize=6,
+                                color='white' if abs(valor) > 0.6 else 'black')
+        
+        ax_movel.plot(media_movel.index, media_movel.values, linewidth=2, color='purple')
+        ax_movel.set_title(f'Correlação Média Entre Pares\n(janela móvel de {janela} dias)', fontsize=14, pad=20)
+        ax_movel.set_xlabel('Data')
+        ax_movel.set_ylabel('Correlação média')
+        ax_movel.grid(True, alpha=0.3)
+        
+        self.adicionar_interatividade(ax_movel, media_movel, formato_valor=":.2f")
+        
+        self._ajustar_layout(fig, datas=True)
+        return fig
+    
+    def grafico_correlacao(self, codigos=None):
+        """Mostra a correlação entre as empresas brasileiras e estrangeiras"""
+        print("\n📥 Carregando dados de todas as empresas...")
+        fig = self.figura_correlacao(codigos)
+        if fig is None:
+            print("São necessárias pelo menos duas empresas com dados!")
+            input("Pressione Enter para continuar...")
+            return
+        
+        self._mostrar_figura(fig, 'grafico_correlacao')
+    
+    def _incorporar_cotacoes(self, cotacoes):
+        """Atualiza (ou acrescenta) as barras do intervalo atual com as cotações ao vivo
+        
+        As cotações não trazem volume: as barras novas ficam com Volume NaN (o OBV e as
+        médias de volume as ignoram) até a próxima atualização completa do cache.
+        """
+        import pandas as pd
+        from agregados import inicio_do_periodo_de
+        from provedores import duracao_barra
+        
+        if not cotacoes:
+            return
+        
+        dados = self.dados_acao.copy()
+        fuso = dados.index.tz
+        
+        def inicio_da_barra(momento):
+            """Início da barra do intervalo que contém `momento` (intraday: a partir da última barra)"""
+            if self.intervalo.endswith('wk'):
+                return inicio_do_periodo_de(momento, 'W')
+            if self.intervalo.endswith('mo'):
+                return inicio_do_periodo_de(momento, 'ME')
+            if self.intervalo.endswith('d'):
+                return momento.normalize()
+            duracao = duracao_barra(self.intervalo)
+            return dados.index[-1] + (momento - dados.index[-1]) // duracao * duracao
+        
+        # Preços de cada barra, na ordem em que chegaram (cotações anteriores à última barra são ignoradas)
+        precos_por_barra = {}
+        for momento, preco in cotacoes:
+            momento = pd.Timestamp(momento)
+            if fuso is not None:
+                momento = momento.tz_convert(fuso) if momento.tz is not None else momento.tz_localize(fuso)
+            barra = inicio_da_barra(momento)
+            if barra >= dados.index[-1]:
+                precos_por_barra.setdefault(barra, []).append(float(preco))
+        
+        for barra, precos in precos_por_barra.items():
+            if barra in dados.index:
+                dados.loc[barra, 'Close'] = precos[-1]
+                dados.loc[barra, 'High'] = max(dados.loc[barra, 'High'], max(precos))
+                dados.loc[barra, 'Low'] = min(dados.loc[barra, 'Low'], min(precos))
+            else:
+                nova = {coluna: 0.0 for coluna in dados.columns}
+                nova.update({'Open': precos[0], 'High': max(precos), 'Low': min(precos),
+                             'Close': precos[-1], 'Volume': float('nan')})
+                dados.loc[barra] = [nova[coluna] for coluna in dados.columns]
+        
+        self._invalidar_series(self.acao_atual, dados)
+        self.dados_acao = dados
+    
+    def modo_ao_vivo(self, intervalo_s=60):
+        """Opção 6: Acompanha a ação ao vivo (métricas e gráfico atualizados a cada cotação)"""
+        if self.dados_acao is None:
+            print("Nenhuma ação carregada!")
+            return
+        
+        import matplotlib.dates
+        from tempo_real import EstadoTempoReal, acompanhar, criar_fonte
+        
+        plt = _pyplot()
+        fechamentos = self.dados_acao['Close']
+        estado = EstadoTempoReal(fechamentos.to_numpy(), fechamentos.index[-1])
+        
+        fig, ax = plt.subplots(figsize=(14, 8))
+        linha, = ax.plot([], [], linewidth=2, color='blue')
+        ax.xaxis_date(tz=fechamentos.index.tz)
+        texto = ax.text(0.01, 0.98, "Aguardando cotações...", transform=ax.transAxes,
+                        va='top', family='monospace',
+                        bbox=dict(boxstyle='round,pad=0.5', fc='lightyellow', alpha=0.9))
+        ax.set_title(f'Ao Vivo - Cotações Intraday\n{self.nome_empresa} ({self.acao_atual})',
+                    fontsize=14, pad=20)
+        ax.set_xlabel('Horário')
+        ax.set_ylabel('Preço (R$)')
+        ax.grid(True, alpha=0.3)
+        fig.autofmt_xdate()
         plt.show()
-        self.aguardar_fechamento_grafico()
+        
+        print("\n📡 Modo ao vivo: métricas atualizadas a cada cotação")
+        print("  Feche a janela do gráfico (ou Ctrl+C) para voltar ao menu...")
+        
+        def ao_atualizar(metricas):
+            if not plt.fignum_exists(fig.number):
+                return False
+            if metricas is not None:
+                momentos, precos = zip(*estado.cotacoes)
+                linha.set_data(matplotlib.dates.date2num(momentos), precos)
+                ax.relim()
+                ax.autoscale_view()
+                texto.set_text(
+                    f"Preço:             R$ {metricas['preco']:.2f}\n"
+                    f"Retorno do dia:    {metricas['retorno_dia']:+.2f}%\n"
+                    f"Volatilidade 7d:   {metricas['volatilidade_7']:.2f}%\n"
+                    f"Volatilidade 30d:  {metricas['volatilidade_30']:.2f}%\n"
+                    f"Retorno acumulado: {metricas['retorno_acumulado']:+.2f}%"
+                )
+                fig.canvas.draw_idle()
+            plt.pause(0.05)
+            return True
+        
+        fonte = criar_fonte(self.acao_atual, self.cache.provedor, intervalo_s=intervalo_s)
+        acompanhar(estado, fonte, ao_atualizar)
+        plt.close(fig)
+        
+        self._incorporar_cotacoes(list(estado.cotacoes))
+        print("✅ Modo ao vivo encerrado. Continuando...")
     
     def menu_acao(self):
         """Menu específico de uma ação"""
@@ -480,6 +1160,11 @@ class AnalisadorB3:
             print("3 - Gráfico de volatilidade do último mês")
             print("4 - Gráfico de retorno semanal")
             print("5 - Gráfico de retorno mensal")
+            print("6 - Modo ao vivo (cotações intraday)")
+            for num, (titulo, _) in enumerate(GRAFICOS_INDICADORES.values(), 7):
+                print(f"{num} - Gráfico de indicador: {titulo}")
+            opcao_exportar = str(7 + len(GRAFICOS_INDICADORES))
+            print(f"{opcao_exportar} - Exportar dados da ação (Parquet/CSV/Excel)")
             print("r - Retornar ao menu anterior")
             print("s - Sair/fechar aplicação")
             print("="*60)
@@ -502,57 +1187,195 @@ class AnalisadorB3:
             elif opcao == '5':
                 self.grafico_retorno_mensal()
                 
+            elif opcao == '6':
+                self.modo_ao_vivo()
+                
+            elif opcao.isdigit() and 7 <= int(opcao) < 7 + len(GRAFICOS_INDICADORES):
+                self.grafico_indicador(list(GRAFICOS_INDICADORES)[int(opcao) - 7])
+                
+            elif opcao == opcao_exportar:
+                self.exportar_dados([self.acao_atual], atualizar=False)
+                input("\nPressione Enter para continuar...")
+                
             elif opcao == 'r':
                 return
                 
             elif opcao == 's':
-                print("Encerrando aplicação...")
-                sys.exit()
+                self.sair()
                 
             else:
                 print("Opção inválida!")
                 input("Pressione Enter para continuar...")
     
-    def menu_empresas(self, tipo='brasileiras'):
-        """Menu das 10 maiores empresas (brasileiras ou estrangeiras)"""
-        empresas = self.empresas_brasileiras if tipo == 'brasileiras' else self.empresas_estrangeiras
-        titulo = "BRASILEIRAS" if tipo == 'brasileiras' else "ESTRANGEIRAS"
+    def menu_empresas(self, tipo='acao'):
+        """Lista paginada do universo de um tipo (acao, bdr, etf, fii)"""
+        from universo import TIPOS
+        
+        self.menu_lista(f"🏢 {TIPOS.get(tipo, tipo).upper()} LISTADOS NA B3", self.universo.por_tipo(tipo))
+    
+    def menu_lista(self, titulo, empresas):
+        """Lista paginada de empresas do universo: escolha pelo número, troca de página e busca"""
+        pagina, pagina_carregada = 0, None
+        total_paginas = max(1, -(-len(empresas) // TAMANHO_PAGINA))
         
         while True:
+            visiveis = empresas[pagina * TAMANHO_PAGINA:(pagina + 1) * TAMANHO_PAGINA]
+            if pagina != pagina_carregada:
+                # Baixa a página exibida em segundo plano enquanto o usuário escolhe
+                self.pre_carregar([empresa.codigo for empresa in visiveis])
+                pagina_carregada = pagina
+            
             self.limpar_tela()
             print("="*60)
-            print(f"🏢 10 MAIORES EMPRESAS {titulo} LISTADAS NA B3")
+            print(titulo)
+            print(f"Página {pagina + 1}/{total_paginas} ({len(empresas)} tickers)")
             print("="*60)
             
-            for num, (nome, codigo) in empresas.items():
-                print(f"{num:2d} - {nome} ({codigo})")
+            for num, empresa in enumerate(visiveis, 1):
+                print(f"{num:2d} - {self.status_carregamento(empresa.codigo)} "
+                      f"{empresa.nome} ({empresa.codigo}) · {empresa.setor}")
             
-            print("r  - Retornar ao menu principal")
+            print("     (✅ carregado  🕒 dados antigos do cache  ⏳ carregando em segundo plano  ❌ erro)")
+            if pagina + 1 < total_paginas:
+                print("p  - Próxima página")
+            if pagina > 0:
+                print("a  - Página anterior")
+            print("/texto - Buscar por ticker, nome ou setor")
+            print("r  - Retornar ao menu anterior")
             print("s  - Sair/fechar aplicação")
             print("="*60)
             
             opcao = input("👉 Escolha uma opção: ").lower().strip()
             
-            if opcao in ['1', '2', '3', '4', '5', '6', '7', '8', '9', '10']:
-                num_opcao = int(opcao)
-                nome_empresa, codigo_acao = empresas[num_opcao]
+            if opcao.isdigit() and 1 <= int(opcao) <= len(visiveis):
+                empresa = visiveis[int(opcao) - 1]
                 
-                if self.baixar_dados_acao(codigo_acao, nome_empresa):
+                if self.baixar_dados_acao(empresa.codigo, empresa.nome):
                     self.menu_acao()
                 else:
                     input("Erro ao carregar dados. Pressione Enter para continuar...")
                     
+            elif opcao == 'p' and pagina + 1 < total_paginas:
+                pagina += 1
+                
+            elif opcao == 'a' and pagina > 0:
+                pagina -= 1
+                
+            elif opcao.startswith('/') and opcao[1:].strip():
+                self.menu_busca(opcao[1:])
+                
+            elif opcao == 'r':
+                return
+                
+            elif opcao == 's':
+                self.sair()
+                
+            else:
+                print("Opção inválida!")
+                input("Pressione Enter para continuar...")
+    
+    def menu_busca(self, texto=None):
+        """Busca no universo por prefixo do ticker, do nome ou do setor"""
+        if texto is None:
+            texto = input("🔎 Ticker, nome ou setor: ").strip()
+        if not texto:
+            return
+        
+        resultados = self.universo.buscar(texto)
+        if not resultados:
+            print(f"Nenhum ticker encontrado para '{texto}'.")
+            input("Pressione Enter para continuar...")
+            return
+        self.menu_lista(f"🔎 BUSCA: {texto}", resultados)
+    
+    def menu_setores(self):
+        """Navega pelo universo por tipo (ações, BDRs, ETFs, FIIs) e setor"""
+        from universo import TIPOS
+        
+        while True:
+            self.limpar_tela()
+            print("="*60)
+            print("🗂️  NAVEGAR POR TIPO E SETOR")
+            print("="*60)
+            
+            tipos = self.universo.tipos()
+            for num, (tipo, quantidade) in enumerate(tipos, 1):
+                print(f"{num:2d} - {TIPOS.get(tipo, tipo)} ({quantidade})")
+            
+            print("r  - Retornar ao menu principal")
+            print("s  - Sair/fechar aplicação")
+            print("="*60)
+            
+            opcao = input("👉 Escolha uma opção: ").lower().strip()
+            
+            if opcao.isdigit() and 1 <= int(opcao) <= len(tipos):
+                self._menu_setores_do_tipo(tipos[int(opcao) - 1][0])
+                
             elif opcao == 'r':
                 return
                 
             elif opcao == 's':
-                print("Encerrando aplicação...")
-                sys.exit()
+                self.sair()
                 
             else:
                 print("Opção inválida!")
                 input("Pressione Enter para continuar...")
     
+    def _menu_setores_do_tipo(self, tipo):
+        """Setores de um tipo; a escolha abre a lista paginada do setor"""
+        from universo import TIPOS
+        
+        setores = self.universo.setores(tipo)
+        while True:
+            self.limpar_tela()
+            print("="*60)
+            print(f"🗂️  {TIPOS.get(tipo, tipo).upper()} POR SETOR")
+            print("="*60)
+            print(f" 0 - Todos ({sum(quantidade for _, quantidade in setores)})")
+            for num, (setor, quantidade) in enumerate(setores, 1):
+                print(f"{num:2d} - {setor} ({quantidade})")
+            print("r  - Retornar")
+            print("="*60)
+            
+            opcao = input("👉 Escolha uma opção: ").lower().strip()
+            
+            if opcao == '0':
+                self.menu_empresas(tipo)
+                
+            elif opcao.isdigit() and 1 <= int(opcao) <= len(setores):
+                setor = setores[int(opcao) - 1][0]
+                empresas = [e for e in self.universo.por_setor(setor) if e.tipo == tipo]
+                self.menu_lista(f"🗂️  {TIPOS.get(tipo, tipo).upper()} · {setor.upper()}", empresas)
+                
+            elif opcao == 'r':
+                return
+                
+            else:
+                print("Opção inválida!")
+                input("Pressione Enter para continuar...")
+    
+    def menu_configurar_historico(self):
+        """Permite escolher o período e o intervalo dos dados carregados"""
+        self.limpar_tela()
+        print("="*60)
+        print("⚙️  CONFIGURAR HISTÓRICO")
+        print("="*60)
+        print(f"Atual: período {self.periodo}, intervalo {self.intervalo}")
+        print(f"Períodos: {', '.join(PERIODOS_VALIDOS)}")
+        print(f"Intervalos: {', '.join(INTERVALOS_VALIDOS)}")
+        print("(Enter mantém o valor atual)")
+        print("="*60)
+        
+        periodo = input("Período: ").lower().strip() or self.periodo
+        intervalo = input("Intervalo: ").lower().strip() or self.intervalo
+        
+        if periodo not in PERIODOS_VALIDOS or intervalo not in INTERVALOS_VALIDOS:
+            print("Opção inválida!")
+        else:
+            self.periodo, self.intervalo = periodo, intervalo
+            print(f"✅ Histórico configurado: período {periodo}, intervalo {intervalo}")
+        input("Pressione Enter para continuar...")
+    
     def menu_principal(self):
         """Menu principal da aplicação"""
         while True:
@@ -560,22 +1383,47 @@ class AnalisadorB3:
             print("="*60)
             print("SISTEMA DE ANÁLISE FINANCEIRA B3")
             print("="*60)
-            print("1 - Listar as 10 maiores empresas brasileiras listadas na B3")
-            print("2 - Listar as 10 maiores empresas estrangeiras listadas na B3")  
+            print("1 - Listar as ações brasileiras listadas na B3")
+            print("2 - Listar as empresas estrangeiras (BDRs) listadas na B3")
+            print("3 - Atualizar dados de todas as empresas (download em lote)")
+            print(f"4 - Configurar histórico (atual: {self.periodo}, {self.intervalo})")
+            print("5 - Correlação entre as empresas (brasileiras e estrangeiras)")
+            print("6 - Buscar por ticker, nome ou setor")
+            print("7 - Navegar por tipo (ações, BDRs, ETFs, FIIs) e setor")
+            print("8 - Exportar dados das empresas em destaque (Parquet/CSV/Excel)")
             print("s - Sair/fechar aplicação")
             print("="*60)
             
             opcao = input("Escolha uma opção: ").lower().strip()
             
             if opcao == '1':
-                self.menu_empresas('brasileiras')
+                self.menu_empresas('acao')
                 
             elif opcao == '2':
-                self.menu_empresas('estrangeiras')
+                self.menu_empresas('bdr')
+                
+            elif opcao == '3':
+                self.aquecer_cache()
+                input("\nPressione Enter para continuar...")
+                
+            elif opcao == '4':
+                self.menu_configurar_historico()
+                
+            elif opcao == '5':
+                self.grafico_correlacao()
+                
+            elif opcao == '6':
+                self.menu_busca()
+                
+            elif opcao == '7':
+                self.menu_setores()
+                
+            elif opcao == '8':
+                self.exportar_dados()
+                input("\nPressione Enter para continuar...")
                 
             elif opcao == 's':
-                print("👋 Encerrando aplicação...")
-                sys.exit()
+                self.sair("👋 Encerrando aplicação...")
                 
             else:
                 print("Opção inválida!")
@@ -585,24 +1433,16 @@ class AnalisadorB3:
         """Executa o sistema"""
         try:
             print("Iniciando Sistema de Análise Financeira B3...")
-            print("Configurando interface gráfica...")
-            
-            # Teste rápido do matplotlib
-            plt.figure(figsize=(1,1))
-            plt.close()
-            
-            print("Interface gráfica configurada com sucesso!")
-            input("Pressione Enter para continuar...")
             
+            # A interface gráfica é configurada no primeiro gráfico (_pyplot)
             self.menu_principal()
             
         except KeyboardInterrupt:
-            print("\nAplicação interrompida pelo usuário.")
-            sys.exit()
+            self.sair("\nAplicação interrompida pelo usuário.")
         except Exception as e:
             print(f"Erro inesperado: {e}")
             input("Pressione Enter para sair...")
-            sys.exit()
+            self.sair("Encerrando aplicação...")
 
 # Executar aplicação
 if __name__ == "__main__":
@@ -0,0 +1,258 @@
+"""
+Indicadores técnicos vetorizados: SMA, EMA, RSI, MACD, Bandas de Bollinger, ATR e OBV
+Trabalha sobre matrizes datas × tickers (ou um único ticker) e calcula o conjunto pedido
+em uma passada: as séries intermediárias (fechamento anterior, variação, médias móveis,
+filtros recursivos) são calculadas uma vez e compartilhadas entre os indicadores.
+
+Os filtros recursivos (EMA, médias de Wilder do RSI/ATR, OBV) e as janelas móveis
+guardam o seu estado ao fim de cada chamada, então barras novas são processadas
+sem recalcular o histórico:
+
+    calculadora = CalculadoraIndicadores(['sma20', 'rsi14', 'macd', 'atr14'])
+    resultado = calculadora.calcular(fechamento, maximas, minimas, volume)
+    novos = calculadora.calcular(fechamento_novo, maximas_novas, minimas_novas, volume_novo)
+
+Especificações: 'sma<n>', 'ema<n>', 'rsi<n>', 'macd' ou 'macd<rápida>_<lenta>_<sinal>',
+'bollinger<n>' (2 desvios) ou 'bollinger<n>_<desvios>', 'atr<n>', 'obv'.
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+_PADRAO = re.compile(r'^(sma|ema|rsi|macd|bollinger|atr|obv)(\d+(?:\.\d+)?(?:_\d+(?:\.\d+)?)*)?$')
+
+# Parâmetros usados quando a especificação vem sem números
+PADROES = {'sma': (20,), 'ema': (20,), 'rsi': (14,), 'macd': (12, 26, 9),
+           'bollinger': (20, 2), 'atr': (14,), 'obv': ()}
+
+
+def interpretar(especificacao):
+    """'macd12_26_9' -> ('macd', (12, 26, 9)); sem números usa PADROES"""
+    encontrado = _PADRAO.match(especificacao.strip().lower())
+    if encontrado is None:
+        raise ValueError(f"Indicador desconhecido: {especificacao}")
+    tipo, numeros = encontrado.groups()
+    parametros = tuple(float(n) if '.' in n else int(n) for n in numeros.split('_')) if numeros else ()
+    parametros = parametros + PADROES[tipo][len(parametros):]
+    if tipo != 'obv' and (not parametros or parametros[0] < 1):
+        raise ValueError(f"Janela inválida em {especificacao}")
+    return tipo, parametros
+
+
+def colunas_de(especificacao):
+    """Nomes das séries produzidas por uma especificação"""
+    tipo, _ = interpretar(especificacao)
+    if tipo == 'macd':
+        return [especificacao, f'{especificacao}_sinal', f'{especificacao}_histograma']
+    if tipo == 'bollinger':
+        return [f'{especificacao}_media', f'{especificacao}_superior', f'{especificacao}_inferior']
+    return [especificacao]
+
+
+def _matriz(valores):
+    """DataFrame/Series -> ndarray float 2D (datas × tickers)"""
+    if valores is None:
+        return None
+    matriz = np.asarray(valores, dtype=float)
+    return matriz.reshape(-1, 1) if matriz.ndim == 1 else matriz
+
+
+class CalculadoraIndicadores:
+    """Calcula um conjunto de indicadores e guarda o estado para continuar com barras novas
+
+    Estado guardado entre chamadas:
+        - último fechamento válido de cada ticker (variação do primeiro dia novo)
+        - último valor de cada filtro recursivo (EMAs, médias de Wilder, OBV)
+        - as últimas (maior janela - 1) linhas de fechamento (SMA/Bollinger)
+    """
+
+    def __init__(self, especificacoes):
+        self.especificacoes = list(dict.fromkeys(e.strip().lower() for e in especificacoes))
+        self._interpretadas = [(e, *interpretar(e)) for e in self.especificacoes]
+        janelas = [p[0] for _, tipo, p in self._interpretadas if tipo in ('sma', 'bollinger')]
+        self.maior_janela = max(janelas, default=1)
+        self.reiniciar()
+
+    def reiniciar(self):
+        """Esquece o estado (a próxima chamada recomeça do zero)"""
+        self._ultimo_fechamento = None
+        self._filtros = {}
+        self._cauda = None
+        self._tickers = None
+
+    # --- Séries intermediárias (calculadas uma vez por chamada) ---
+
+    def _intermediaria(self, chave, calcular):
+        if chave not in self._passada:
+            self._passada[chave] = calcular()
+        return self._passada[chave]
+
+    def _preenchido(self):
+        """Fechamento com o último valor válido repetido, precedido do fechamento guardado"""
+        def calcular():
+            semente = self._ultimo_fechamento
+            if semente is None:
+                semente = np.full(self._fechamento.shape[1], np.nan)
+            return pd.DataFrame(np.vstack([semente, self._fechamento])).ffill().to_numpy()
+        return self._intermediaria('preenchido', calcular)
+
+    def _anterior(self):
+        """Fechamento anterior válido de cada linha (a 1ª linha usa o estado)"""
+        return self._preenchido()[:-1]
+
+    def _variacao(self):
+        return self._intermediaria('variacao', lambda: self._fechamento - self._anterior())
+
+    def _filtro(self, chave, valores, alfa):
+        """Filtro recursivo y[t] = y[t-1] + alfa·(x[t] - y[t-1]), continuando do estado
+
+        Linhas sem valor (ticker sem pregão) não entram no filtro; a saída nessas
+        linhas repete o último valor e é mascarada depois.
+        """
+        def calcular():
+            semente = self._filtros.get(chave)
+            linhas = valores if semente is None else np.vstack([semente, valores])
+            filtrado = pd.DataFrame(linhas).ewm(alpha=alfa, adjust=False, ignore_na=True).mean()
+            self._novos_filtros[chave] = filtrado.ffill().to_numpy()[-1]
+            filtrado = filtrado.to_numpy()
+            return filtrado if semente is None else filtrado[1:]
+        return self._intermediaria(chave, calcular)
+
+    def _ema(self, janela):
+        return self._filtro(('ema', janela), self._fechamento, 2.0 / (janela + 1))
+
+    def _movel(self, janela):
+        """(média, desvio padrão populacional) móveis sobre cauda guardada + linhas novas"""
+        def calcular():
+            estendido = self._fechamento if self._cauda is None else np.vstack([self._cauda, self._fechamento])
+            janelas = pd.DataFrame(estendido).rolling(janela, min_periods=janela)
+            inicio = len(estendido) - len(self._fechamento)
+            return janelas.mean().to_numpy()[inicio:], janelas.std(ddof=0).to_numpy()[inicio:]
+        return self._intermediaria(('movel', janela), calcular)
+
+    def _wilder(self, chave, valores, janela):
+        """Média de Wilder (alfa = 1/janela), usada no RSI e no ATR"""
+        return self._filtro((chave, janela), valores, 1.0 / janela)
+
+    def _amplitude_verdadeira(self):
+        def calcular():
+            if self._maximas is None or self._minimas is None:
+                raise ValueError("ATR precisa das máximas e mínimas")
+            anterior = self._anterior()
+            with np.errstate(invalid='ignore'):
+                return np.fmax(self._maximas - self._minimas,
+                               np.fmax(np.abs(self._maximas - anterior), np.abs(self._minimas - anterior)))
+        return self._intermediaria('amplitude', calcular)
+
+    # --- Indicadores ---
+
+    def _calcular_um(self, especificacao, tipo, parametros):
+        if tipo == 'sma':
+            return {especificacao: self._movel(parametros[0])[0]}
+
+        if tipo == 'ema':
+            return {especificacao: self._ema(parametros[0])}
+
+        if tipo == 'rsi':
+            janela = parametros[0]
+            variacao = self._variacao()
+            ganhos = np.where(np.isnan(variacao), np.nan, np.maximum(variacao, 0))
+            perdas = np.where(np.isnan(variacao), np.nan, np.maximum(-variacao, 0))
+            media_ganhos = self._wilder('ganhos', ganhos, janela)
+            media_perdas = self._wilder('perdas', perdas, janela)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                rsi = 100 - 100 / (1 + media_ganhos / media_perdas)
+            rsi = np.where((media_perdas == 0) & (media_ganhos > 0), 100.0, rsi)
+            return {especificacao: rsi}
+
+        if tipo == 'macd':
+            rapida, lenta, sinal = parametros
+            linha = self._ema(rapida) - self._ema(lenta)
+            # O sinal é uma EMA da linha MACD (filtro próprio, também continuado)
+            linha_sinal = self._filtro(('macd_sinal', rapida, lenta, sinal),
+                                       np.where(np.isnan(self._fechamento), np.nan, linha),
+                                       2.0 / (sinal + 1))
+            return {especificacao: linha,
+                    f'{especificacao}_sinal': linha_sinal,
+                    f'{especificacao}_histograma': linha - linha_sinal}
+
+        if tipo == 'bollinger':
+            janela, desvios = parametros[0], parametros[1]
+            media, desvio = self._movel(janela)
+            return {f'{especificacao}_media': media,
+                    f'{especificacao}_superior': media + desvios * desvio,
+                    f'{especificacao}_inferior': media - desvios * desvio}
+
+        if tipo == 'atr':
+            return {especificacao: self._wilder('atr', self._amplitude_verdadeira(), parametros[0])}
+
+        if tipo == 'obv':
+            if self._volume is None:
+                raise ValueError("OBV precisa do volume")
+            fluxo = np.nan_to_num(np.sign(self._variacao()) * self._volume)
+            semente = self._filtros.get('obv')
+            obv = np.cumsum(fluxo, axis=0) + (semente if semente is not None else 0.0)
+            self._novos_filtros['obv'] = obv[-1]
+            return {especificacao: obv}
+
+        raise ValueError(f"Indicador desconhecido: {especificacao}")
+
+    def calcular(self, fechamento, maximas=None, minimas=None, volume=None):
+        """Calcula os indicadores para as linhas recebidas; devolve {nome: DataFrame datas × tickers}
+
+        Na primeira chamada as linhas são o histórico; nas seguintes, só as barras novas
+        (as mesmas colunas/tickers, em ordem cronológica, depois da última já processada).
+        """
+        if isinstance(fechamento, pd.Series):
+            fechamento = fechamento.to_frame()
+        tickers = list(fechamento.columns)
+        if self._tickers is not None and tickers != self._tickers:
+            raise ValueError("Os tickers mudaram; use reiniciar() antes de calcular")
+
+        self._fechamento = _matriz(fechamento)
+        self._maximas = _matriz(maximas)
+        self._minimas = _matriz(minimas)
+        self._volume = _matriz(volume)
+        self._passada = {}
+        self._novos_filtros = {}
+
+        resultado = {}
+        if len(self._fechamento):
+            sem_pregao = np.isnan(self._fechamento)
+            for especificacao, tipo, parametros in self._interpretadas:
+                for nome, valores in self._calcular_um(especificacao, tipo, parametros).items():
+                    valores = np.where(sem_pregao, np.nan, valores)
+                    resultado[nome] = pd.DataFrame(valores, index=fechamento.index, columns=tickers)
+
+            # Estado para a próxima chamada
+            self._filtros.update(self._novos_filtros)
+            self._ultimo_fechamento = self._preenchido()[-1]
+            if self.maior_janela > 1:
+                estendido = self._fechamento if self._cauda is None else np.vstack([self._cauda, self._fechamento])
+                self._cauda = estendido[-(self.maior_janela - 1):]
+            self._tickers = tickers
+
+        self._fechamento = self._maximas = self._minimas = self._volume = None
+        self._passada = self._novos_filtros = None
+        return resultado
+
+
+def calcular_indicadores(fechamento, especificacoes, maximas=None, minimas=None, volume=None):
+    """Atalho sem estado: {nome: DataFrame datas × tickers} para o histórico inteiro"""
+    return CalculadoraIndicadores(especificacoes).calcular(fechamento, maximas, minimas, volume)
+
+
+def _colunas_ohlcv(dados):
+    return (dados['Close'], dados.get('High'), dados.get('Low'), dados.get('Volume'))
+
+
+def indicadores_dados(dados, especificacoes, calculadora=None):
+    """Indicadores de um ticker a partir do DataFrame OHLCV (uma coluna por série)
+
+    Com `calculadora`, continua do estado dela (passe só as barras novas).
+    """
+    calculadora = calculadora or CalculadoraIndicadores(especificacoes)
+    resultado = calculadora.calcular(*_colunas_ohlcv(dados))
+    return pd.DataFrame({nome: matriz.iloc[:, 0] for nome, matriz in resultado.items()}, index=dados.index)
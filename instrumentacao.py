@@ -0,0 +1,152 @@
+"""
+Instrumentação: tempo de cada fase, contadores e perfil opcional
+Ligada por B3_INSTRUMENTACAO=1 (ou `python StartApp.py --instrumentar`).
+
+Desligada não custa nada: o decorador devolve a própria função e `fase`,
+`contar` e `evento` são funções vazias escolhidas na importação. Por isso a
+variável de ambiente precisa estar definida antes de importar os módulos.
+
+Opcionais:
+- B3_PERFIL=arquivo.prof  grava um perfil cProfile da thread principal
+- B3_TRACE=arquivo.json   grava cada fase no formato Trace Event (chrome://tracing, Perfetto)
+"""
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ARQUIVO_PERFIL = os.environ.get('B3_PERFIL')
+ARQUIVO_TRACE = os.environ.get('B3_TRACE')
+ATIVO = bool(os.environ.get('B3_INSTRUMENTACAO') or ARQUIVO_PERFIL or ARQUIVO_TRACE)
+
+_trava = threading.Lock()
+_tempos = {}        # fase -> [chamadas, total (s), máximo (s)]
+_contadores = {}    # nome -> valor acumulado
+_eventos = {}       # nome -> [quantidade, primeiro, último] (para taxas por segundo)
+_trace = []         # eventos completos do Trace Event Format
+_perfil = None
+_INICIO = time.perf_counter()
+
+
+def _registrar_tempo(nome, inicio, duracao):
+    with _trava:
+        registro = _tempos.setdefault(nome, [0, 0.0, 0.0])
+        registro[0] += 1
+        registro[1] += duracao
+        registro[2] = max(registro[2], duracao)
+        if ARQUIVO_TRACE:
+            _trace.append({'name': nome, 'ph': 'X', 'pid': os.getpid(), 'tid': threading.get_ident(),
+                           'ts': (inicio - _INICIO) * 1e6, 'dur': duracao * 1e6})
+
+
+@contextmanager
+def _fase_ativa(nome):
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registrar_tempo(nome, inicio, time.perf_counter() - inicio)
+
+
+_NULO = nullcontext()
+
+
+def _fase_inativa(nome):
+    return _NULO
+
+
+def _contar_ativo(nome, quantidade=1):
+    with _trava:
+        _contadores[nome] = _contadores.get(nome, 0) + quantidade
+
+
+def _evento_ativo(nome):
+    agora = time.perf_counter()
+    with _trava:
+        registro = _eventos.setdefault(nome, [0, agora, agora])
+        registro[0] += 1
+        registro[2] = agora
+
+
+def _nada(*args, **kwargs):
+    pass
+
+
+# Escolhidos uma vez: desligado, cada chamada é uma função vazia
+fase = _fase_ativa if ATIVO else _fase_inativa          # with fase('nome'): ...
+contar = _contar_ativo if ATIVO else _nada              # contar('downloads'), contar('bytes', n)
+evento = _evento_ativo if ATIVO else _nada              # evento('hover.redesenhos') -> taxa por segundo
+
+
+def cronometrar(nome=None):
+    """Decorador que mede cada chamada; desligado, devolve a própria função"""
+    def decorar(funcao):
+        if not ATIVO:
+            return funcao
+        rotulo = nome or funcao.__qualname__
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = time.perf_counter()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                _registrar_tempo(rotulo, inicio, time.perf_counter() - inicio)
+        return medida
+    return decorar
+
+
+def relatorio():
+    """Texto com as fases (chamadas, total, médio, máximo), contadores e taxas"""
+    with _trava:
+        tempos = sorted(_tempos.items(), key=lambda item: -item[1][1])
+        contadores = sorted(_contadores.items())
+        eventos = sorted(_eventos.items())
+
+    linhas = ["⏱️  Instrumentação", f"   {'fase':40s} {'chamadas':>8s} {'total ms':>10s} "
+              f"{'médio ms':>10s} {'máx ms':>10s}"]
+    for nome, (chamadas, total, maximo) in tempos:
+        linhas.append(f"   {nome:40s} {chamadas:8d} {total * 1000:10.1f} "
+                      f"{total / chamadas * 1000:10.2f} {maximo * 1000:10.1f}")
+    if contadores:
+        linhas.append("   Contadores:")
+        linhas += [f"   {nome:40s} {valor:>12,}" for nome, valor in contadores]
+    if eventos:
+        linhas.append("   Taxas:")
+        for nome, (quantidade, primeiro, ultimo) in eventos:
+            duracao = ultimo - primeiro
+            taxa = f"{quantidade / duracao:10.1f}/s" if duracao > 0 else f"{'-':>12s}"
+            linhas.append(f"   {nome:40s} {quantidade:8d} {taxa}")
+    return "\n".join(linhas)
+
+
+def iniciar_perfil():
+    """Liga o cProfile na thread atual (feito na importação quando B3_PERFIL está definido)"""
+    global _perfil
+    import cProfile
+    _perfil = cProfile.Profile()
+    _perfil.enable()
+
+
+def _encerrar():
+    """Na saída do programa: imprime o relatório e grava perfil/trace"""
+    if _perfil is not None:
+        _perfil.disable()
+        _perfil.dump_stats(ARQUIVO_PERFIL)
+    print("\n" + relatorio())
+    if _perfil is not None:
+        print(f"📁 Perfil cProfile gravado em {ARQUIVO_PERFIL} (python -m pstats {ARQUIVO_PERFIL})")
+    if ARQUIVO_TRACE:
+        with _trava, open(ARQUIVO_TRACE, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': _trace}, f)
+        print(f"📁 Trace gravado em {ARQUIVO_TRACE} (abra em chrome://tracing ou ui.perfetto.dev)")
+
+
+if ATIVO:
+    atexit.register(_encerrar)
+    if ARQUIVO_PERFIL:
+        iniciar_perfil()
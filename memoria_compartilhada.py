@@ -0,0 +1,151 @@
+"""
+Matriz de preços em memória compartilhada para processos paralelos
+O processo principal grava o universo (datas + Close/High/Low/Volume em float32) uma vez
+em um bloco de multiprocessing.shared_memory; os processos de trabalho se conectam
+pelo nome do bloco e leem as matrizes sem cópia, sem serializar DataFrames.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from armazenamento_compacto import COLUNAS_COMPACTAS, TIPO_COMPACTO, PrecosCompactos
+
+# Cada matriz começa em um endereço múltiplo de 64 bytes
+ALINHAMENTO = 64
+
+# Blocos já conectados neste processo: nome -> (SharedMemory, PrecosCompactos)
+_anexados = {}
+
+
+def _layout(n_datas, n_tickers, colunas):
+    """Posição (bytes) de cada matriz no bloco e tamanho total; as datas (int64) vêm primeiro"""
+    deslocamentos = {}
+    posicao = n_datas * 8
+    for coluna in colunas:
+        posicao = -(-posicao // ALINHAMENTO) * ALINHAMENTO
+        deslocamentos[coluna] = posicao
+        posicao += n_datas * n_tickers * np.dtype(TIPO_COMPACTO).itemsize
+    return deslocamentos, max(posicao, 1)
+
+
+def _vistas(memoria, descritor, somente_leitura=False):
+    """Arrays NumPy sobre o bloco: (datas em ns, {coluna: matriz datas × tickers})"""
+    n_datas, n_tickers = descritor['n_datas'], len(descritor['tickers'])
+    datas = np.ndarray((n_datas,), dtype=np.int64, buffer=memoria.buf, offset=0)
+    matrizes = {
+        coluna: np.ndarray((n_datas, n_tickers), dtype=TIPO_COMPACTO, buffer=memoria.buf, offset=deslocamento)
+        for coluna, deslocamento in descritor['deslocamentos'].items()
+    }
+    if somente_leitura:
+        for matriz in matrizes.values():
+            matriz.flags.writeable = False
+    return datas, matrizes
+
+
+def _precos(memoria, descritor, somente_leitura=False):
+    """PrecosCompactos cujas matrizes apontam para o bloco compartilhado"""
+    datas_ns, matrizes = _vistas(memoria, descritor, somente_leitura)
+    # O índice de datas é pequeno (8 bytes por data): este sim é copiado
+    datas = pd.DatetimeIndex(datas_ns.view('datetime64[ns]')).tz_localize('UTC')
+    if descritor['fuso']:
+        datas = datas.tz_convert(descritor['fuso'])
+    else:
+        datas = datas.tz_localize(None)
+    return PrecosCompactos(datas, descritor['tickers'], matrizes)
+
+
+class PrecosCompartilhados:
+    """Dono do bloco compartilhado (processo principal); os processos usam `descritor` + anexar()
+
+    Uso:
+        with PrecosCompartilhados.de_dataframes(dados_por_ticker) as compartilhado:
+            executor.submit(funcao, compartilhado.descritor, ...)
+    """
+
+    def __init__(self, datas, tickers, colunas=COLUNAS_COMPACTAS):
+        datas = pd.DatetimeIndex(datas)
+        tickers = list(tickers)
+        deslocamentos, tamanho = _layout(len(datas), len(tickers), colunas)
+        indice = datas.tz_convert('UTC').tz_localize(None) if datas.tz is not None else datas
+        # Descritor: o que os processos precisam para se conectar (pequeno, serializável)
+        descritor = {
+            'n_datas': len(datas),
+            'tickers': tickers,
+            'deslocamentos': deslocamentos,
+            'fuso': str(datas.tz) if datas.tz is not None else None,
+        }
+
+        self.memoria = shared_memory.SharedMemory(create=True, size=tamanho)
+        try:
+            self.descritor = {'nome': self.memoria.name, **descritor}
+            datas_ns, matrizes = _vistas(self.memoria, self.descritor)
+            datas_ns[:] = indice.values.astype('datetime64[ns]').view('int64')
+            for matriz in matrizes.values():
+                matriz.fill(np.nan)
+            self.precos = PrecosCompactos(datas, tickers, matrizes)
+        except BaseException:
+            # Sem isso o bloco ficaria em /dev/shm até o próximo reinício
+            datas_ns = matrizes = None
+            self.precos = None
+            self.fechar()
+            raise
+
+    @classmethod
+    def de_dataframes(cls, dados_por_ticker):
+        """Grava {ticker: DataFrame do yfinance} direto no bloco (sem cópia intermediária)"""
+        compartilhado = cls(PrecosCompactos.datas_comuns(dados_por_ticker), dados_por_ticker)
+        try:
+            compartilhado.precos.preencher(dados_por_ticker)
+        except BaseException:
+            compartilhado.fechar()
+            raise
+        return compartilhado
+
+    @classmethod
+    def de_compactos(cls, precos):
+        """Copia um PrecosCompactos já montado para um bloco compartilhado"""
+        compartilhado = cls(precos.datas, precos.tickers, list(precos.colunas))
+        try:
+            for coluna, matriz in precos.colunas.items():
+                compartilhado.precos.colunas[coluna][:] = matriz
+        except BaseException:
+            compartilhado.fechar()
+            raise
+        return compartilhado
+
+    def memoria_bytes(self):
+        """Tamanho do bloco compartilhado"""
+        return self.memoria.size
+
+    def fechar(self):
+        """Libera o bloco (chamar depois que os processos terminarem)"""
+        if self.memoria is None:
+            return
+        self.precos = None
+        try:
+            self.memoria.close()
+        except BufferError:
+            # Ainda há arrays apontando para o bloco: o sistema libera ao descartá-los
+            pass
+        self.memoria.unlink()
+        self.memoria = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        self.fechar()
+
+
+def anexar(descritor):
+    """Conecta ao bloco (uma vez por processo) e devolve um PrecosCompactos somente leitura"""
+    nome = descritor['nome']
+    if nome not in _anexados:
+        try:
+            memoria = shared_memory.SharedMemory(name=nome, track=False)  # Python 3.13+
+        except TypeError:
+            memoria = shared_memory.SharedMemory(name=nome)
+        _anexados[nome] = (memoria, _precos(memoria, descritor, somente_leitura=True))
+    return _anexados[nome][1]
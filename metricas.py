@@ -0,0 +1,214 @@
+"""
+Motor de métricas vetorizado para vários tickers
+Trabalha sobre matrizes datas × tickers (Close, High, Low, Volume) sem laço por ticker
+"""
+
+import numpy as np
+import pandas as pd
+
+# Colunas do resultado de calcular_metricas (uma linha por ticker)
+COLUNAS_METRICAS = [
+    'preco_atual', 'preco_inicial', 'variacao_periodo', 'maior_preco', 'menor_preco',
+    'volume_medio', 'retorno_medio_diario', 'retorno_medio_semanal',
+    'volatilidade_semanal', 'volatilidade_mensal', 'ultimo_volume',
+]
+
+
+def montar_matriz(dados_por_ticker, coluna='Close'):
+    """Junta uma coluna de vários DataFrames do yfinance em uma matriz datas × tickers"""
+    matriz = pd.concat({codigo: dados[coluna] for codigo, dados in dados_por_ticker.items()}, axis=1)
+    return matriz.sort_index()
+
+
+def retornos_diarios(fechamento):
+    """Retornos diários (%) de cada ticker, ignorando as datas em que ele não negociou"""
+    anterior = fechamento.ffill().shift(1)
+    return (fechamento / anterior - 1) * 100
+
+
+def retornos_semanais(fechamento):
+    """Retornos semanais (%) a partir do último fechamento de cada semana"""
+    return retornos_diarios(fechamento.resample('W').last())
+
+
+def volatilidade_movel(retornos, janela=7):
+    """Desvio padrão móvel dos retornos (linhas sem dado do ticker contam como lacuna)"""
+    return retornos.rolling(janela, min_periods=janela).std()
+
+
+def volatilidade_final(retornos, janela=7):
+    """Desvio padrão dos últimos `janela` retornos válidos de cada ticker"""
+    validos = retornos.notna().to_numpy()
+    # Posição de cada valor contada a partir do fim (1 = último retorno válido)
+    posicao_reversa = np.cumsum(validos[::-1], axis=0)[::-1]
+    na_janela = validos & (posicao_reversa <= janela)
+
+    valores = np.where(na_janela, retornos.to_numpy(dtype=float), 0.0)
+    quantidade = na_janela.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        media = valores.sum(axis=0) / quantidade
+        desvios = np.where(na_janela, valores - media, 0.0)
+        variancia = (desvios ** 2).sum(axis=0) / (quantidade - 1)
+    variancia[quantidade < janela] = np.nan
+    return pd.Series(np.sqrt(variancia), index=retornos.columns)
+
+
+def _primeiro_valido(matriz):
+    """Primeiro valor não nulo de cada coluna"""
+    return matriz.bfill().iloc[0]
+
+
+def _ultimo_valido(matriz):
+    """Último valor não nulo de cada coluna"""
+    return matriz.ffill().iloc[-1]
+
+
+def calcular_metricas(fechamento, maximas=None, minimas=None, volume=None,
+                      janela_semanal=7, janela_mensal=30, semanais=None):
+    """Calcula as métricas do resumo para todos os tickers de uma vez (uma linha por ticker)
+
+    `semanais` aceita a matriz de retornos semanais já calculada (agregados do cache);
+    sem ela, os retornos semanais são obtidos reamostrando o fechamento.
+    """
+    fechamento = fechamento.astype(float)
+    diarios = retornos_diarios(fechamento)
+    if semanais is None:
+        semanais = retornos_semanais(fechamento)
+
+    ultimo_preco = _ultimo_valido(fechamento)
+    primeiro_preco = _primeiro_valido(fechamento)
+
+    metricas = pd.DataFrame(index=fechamento.columns, columns=COLUNAS_METRICAS, dtype=float)
+    metricas['preco_atual'] = ultimo_preco
+    metricas['preco_inicial'] = primeiro_preco
+    metricas['variacao_periodo'] = (ultimo_preco - primeiro_preco) / primeiro_preco * 100
+    metricas['maior_preco'] = (maximas if maximas is not None else fechamento).max()
+    metricas['menor_preco'] = (minimas if minimas is not None else fechamento).min()
+    metricas['retorno_medio_diario'] = diarios.mean()
+    metricas['retorno_medio_semanal'] = semanais.mean()
+    metricas['volatilidade_semanal'] = volatilidade_final(diarios, janela_semanal)
+    metricas['volatilidade_mensal'] = volatilidade_final(diarios, janela_mensal)
+
+    if volume is not None:
+        # Volume considerado apenas nas datas em que o ticker tem fechamento
+        volume = volume.where(fechamento.notna())
+        metricas['volume_medio'] = volume.mean()
+        metricas['ultimo_volume'] = _ultimo_valido(volume)
+
+    return metricas
+
+
+def calcular_metricas_dados(dados_por_ticker, **kwargs):
+    """Atalho: calcula as métricas a partir de um dicionário {ticker: DataFrame OHLCV}"""
+    return calcular_metricas(
+        montar_matriz(dados_por_ticker, 'Close'),
+        maximas=montar_matriz(dados_por_ticker, 'High'),
+        minimas=montar_matriz(dados_por_ticker, 'Low'),
+        volume=montar_matriz(dados_por_ticker, 'Volume'),
+        **kwargs
+    )
+
+
+def retornos_e_volatilidade_em_lotes(lotes, janelas=(7, 30)):
+    """Processa uma série longa pedaço a pedaço, carregando o estado entre os pedaços
+
+    Recebe um iterável de DataFrames (ex.: CachePrecos.ler_em_lotes) e devolve, para
+    cada pedaço, um DataFrame com o retorno (%) e a volatilidade móvel de cada janela.
+    Só o último fechamento e os últimos retornos (max(janelas) - 1) passam de um
+    pedaço para o outro, então a memória não depende do tamanho do histórico.
+    """
+    maior_janela = max(janelas)
+    ultimo_fechamento = None
+    cauda = pd.Series(dtype=float)  # últimos retornos do pedaço anterior
+
+    for lote in lotes:
+        fechamento = lote['Close'].astype(float)
+        if len(fechamento) == 0:
+            continue
+
+        anteriores = fechamento.shift(1)
+        if ultimo_fechamento is not None:
+            anteriores.iloc[0] = ultimo_fechamento
+        retornos = (fechamento / anteriores - 1) * 100
+        ultimo_fechamento = fechamento.iloc[-1]
+
+        # Janelas móveis sobre a cauda anterior + retornos do pedaço
+        estendidos = pd.concat([cauda, retornos.dropna()])
+        resultado = pd.DataFrame({'retorno': retornos})
+        for janela in janelas:
+            volatilidade = estendidos.rolling(janela, min_periods=janela).std()
+            resultado[f'volatilidade_{janela}'] = volatilidade.iloc[len(cauda):].reindex(retornos.index)
+
+        cauda = estendidos.iloc[-(maior_janela - 1):] if maior_janela > 1 else estendidos.iloc[:0]
+        yield resultado
+
+
+def resumo_em_lotes(lotes, janela_semanal=7, janela_mensal=30):
+    """Calcula as métricas do resumo de um ticker lendo o histórico em pedaços"""
+    primeiro_preco = ultimo_preco = None
+    maior_preco, menor_preco = -np.inf, np.inf
+    soma_volume, quantidade_volume, ultimo_volume = 0.0, 0, np.nan
+    soma_retornos, quantidade_retornos = 0.0, 0
+    volatilidades = {janela_semanal: np.nan, janela_mensal: np.nan}
+
+    # Retornos semanais: a última semana de cada pedaço pode continuar no próximo
+    semanas_fechadas, fechamento_semana_anterior = [], None
+    semana_pendente = None  # (rótulo da semana, último fechamento)
+
+    def lotes_com_extremos():
+        nonlocal primeiro_preco, ultimo_preco, maior_preco, menor_preco
+        nonlocal soma_volume, quantidade_volume, ultimo_volume
+        nonlocal semana_pendente, fechamento_semana_anterior
+
+        for lote in lotes:
+            if len(lote) == 0:
+                continue
+            if primeiro_preco is None:
+                primeiro_preco = float(lote['Close'].iloc[0])
+            ultimo_preco = float(lote['Close'].iloc[-1])
+            maior_preco = max(maior_preco, float(lote['High'].max()))
+            menor_preco = min(menor_preco, float(lote['Low'].min()))
+            soma_volume += float(lote['Volume'].sum())
+            quantidade_volume += len(lote)
+            ultimo_volume = float(lote['Volume'].iloc[-1])
+
+            semanas = lote['Close'].resample('W').last().dropna()
+            if semana_pendente is not None and semana_pendente[0] != semanas.index[0]:
+                semanas = pd.concat([pd.Series([semana_pendente[1]], index=[semana_pendente[0]]), semanas])
+            for fechamento in semanas.iloc[:-1]:
+                if fechamento_semana_anterior is not None:
+                    semanas_fechadas.append((fechamento / fechamento_semana_anterior - 1) * 100)
+                fechamento_semana_anterior = fechamento
+            semana_pendente = (semanas.index[-1], semanas.iloc[-1])
+
+            yield lote
+
+    ultimo_lote = None
+    for resultado in retornos_e_volatilidade_em_lotes(lotes_com_extremos(), (janela_semanal, janela_mensal)):
+        retornos = resultado['retorno'].dropna()
+        soma_retornos += float(retornos.sum())
+        quantidade_retornos += len(retornos)
+        ultimo_lote = resultado
+
+    if ultimo_lote is None:
+        return None
+
+    for janela in volatilidades:
+        volatilidades[janela] = ultimo_lote[f'volatilidade_{janela}'].iloc[-1]
+
+    if semana_pendente is not None and fechamento_semana_anterior is not None:
+        semanas_fechadas.append((semana_pendente[1] / fechamento_semana_anterior - 1) * 100)
+
+    return pd.Series({
+        'preco_atual': ultimo_preco,
+        'preco_inicial': primeiro_preco,
+        'variacao_periodo': (ultimo_preco - primeiro_preco) / primeiro_preco * 100,
+        'maior_preco': maior_preco,
+        'menor_preco': menor_preco,
+        'volume_medio': soma_volume / quantidade_volume,
+        'retorno_medio_diario': soma_retornos / quantidade_retornos if quantidade_retornos else np.nan,
+        'retorno_medio_semanal': float(np.mean(semanas_fechadas)) if semanas_fechadas else np.nan,
+        'volatilidade_semanal': volatilidades[janela_semanal],
+        'volatilidade_mensal': volatilidades[janela_mensal],
+        'ultimo_volume': ultimo_volume,
+    })[COLUNAS_METRICAS]
@@ -0,0 +1,304 @@
+"""
+Provedores de dados de cotações
+Separa a origem dos dados (Yahoo Finance, arquivos locais, gravações) do restante do sistema
+"""
+
+import glob
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+
+
+class ProvedorDados:
+    """Interface dos provedores: devolve o histórico no formato de yf.Ticker().history()"""
+
+    nome = 'base'
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        """Barras de [inicio, fim) do ticker; inicio None significa todo o histórico"""
+        raise NotImplementedError
+
+
+def _filtrar_periodo(dados, inicio=None, fim=None):
+    """Mantém apenas as barras de [inicio, fim)"""
+    if inicio is not None:
+        dados = dados[dados.index >= inicio]
+    if fim is not None:
+        dados = dados[dados.index < fim]
+    return dados
+
+
+def criar_sessao(max_conexoes=16):
+    """Sessão HTTP com pool de conexões keep-alive para o yfinance (curl_cffi; senão requests)"""
+    try:
+        from curl_cffi import requests as curl_requests
+        return curl_requests.Session(impersonate='chrome', max_clients=max_conexoes)
+    except ImportError:
+        import requests
+        sessao = requests.Session()
+        adaptador = requests.adapters.HTTPAdapter(pool_connections=max_conexoes, pool_maxsize=max_conexoes)
+        sessao.mount('https://', adaptador)
+        return sessao
+
+
+class SemCotacoes(LookupError):
+    """O provedor não tem barras para o ticker no trecho pedido (ticker inexistente, deslistado
+    ou trecho sem pregão)"""
+
+
+class ProvedorYFinance(ProvedorDados):
+    """Dados do Yahoo Finance via yfinance
+
+    Com `sessao_por_thread`, cada thread reaproveita a sua sessão HTTP (e as
+    conexões abertas com o Yahoo) em vez de abrir conexões novas a cada consulta.
+    """
+
+    nome = 'yfinance'
+
+    def __init__(self, sessao=None, sessao_por_thread=False):
+        self.sessao = sessao
+        self.sessao_por_thread = sessao_por_thread
+        self._local = threading.local()
+
+    def _sessao(self):
+        if self.sessao is not None or not self.sessao_por_thread:
+            return self.sessao
+        if getattr(self._local, 'sessao', None) is None:
+            self._local.sessao = criar_sessao()
+        return self._local.sessao
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        import yfinance as yf
+        from yfinance.exceptions import YFTickerMissingError
+
+        sessao = self._sessao()
+        ticker = yf.Ticker(codigo, session=sessao) if sessao else yf.Ticker(codigo)
+        # raise_errors: sem ele o yfinance troca erros de rede por um DataFrame vazio
+        try:
+            if inicio is None:
+                dados = _filtrar_periodo(ticker.history(period='max', interval=intervalo, raise_errors=True),
+                                         fim=fim)
+            else:
+                dados = ticker.history(start=inicio, end=fim, interval=intervalo, raise_errors=True)
+        except YFTickerMissingError as e:
+            raise SemCotacoes(str(e)) from e
+        if len(dados) == 0:
+            raise SemCotacoes(f"{codigo}: sem cotações no trecho pedido")
+        return dados
+
+
+class ProvedorArquivos(ProvedorDados):
+    """Dados de um diretório local: <diretorio>/<TICKER>.parquet ou <TICKER>.csv
+
+    Os arquivos seguem o formato do yfinance (índice 'Date' e colunas Open, High,
+    Low, Close, Volume...). Para intervalos diferentes de '1d', o nome do arquivo
+    leva o intervalo: <TICKER>_<intervalo>.csv (ex.: PETR4.SA_1m.csv).
+    Também lê a exportação particionada de exportacao.py:
+    <diretorio>/precos/intervalo=<intervalo>/ticker=<TICKER>/ano=<ano>/*.parquet
+    """
+
+    nome = 'arquivos'
+
+    def __init__(self, diretorio, fuso='America/Sao_Paulo'):
+        self.diretorio = diretorio
+        self.fuso = fuso
+
+    def _caminho(self, codigo, intervalo):
+        particionado = os.path.join(self.diretorio, 'precos', f'intervalo={intervalo}', f'ticker={codigo}')
+        if os.path.isdir(particionado):
+            return particionado
+        base = codigo if intervalo == '1d' else f"{codigo}_{intervalo}"
+        for extensao in ('.parquet', '.csv'):
+            caminho = os.path.join(self.diretorio, base + extensao)
+            if os.path.exists(caminho):
+                return caminho
+        return None
+
+    def _ler_arquivo(self, caminho):
+        if os.path.isdir(caminho):
+            # Um arquivo por ano, lidos em ordem
+            arquivos = sorted(glob.glob(os.path.join(caminho, 'ano=*', '*.parquet')))
+            if not arquivos:
+                raise SemCotacoes(f"{caminho}: partição sem arquivos")
+            dados = pd.concat([pd.read_parquet(arquivo) for arquivo in arquivos])
+        elif caminho.endswith('.parquet'):
+            dados = pd.read_parquet(caminho)
+        else:
+            dados = pd.read_csv(caminho, index_col=0)
+            dados.index = pd.to_datetime(dados.index, utc=True)
+
+        if not isinstance(dados.index, pd.DatetimeIndex):
+            dados.index = pd.to_datetime(dados.index, utc=True)
+        if dados.index.tz is None:
+            dados.index = dados.index.tz_localize(self.fuso)
+        elif self.fuso:
+            dados.index = dados.index.tz_convert(self.fuso)
+        dados.index.name = 'Date'
+        return dados.sort_index()
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        caminho = self._caminho(codigo, intervalo)
+        if caminho is None:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        return _filtrar_periodo(self._ler_arquivo(caminho), inicio, fim)
+
+
+class ProvedorSintetico(ProvedorDados):
+    """Cotações sintéticas (dados_sinteticos.py), sem rede: testes de carga e demonstrações
+
+    Cada ticker tem uma série fixa (mesma semente), recortada pelo período pedido.
+    `latencia` simula o tempo de resposta do Yahoo; `chamadas` conta as consultas.
+    """
+
+    nome = 'sintetico'
+
+    def __init__(self, anos=5, latencia=0.0, fuso='America/Sao_Paulo'):
+        self.anos = anos
+        self.latencia = latencia
+        self.fuso = fuso
+        self.chamadas = 0
+        self._series = {}
+        self._trava = threading.Lock()
+
+    def _serie(self, codigo, intervalo):
+        from dados_sinteticos import gerar_ohlcv
+
+        with self._trava:
+            if (codigo, intervalo) not in self._series:
+                fim = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+                duracao = pd.DateOffset(years=self.anos) if intervalo == '1d' else pd.Timedelta(days=30)
+                self._series[codigo, intervalo] = gerar_ohlcv(codigo, fim - duracao, fim, intervalo, self.fuso)
+            return self._series[codigo, intervalo]
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        with self._trava:
+            self.chamadas += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        return _filtrar_periodo(self._serie(codigo, intervalo), inicio, fim)
+
+
+def duracao_barra(intervalo):
+    """Duração de uma barra do yfinance ('5m', '1h', '1d', '1wk', '1mo'; meses como 31 dias)"""
+    encontrado = re.match(r'^(\d+)(m|h|d|wk|mo)$', intervalo)
+    if encontrado is None:
+        raise ValueError(f"Intervalo inválido: {intervalo}")
+    numero, unidade = int(encontrado.group(1)), encontrado.group(2)
+    if unidade in ('wk', 'mo'):
+        return pd.Timedelta(days=numero * (7 if unidade == 'wk' else 31))
+    return pd.Timedelta(numero, {'m': 'min', 'h': 'h', 'd': 'D'}[unidade])
+
+
+class RespostaNaoGravada(LookupError):
+    """O provedor de reprodução não tem gravação para o ticker/intervalo pedido"""
+
+
+class ProvedorGravacao(ProvedorDados):
+    """Grava as respostas de outro provedor em disco e as reproduz depois (sem rede)
+
+    modo='gravar': consulta o provedor original e acumula as barras em disco
+    modo='reproduzir': responde só com o que foi gravado (RespostaNaoGravada se faltar)
+    modo='auto': reproduz se houver gravação cobrindo o pedido; senão grava (se só faltarem
+                 as barras mais recentes, baixa apenas elas e as junta à gravação)
+    As barras são guardadas por (ticker, intervalo) e recortadas pelo período pedido,
+    então a reprodução funciona mesmo quando as datas dos pedidos mudam entre execuções.
+    """
+
+    nome = 'gravacao'
+
+    def __init__(self, diretorio, provedor=None, modo='auto'):
+        if modo not in ('gravar', 'reproduzir', 'auto'):
+            raise ValueError(f"Modo inválido: {modo}")
+        self.diretorio = diretorio
+        self.provedor = provedor or ProvedorYFinance()
+        self.modo = modo
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, codigo, intervalo):
+        return os.path.join(self.diretorio, f"{codigo}__{intervalo}.pkl")
+
+    def _gravado(self, codigo, intervalo):
+        caminho = self._caminho(codigo, intervalo)
+        return pd.read_pickle(caminho) if os.path.exists(caminho) else None
+
+    def _gravar(self, codigo, intervalo, dados):
+        anteriores = self._gravado(codigo, intervalo)
+        if anteriores is not None and len(anteriores):
+            dados = pd.concat([anteriores, dados])
+            dados = dados[~dados.index.duplicated(keep='last')].sort_index()
+        dados.to_pickle(self._caminho(codigo, intervalo))
+
+    @staticmethod
+    def _cobre_fim(gravado, fim, intervalo):
+        """A gravação chega ao fim pedido? (diário: até o último pregão esperado, já encerrado)"""
+        agora = pd.Timestamp.now(tz=gravado.index.tz or 'UTC')
+        limite = agora if fim is None else min(fim - pd.Timedelta(1, 'ns'), agora)
+        ultima = gravado.index[-1]
+        if intervalo == '1d':
+            esperado = pd.offsets.BDay().rollback(limite.normalize())
+            if esperado == agora.normalize():
+                return False  # o pregão de hoje pode estar em andamento: a barra muda
+            return ultima.normalize() >= esperado
+        return ultima > limite - duracao_barra(intervalo)
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        gravado = self._gravado(codigo, intervalo)
+
+        if self.modo == 'reproduzir':
+            if gravado is None:
+                raise RespostaNaoGravada(f"Sem gravação para {codigo} ({intervalo})")
+            return _filtrar_periodo(gravado, inicio, fim)
+
+        if (self.modo == 'auto' and gravado is not None and len(gravado)
+                and (inicio is None or gravado.index[0] <= inicio)):
+            if self._cobre_fim(gravado, fim, intervalo):
+                return _filtrar_periodo(gravado, inicio, fim)
+            # Só o trecho que falta (a última barra gravada de novo, pode estar incompleta)
+            ultima = gravado.index[-1]
+            desde = ultima.normalize() if intervalo.endswith(('d', 'wk', 'mo')) else ultima
+            if inicio is not None:
+                desde = max(desde, inicio)
+            try:
+                novos = self.provedor.historico(codigo, desde, fim, intervalo)
+            except SemCotacoes:
+                novos = gravado.iloc[:0]  # nenhuma barra nova (ex.: fim de semana)
+            if len(novos):
+                self._gravar(codigo, intervalo, novos)
+                gravado = self._gravado(codigo, intervalo)
+            return _filtrar_periodo(gravado, inicio, fim)
+
+        dados = self.provedor.historico(codigo, inicio, fim, intervalo)
+        if len(dados):
+            self._gravar(codigo, intervalo, dados)
+        return dados
+
+
+def criar_provedor(nome=None, diretorio=None, agendar=True):
+    """Cria o provedor pelo nome (ou pelas variáveis B3_PROVEDOR e B3_DADOS_DIR)
+
+    Nomes: 'yfinance' (padrão), 'arquivos', 'gravar', 'reproduzir', 'auto', 'sintetico'.
+    Com `agendar`, as consultas ao Yahoo passam pelo agendador (limite de taxa,
+    deduplicação e novas tentativas, ver agendador.py).
+    """
+    nome = (nome or os.environ.get('B3_PROVEDOR') or 'yfinance').lower()
+    diretorio = diretorio or os.environ.get('B3_DADOS_DIR') or 'dados_gravados'
+
+    def yahoo():
+        if not agendar:
+            return ProvedorYFinance()
+        from agendador import ProvedorAgendado
+        return ProvedorAgendado(ProvedorYFinance())
+
+    if nome == 'yfinance':
+        return yahoo()
+    if nome == 'arquivos':
+        return ProvedorArquivos(diretorio)
+    if nome in ('gravar', 'reproduzir', 'auto'):
+        # Só as consultas de fato enviadas ao Yahoo passam pelo agendador, não as reproduções
+        return ProvedorGravacao(diretorio, provedor=yahoo(), modo=nome)
+    if nome == 'sintetico':
+        return ProvedorSintetico()
+    raise ValueError(f"Provedor desconhecido: {nome}")
@@ -0,0 +1,281 @@
+"""
+Screener: ranking de um universo de tickers por retorno, volatilidade e volume
+Calcula as métricas do resumo em vários processos e gera uma tabela ordenada/CSV
+Os preços são carregados uma vez em memória compartilhada e lidos pelos processos sem cópia
+
+Exemplos:
+    python screener.py --criterio maior_volatilidade --top 10
+    python screener.py --arquivo universo.txt --ordenar retorno_ultima_semana --filtro "pico_volume>2" --csv saida.csv
+"""
+
+import argparse
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Critérios prontos: (coluna, decrescente)
+CRITERIOS = {
+    'maior_volatilidade': ('volatilidade_mensal', True),
+    'menor_volatilidade': ('volatilidade_mensal', False),
+    'melhor_semana': ('retorno_ultima_semana', True),
+    'pior_semana': ('retorno_ultima_semana', False),
+    'melhor_periodo': ('variacao_periodo', True),
+    'pico_volume': ('pico_volume', True),
+}
+
+_FILTRO = re.compile(r'^\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(-?[\d.]+)\s*$')
+
+
+def _semanais_do_cache(cache, dados_por_ticker, intervalo):
+    """Retornos semanais (%) lidos dos agregados do cache (semanas × tickers)
+
+    Só os tickers sem agregados (intervalo semanal/mensal) são reamostrados.
+    """
+    import pandas as pd
+    from agregados import retornos_periodo
+    from metricas import retornos_semanais
+
+    semanais = {}
+    for codigo, dados in dados_por_ticker.items():
+        inicio = dados.index[0]
+        agregado = cache.ler_agregado(codigo, 'W', intervalo, inicio - pd.Timedelta(days=7))
+        if agregado is None or len(agregado) == 0:
+            retornos = retornos_semanais(dados['Close'].astype(float))
+        else:
+            retornos = retornos_periodo(agregado)
+        semanais[codigo] = retornos[retornos.index >= inicio]
+    return pd.concat(semanais, axis=1)
+
+
+def _processar_lote(codigos, periodo, intervalo, atualizar):
+    """Executado em um processo: carrega um lote de tickers e calcula as métricas de uma vez"""
+    from cache_dados import CachePrecos, inicio_do_periodo
+    from metricas import calcular_metricas_dados
+
+    cache = CachePrecos()
+    dados_por_ticker, falhas = {}, {}
+    for codigo in codigos:
+        try:
+            if atualizar:
+                dados = cache.obter(codigo, periodo=periodo, intervalo=intervalo)
+            else:
+                dados = cache.ler(codigo, inicio_do_periodo(periodo), intervalo)
+            if dados is None or len(dados) == 0:
+                falhas[codigo] = "sem dados"
+            else:
+                dados_por_ticker[codigo] = dados
+        except Exception as e:
+            falhas[codigo] = str(e)
+
+    if not dados_por_ticker:
+        return None, falhas
+
+    semanais = _semanais_do_cache(cache, dados_por_ticker, intervalo)
+    metricas = calcular_metricas_dados(dados_por_ticker, semanais=semanais)
+
+    # Métricas extras do screener
+    metricas['retorno_ultima_semana'] = semanais.ffill().iloc[-1]
+    metricas['pico_volume'] = metricas['ultimo_volume'] / metricas['volume_medio']
+    return metricas, falhas
+
+
+def _processar_colunas(descritor, inicio, fim, semanais):
+    """Executado em um processo: métricas das colunas [inicio, fim) da matriz compartilhada
+
+    `semanais` traz os retornos semanais dessas colunas, lidos dos agregados do cache
+    pelo processo principal (pequenos: uma linha por semana).
+    """
+    from memoria_compartilhada import anexar
+    from metricas import calcular_metricas
+
+    precos = anexar(descritor)
+    colunas = slice(inicio, fim)
+    fechamento = precos.matriz('Close').iloc[:, colunas].astype(float)
+
+    metricas = calcular_metricas(
+        fechamento,
+        maximas=precos.matriz('High').iloc[:, colunas],
+        minimas=precos.matriz('Low').iloc[:, colunas],
+        volume=precos.matriz('Volume').iloc[:, colunas],
+        semanais=semanais,
+    )
+    metricas['retorno_ultima_semana'] = semanais.ffill().iloc[-1]
+    metricas['pico_volume'] = metricas['ultimo_volume'] / metricas['volume_medio']
+    return metricas
+
+
+def _carregar_universo(codigos, periodo, intervalo, atualizar, mostrar_progresso):
+    """Atualiza o cache (opcional) e lê todos os tickers
+
+    Devolve ({ticker: DataFrame}, retornos semanais dos agregados do cache, falhas).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from cache_dados import CachePrecos, inicio_do_periodo
+
+    cache = CachePrecos()
+    erros_download = {}
+    if atualizar:
+        from download_lote import baixar_lote
+        erros_download = baixar_lote(codigos, periodo, intervalo, cache=cache,
+                                     mostrar_progresso=mostrar_progresso).falhas
+
+    inicio = inicio_do_periodo(periodo)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        lidos = dict(zip(codigos, executor.map(lambda c: cache.ler(c, inicio, intervalo), codigos)))
+
+    # Falha no download com dados antigos em cache: usa o cache
+    dados_por_ticker, falhas = {}, {}
+    for codigo, dados in lidos.items():
+        if dados is not None and len(dados):
+            dados_por_ticker[codigo] = dados
+        else:
+            falhas[codigo] = erros_download.get(codigo, "sem dados")
+    if not dados_por_ticker:
+        return dados_por_ticker, None, falhas
+    return dados_por_ticker, _semanais_do_cache(cache, dados_por_ticker, intervalo), falhas
+
+
+def executar_screener(codigos, periodo='6mo', intervalo='1d', max_workers=None,
+                      atualizar=True, mostrar_progresso=True, memoria_compartilhada=True):
+    """Calcula as métricas de todo o universo em paralelo; devolve (tabela, falhas)
+
+    Com `memoria_compartilhada`, o processo principal carrega o universo uma vez em
+    um bloco compartilhado e cada processo calcula um grupo de colunas sem copiá-lo.
+    Sem ela, cada processo lê do cache o seu lote de tickers.
+    """
+    import pandas as pd
+
+    codigos = list(dict.fromkeys(codigos))
+    max_workers = max_workers or os.cpu_count() or 1
+    # Lotes pequenos o bastante para equilibrar a carga entre os processos
+    tamanho_lote = max(1, math.ceil(len(codigos) / (max_workers * 4)))
+
+    partes, falhas = [], {}
+    if memoria_compartilhada:
+        from memoria_compartilhada import PrecosCompartilhados
+
+        dados_por_ticker, semanais, falhas = _carregar_universo(codigos, periodo, intervalo, atualizar,
+                                                                mostrar_progresso)
+        if not dados_por_ticker:
+            return pd.DataFrame(), falhas
+        compartilhado = PrecosCompartilhados.de_dataframes(dados_por_ticker)
+        del dados_por_ticker  # a partir daqui só a cópia compartilhada fica em memória
+        tickers = compartilhado.precos.tickers
+        tarefas = [(_processar_colunas, compartilhado.descritor, i, min(i + tamanho_lote, len(tickers)),
+                    semanais[tickers[i:i + tamanho_lote]])
+                   for i in range(0, len(tickers), tamanho_lote)]
+    else:
+        compartilhado = None
+        tarefas = [(_processar_lote, codigos[i:i + tamanho_lote], periodo, intervalo, atualizar)
+                   for i in range(0, len(codigos), tamanho_lote)]
+
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futuros = [executor.submit(*tarefa) for tarefa in tarefas]
+            for concluidos, futuro in enumerate(as_completed(futuros), start=1):
+                resultado = futuro.result()
+                metricas, falhas_lote = resultado if compartilhado is None else (resultado, {})
+                if metricas is not None:
+                    partes.append(metricas)
+                falhas.update(falhas_lote)
+                if mostrar_progresso:
+                    print(f"\r⏳ Lotes processados: {concluidos}/{len(tarefas)}", end="", flush=True)
+    finally:
+        if compartilhado is not None:
+            compartilhado.fechar()
+    if mostrar_progresso:
+        print()
+
+    tabela = pd.concat(partes) if partes else pd.DataFrame()
+    tabela.index.name = 'ticker'
+    return tabela, falhas
+
+
+def aplicar_filtros(tabela, filtros):
+    """Aplica filtros no formato 'coluna>valor' (operadores: > < >= <= == !=)"""
+    for filtro in filtros:
+        encontrado = _FILTRO.match(filtro)
+        if not encontrado:
+            raise ValueError(f"Filtro inválido: {filtro}")
+        coluna, operador, valor = encontrado.groups()
+        if coluna not in tabela.columns:
+            raise ValueError(f"Coluna desconhecida no filtro: {coluna}")
+        tabela = tabela.query(f"`{coluna}` {operador} {float(valor)}")
+    return tabela
+
+
+def ranquear(tabela, coluna, decrescente=True, top=None):
+    """Ordena a tabela pela coluna (NaN por último) e mantém os `top` primeiros"""
+    tabela = tabela.sort_values(coluna, ascending=not decrescente, na_position='last')
+    return tabela.head(top) if top else tabela
+
+
+def main():
+    """Linha de comando do screener"""
+    parser = argparse.ArgumentParser(description="Ranking de tickers por retorno, volatilidade e volume")
+    parser.add_argument('tickers', nargs='*', help="Tickers (padrão: as 20 empresas pré-selecionadas)")
+    parser.add_argument('--arquivo', help="Arquivo texto com um ticker por linha")
+    parser.add_argument('--universo', action='store_true',
+                        help="Todos os tickers do arquivo de universo (B3_UNIVERSO ou universo_b3.csv)")
+    parser.add_argument('--tipo', help="Só tickers do universo deste tipo (acao, bdr, etf, fii)")
+    parser.add_argument('--setor', help="Só tickers do universo deste setor")
+    parser.add_argument('--criterio', choices=sorted(CRITERIOS), default='maior_volatilidade')
+    parser.add_argument('--ordenar', help="Coluna de ordenação (substitui --criterio)")
+    parser.add_argument('--crescente', action='store_true', help="Ordem crescente (com --ordenar)")
+    parser.add_argument('--filtro', action='append', default=[],
+                        help="Filtro 'coluna>valor' (pode repetir)")
+    parser.add_argument('--top', type=int, help="Quantidade de linhas exibidas")
+    parser.add_argument('--periodo', default='6mo')
+    parser.add_argument('--workers', type=int, default=None, help="Número de processos")
+    parser.add_argument('--sem-atualizar', action='store_true',
+                        help="Usa apenas o cache local, sem baixar barras novas")
+    parser.add_argument('--csv', help="Grava a tabela ordenada neste arquivo CSV")
+    parser.add_argument('--sem-memoria-compartilhada', action='store_true',
+                        help="Cada processo lê seus tickers do cache (em vez da matriz compartilhada)")
+    args = parser.parse_args()
+
+    codigos = list(args.tickers)
+    if args.arquivo:
+        with open(args.arquivo, encoding='utf-8') as f:
+            codigos += [linha.strip() for linha in f if linha.strip() and not linha.startswith('#')]
+    if args.universo or args.tipo or args.setor:
+        from universo import carregar_universo
+        codigos += [e.codigo for e in carregar_universo()
+                    if (not args.tipo or e.tipo == args.tipo) and (not args.setor or e.setor == args.setor)]
+    if not codigos:
+        from financial_analysis import AnalisadorB3
+        codigos = AnalisadorB3().codigos_padrao()
+
+    inicio = time.perf_counter()
+    tabela, falhas = executar_screener(codigos, args.periodo, max_workers=args.workers,
+                                       atualizar=not args.sem_atualizar,
+                                       memoria_compartilhada=not args.sem_memoria_compartilhada)
+    if tabela.empty:
+        print("❌ Nenhum ticker com dados")
+        return 1
+
+    coluna, decrescente = CRITERIOS[args.criterio]
+    if args.ordenar:
+        coluna, decrescente = args.ordenar, not args.crescente
+    if coluna not in tabela.columns:
+        parser.error(f"Coluna desconhecida: {coluna}")
+
+    tabela = ranquear(aplicar_filtros(tabela, args.filtro), coluna, decrescente, args.top)
+
+    print("="*60)
+    print(f"🔎 SCREENER - ordenado por {coluna} ({'decrescente' if decrescente else 'crescente'})")
+    print("="*60)
+    print(tabela.round(2).to_string())
+    print("="*60)
+    print(f"{len(tabela)} tickers exibidos, {len(falhas)} falhas, {time.perf_counter() - inicio:.1f}s")
+
+    if args.csv:
+        tabela.to_csv(args.csv)
+        print(f"📁 Tabela gravada em {args.csv}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
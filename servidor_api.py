@@ -0,0 +1,400 @@
+"""
+API HTTP/JSON local com as métricas, séries e gráficos do AnalisadorB3
+Servidor assíncrono (asyncio, só biblioteca padrão) para dashboards consumirem a análise
+
+Endpoints (parâmetros opcionais: ?periodo=6mo&intervalo=1d):
+    GET /saude
+    GET /acoes                            filtros: ?busca=ita&tipo=acao&setor=Bancos
+    GET /acoes/<TICKER>/resumo
+    GET /acoes/<TICKER>/series/<tipo>     tipo: precos, retornos, volatilidade (?janela=7),
+                                          retorno_acumulado, semanal, mensal
+    GET /acoes/<TICKER>/indicadores       ?lista=sma20,ema50,rsi14,macd,bollinger20,atr14,obv
+    GET /acoes/<TICKER>/graficos/<nome>.png   nome: volatilidade_semana, volatilidade_mes,
+                                              retorno_semanal, retorno_mensal
+
+Exemplo:
+    python servidor_api.py --porta 8050
+    curl http://localhost:8050/acoes/PETR4.SA/resumo
+"""
+
+import os
+
+# Gráficos renderizados em memória, sem janela
+os.environ['MPLBACKEND'] = 'Agg'
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from GerarRelatorio import GRAFICOS
+from agendador import erro_temporario
+
+STATUS_HTTP = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+    500: 'Internal Server Error', 503: 'Service Unavailable',
+}
+
+SERIES = ('precos', 'retornos', 'volatilidade', 'retorno_acumulado', 'semanal', 'mensal')
+
+# Conexões keep-alive ociosas por mais que isso são fechadas
+TEMPO_OCIOSO = 30
+
+
+class ErroHTTP(Exception):
+    """Erro com status HTTP (vira uma resposta JSON {"erro": ...})"""
+
+    def __init__(self, status, mensagem):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _json_valor(valor):
+    """Converte NaN/numpy em valores aceitos pelo JSON"""
+    if valor is None:
+        return None
+    valor = float(valor)
+    return None if math.isnan(valor) or math.isinf(valor) else valor
+
+
+def _serie_json(codigo, serie):
+    return {
+        'codigo': codigo,
+        'datas': [data.isoformat() for data in serie.index],
+        'valores': [_json_valor(v) for v in serie.to_numpy()],
+    }
+
+
+class ServicoAnalise:
+    """Estado compartilhado entre as requisições: dados em memória, respostas prontas e threads
+
+    - Um único CachePrecos (SQLite) e um provedor com sessões HTTP reaproveitadas
+    - Dados de cada (ticker, período, intervalo) ficam em memória por `validade` segundos
+      (no máximo `limite_tickers`, em ordem LRU);
+      pedidos simultâneos do mesmo ticker esperam a mesma carga (sem downloads duplicados)
+    - Respostas (JSON/PNG) ficam em um LRU, invalidado quando chega uma barra nova ou
+      o fechamento da última barra muda
+    - Cálculos rodam em um pool de threads; gráficos em uma thread só (pyplot não é thread-safe)
+    """
+
+    def __init__(self, cache=None, provedor=None, validade=60, max_threads=16, limite_respostas=512,
+                 limite_tickers=256):
+        from universo import carregar_universo
+
+        if cache is None:
+            from cache_dados import CachePrecos
+            from provedores import ProvedorYFinance, criar_provedor
+            provedor = criar_provedor(provedor)
+            if type(getattr(provedor, 'provedor', provedor)) is ProvedorYFinance:
+                # Uma sessão (pool keep-alive) por thread do executor
+                if hasattr(provedor, 'provedor'):
+                    provedor.provedor = ProvedorYFinance(sessao_por_thread=True)
+                else:
+                    provedor = ProvedorYFinance(sessao_por_thread=True)
+            cache = CachePrecos(provedor=provedor)
+        self.cache = cache
+        self.validade = validade
+        self.limite_respostas = limite_respostas
+        self.limite_tickers = limite_tickers
+
+        self.universo = carregar_universo()
+
+        self._dados = OrderedDict()  # (codigo, periodo, intervalo) -> (carregado_em, DataFrame), LRU
+        self._em_andamento = {}     # (codigo, periodo, intervalo) -> asyncio.Future
+        self._respostas = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix='api')
+        self._executor_graficos = ThreadPoolExecutor(max_workers=1, thread_name_prefix='api-grafico')
+        self.requisicoes = 0
+        self.cargas = 0
+
+    def encerrar(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._executor_graficos.shutdown(wait=False, cancel_futures=True)
+
+    async def dados(self, codigo, periodo, intervalo):
+        """DataFrame do ticker, da memória ou carregado uma única vez para os pedidos simultâneos"""
+        chave = (codigo, periodo, intervalo)
+        guardado = self._dados.get(chave)
+        if guardado is not None and time.monotonic() - guardado[0] < self.validade:
+            self._dados.move_to_end(chave)
+            return guardado[1]
+
+        if chave in self._em_andamento:
+            return await asyncio.shield(self._em_andamento[chave])
+
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._em_andamento[chave] = futuro
+        try:
+            self.cargas += 1
+            try:
+                dados = await loop.run_in_executor(
+                    self._executor, lambda: self.cache.obter(codigo, periodo=periodo, intervalo=intervalo))
+            except Exception as e:
+                if erro_temporario(e):
+                    raise ErroHTTP(503, f"Provedor indisponível para {codigo}: {e}") from e
+                raise
+            if dados is None or len(dados) == 0:
+                raise ErroHTTP(404, f"Sem dados para {codigo}")
+            self._dados[chave] = (time.monotonic(), dados)
+            self._dados.move_to_end(chave)
+            if len(self._dados) > self.limite_tickers:
+                self._dados.popitem(last=False)
+            futuro.set_result(dados)
+            return dados
+        except BaseException as e:
+            futuro.set_exception(e)
+            futuro.exception()  # evita o aviso de exceção não lida quando ninguém mais espera
+            raise
+        finally:
+            del self._em_andamento[chave]
+
+    def _analisador(self, codigo, dados, periodo, intervalo):
+        from financial_analysis import AnalisadorB3
+
+        analisador = AnalisadorB3(periodo=periodo, intervalo=intervalo, cache=self.cache)
+        analisador.usar_dados(codigo, self.universo.nome(codigo), dados)
+        return analisador
+
+    def _resumo(self, codigo, dados, periodo, intervalo):
+        from metricas import calcular_metricas_dados
+
+        analisador = self._analisador(codigo, dados, periodo, intervalo)
+        semanais = analisador.calcular_retornos()[1].to_frame(codigo)
+        metricas = calcular_metricas_dados({codigo: dados}, semanais=semanais).iloc[0]
+        return {
+            'codigo': codigo,
+            'nome': self.universo.nome(codigo),
+            'periodo': periodo,
+            'intervalo': intervalo,
+            'ultima_data': dados.index[-1].isoformat(),
+            # Barras antigas do cache: a atualização falhou (limite de requisições, rede)
+            'desatualizado': bool(dados.attrs.get('desatualizado', False)),
+            'metricas': {nome: _json_valor(valor) for nome, valor in metricas.items()},
+        }
+
+    def _serie(self, codigo, dados, periodo, intervalo, tipo, janela):
+        analisador = self._analisador(codigo, dados, periodo, intervalo)
+        if tipo == 'precos':
+            return _serie_json(codigo, dados['Close'])
+        if tipo == 'retornos':
+            return _serie_json(codigo, analisador.calcular_retornos()[0])
+        if tipo == 'volatilidade':
+            return _serie_json(codigo, analisador.calcular_volatilidade(janela).dropna())
+        if tipo == 'retorno_acumulado':
+            return _serie_json(codigo, analisador.calcular_retorno_acumulado())
+        regra = 'W' if tipo == 'semanal' else 'ME'
+        return _serie_json(codigo, analisador.calcular_agregado(regra)['Retorno'].dropna())
+
+    def _indicadores(self, codigo, dados, periodo, intervalo, especificacoes):
+        tabela = self._analisador(codigo, dados, periodo, intervalo).calcular_indicadores(especificacoes)
+        return {
+            'codigo': codigo,
+            'datas': [data.isoformat() for data in tabela.index],
+            'series': {nome: [_json_valor(v) for v in tabela[nome].to_numpy()] for nome in tabela.columns},
+        }
+
+    def _grafico(self, codigo, dados, periodo, intervalo, metodo):
+        import matplotlib.pyplot as plt
+
+        fig = getattr(self._analisador(codigo, dados, periodo, intervalo), metodo)()
+        try:
+            saida = io.BytesIO()
+            fig.savefig(saida, format='png', dpi=100)
+            return saida.getvalue()
+        finally:
+            plt.close(fig)
+
+    async def responder(self, caminho, parametros):
+        """(status, content-type, corpo) de um GET"""
+        partes = [unquote(p) for p in caminho.strip('/').split('/') if p]
+
+        if partes == ['saude']:
+            return 200, 'application/json', self._corpo_json({
+                'status': 'ok', 'requisicoes': self.requisicoes, 'cargas': self.cargas,
+                'tickers_em_memoria': len(self._dados), 'respostas_em_memoria': len(self._respostas),
+            })
+        if partes == ['acoes']:
+            if parametros.get('busca'):
+                empresas = self.universo.buscar(parametros['busca'])
+            else:
+                empresas = list(self.universo)
+            if parametros.get('tipo'):
+                empresas = [e for e in empresas if e.tipo == parametros['tipo']]
+            if parametros.get('setor'):
+                empresas = [e for e in empresas if e.setor == parametros['setor']]
+            return 200, 'application/json', self._corpo_json([e._asdict() for e in empresas])
+
+        if len(partes) < 3 or partes[0] != 'acoes':
+            raise ErroHTTP(404, f"Recurso não encontrado: {caminho}")
+
+        from financial_analysis import INTERVALOS_VALIDOS, PERIODOS_VALIDOS
+
+        codigo = partes[1].upper()
+        periodo = parametros.get('periodo', '6mo')
+        intervalo = parametros.get('intervalo', '1d')
+        if periodo not in PERIODOS_VALIDOS:
+            raise ErroHTTP(400, f"Período inválido: {periodo}")
+        if intervalo not in INTERVALOS_VALIDOS:
+            raise ErroHTTP(400, f"Intervalo inválido: {intervalo}")
+
+        recurso = tuple(partes[2:])
+        if recurso == ('resumo',):
+            tipo, executor, tarefa = 'application/json', self._executor, self._resumo
+            argumentos = ()
+        elif len(recurso) == 2 and recurso[0] == 'series' and recurso[1] in SERIES:
+            try:
+                janela = int(parametros.get('janela', 7))
+            except ValueError:
+                raise ErroHTTP(400, "janela deve ser um inteiro")
+            if janela < 2:
+                raise ErroHTTP(400, "janela deve ser maior que 1")
+            tipo, executor, tarefa = 'application/json', self._executor, self._serie
+            argumentos = (recurso[1], janela)
+        elif recurso == ('indicadores',):
+            from indicadores import interpretar
+            especificacoes = tuple(e.strip().lower() for e in
+                                   parametros.get('lista', 'sma20,rsi14,macd').split(',') if e.strip())
+            try:
+                for especificacao in especificacoes:
+                    interpretar(especificacao)
+            except ValueError as e:
+                raise ErroHTTP(400, str(e))
+            tipo, executor, tarefa = 'application/json', self._executor, self._indicadores
+            argumentos = (especificacoes,)
+        elif len(recurso) == 2 and recurso[0] == 'graficos' and recurso[1].endswith('.png'):
+            metodos = dict(GRAFICOS)
+            nome = recurso[1][:-len('.png')]
+            if nome not in metodos:
+                raise ErroHTTP(404, f"Gráfico desconhecido: {nome}")
+            tipo, executor, tarefa = 'image/png', self._executor_graficos, self._grafico
+            argumentos = (metodos[nome],)
+        else:
+            raise ErroHTTP(404, f"Recurso não encontrado: {caminho}")
+
+        dados = await self.dados(codigo, periodo, intervalo)
+
+        # Resposta pronta enquanto não chega barra nova e a última barra não muda
+        # (durante o pregão a barra do dia mantém a data, mas o fechamento varia)
+        chave = (codigo, periodo, intervalo, recurso, argumentos, dados.index[-1], len(dados),
+                 float(dados['Close'].iloc[-1]), bool(dados.attrs.get('desatualizado')))
+        if chave in self._respostas:
+            self._respostas.move_to_end(chave)
+            return 200, tipo, self._respostas[chave]
+
+        resultado = await asyncio.get_running_loop().run_in_executor(
+            executor, lambda: tarefa(codigo, dados, periodo, intervalo, *argumentos))
+        corpo = resultado if tipo == 'image/png' else self._corpo_json(resultado)
+
+        self._respostas[chave] = corpo
+        if len(self._respostas) > self.limite_respostas:
+            self._respostas.popitem(last=False)
+        return 200, tipo, corpo
+
+    @staticmethod
+    def _corpo_json(objeto):
+        return json.dumps(objeto, ensure_ascii=False).encode('utf-8')
+
+    async def atender(self, leitor, escritor):
+        """Conexão HTTP/1.1 com keep-alive: lê pedidos e responde até o cliente fechar"""
+        try:
+            while True:
+                try:
+                    linha = await asyncio.wait_for(leitor.readline(), TEMPO_OCIOSO)
+                except asyncio.TimeoutError:
+                    break
+                if not linha:
+                    break
+
+                cabecalhos = {}
+                while True:
+                    cabecalho = await leitor.readline()
+                    if cabecalho in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                tamanho = int(cabecalhos.get('content-length') or 0)
+                if tamanho:
+                    await leitor.readexactly(tamanho)
+
+                self.requisicoes += 1
+                try:
+                    metodo, alvo, versao = linha.decode('latin-1').split()
+                except ValueError:
+                    versao = 'HTTP/1.0'
+                    status, tipo, corpo = 400, 'application/json', self._corpo_json({'erro': 'Pedido inválido'})
+                else:
+                    status, tipo, corpo = await self._tratar(metodo, alvo)
+
+                conexao = cabecalhos.get('connection', '').lower()
+                manter = conexao == 'keep-alive' or (versao == 'HTTP/1.1' and conexao != 'close')
+                escritor.write(
+                    f"HTTP/1.1 {status} {STATUS_HTTP[status]}\r\n"
+                    f"Content-Type: {tipo}\r\n"
+                    f"Content-Length: {len(corpo)}\r\n"
+                    f"Connection: {'keep-alive' if manter else 'close'}\r\n\r\n".encode('latin-1') + corpo
+                )
+                await escritor.drain()
+                if not manter:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _tratar(self, metodo, alvo):
+        if metodo != 'GET':
+            return 405, 'application/json', self._corpo_json({'erro': 'Use GET'})
+        url = urlsplit(alvo)
+        parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+        try:
+            return await self.responder(url.path, parametros)
+        except ErroHTTP as e:
+            return e.status, 'application/json', self._corpo_json({'erro': str(e)})
+        except Exception as e:
+            return 500, 'application/json', self._corpo_json({'erro': f"{type(e).__name__}: {e}"})
+
+
+async def iniciar_servidor(servico, host='127.0.0.1', porta=8050):
+    """Abre o socket e devolve o asyncio.Server (fila de conexões grande para picos de clientes)"""
+    return await asyncio.start_server(servico.atender, host, porta, backlog=1024)
+
+
+async def _executar(host, porta, provedor, validade, threads):
+    servico = ServicoAnalise(provedor=provedor, validade=validade, max_threads=threads)
+    servidor = await iniciar_servidor(servico, host, porta)
+    endereco = servidor.sockets[0].getsockname()
+    print(f"🌐 API em http://{endereco[0]}:{endereco[1]} (Ctrl+C para encerrar)")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servico.encerrar()
+
+
+def main():
+    """Linha de comando do servidor"""
+    parser = argparse.ArgumentParser(description="API HTTP/JSON com métricas, séries e gráficos")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8050)
+    parser.add_argument('--provedor', default=None,
+                        help="Fonte dos dados: yfinance, arquivos, reproduzir, sintetico... (padrão: B3_PROVEDOR)")
+    parser.add_argument('--threads', type=int, default=16, help="Threads para carregar e calcular")
+    parser.add_argument('--validade', type=float, default=60,
+                        help="Segundos que os dados de um ticker ficam em memória antes de consultar o cache")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(_executar(args.host, args.porta, args.provedor, args.validade, args.threads))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
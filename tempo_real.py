@@ -0,0 +1,210 @@
+"""
+Modo ao vivo: cotações intraday com atualização incremental das métricas
+Cada cotação nova atualiza retorno do dia, volatilidade móvel e retorno acumulado em O(1)
+"""
+
+import math
+import queue
+import threading
+from collections import deque
+
+
+class JanelaMovel:
+    """Média e desvio padrão de uma janela deslizante em O(1) por valor (Welford)"""
+
+    def __init__(self, tamanho):
+        self.tamanho = tamanho
+        self.valores = deque()
+        self.media = 0.0
+        self.m2 = 0.0  # soma dos quadrados dos desvios
+
+    def adicionar(self, valor):
+        """Insere um valor; se a janela estiver cheia, o mais antigo sai"""
+        if len(self.valores) < self.tamanho:
+            self.valores.append(valor)
+            delta = valor - self.media
+            self.media += delta / len(self.valores)
+            self.m2 += delta * (valor - self.media)
+            return
+
+        antigo = self.valores.popleft()
+        self.valores.append(valor)
+        media_anterior = self.media
+        self.media += (valor - antigo) / self.tamanho
+        self.m2 += (valor - antigo) * (valor - self.media + antigo - media_anterior)
+
+    def substituir_ultimo(self, valor):
+        """Troca o valor mais recente (ex.: retorno do dia mudando a cada cotação)"""
+        antigo = self.valores[-1]
+        self.valores[-1] = valor
+        media_anterior = self.media
+        self.media += (valor - antigo) / len(self.valores)
+        self.m2 += (valor - antigo) * (valor - self.media + antigo - media_anterior)
+
+    def desvio_padrao(self):
+        """Desvio padrão amostral (NaN enquanto a janela não estiver cheia)"""
+        if len(self.valores) < self.tamanho:
+            return math.nan
+        return math.sqrt(max(self.m2, 0.0) / (self.tamanho - 1))
+
+
+class EstadoTempoReal:
+    """Métricas do dia atualizadas a cada cotação, sem recalcular o histórico
+
+    É iniciado com o histórico diário já carregado: o retorno do dia é o último
+    valor das janelas de volatilidade e é substituído a cada cotação; quando
+    chega um novo dia, ele passa a ser um valor novo da janela.
+    """
+
+    def __init__(self, fechamentos, ultima_data, janelas=(7, 30)):
+        fechamentos = [float(f) for f in fechamentos]
+        self.primeiro_fechamento = fechamentos[0]
+        self.janelas = {janela: JanelaMovel(janela) for janela in janelas}
+
+        # Retornos históricos até o penúltimo dia; o último dia é o "dia atual"
+        retornos = [(atual / anterior - 1) * 100 for anterior, atual in zip(fechamentos, fechamentos[1:])]
+        for retorno in retornos[-max(janelas):]:
+            for janela in self.janelas.values():
+                janela.adicionar(retorno)
+
+        self.fechamento_anterior = fechamentos[-2] if len(fechamentos) > 1 else fechamentos[-1]
+        self.fuso = getattr(ultima_data, 'tzinfo', None)
+        self.dia_atual = ultima_data.date()
+        self.preco = fechamentos[-1]
+        self.cotacoes = deque(maxlen=5000)  # (data/hora, preço) para o gráfico ao vivo
+
+    def atualizar(self, momento, preco):
+        """Processa uma cotação (O(1)); devolve as métricas atualizadas"""
+        preco = float(preco)
+        if self.fuso is not None and getattr(momento, 'tzinfo', None) is not None:
+            momento = momento.astimezone(self.fuso)
+        dia = momento.date()
+
+        if dia != self.dia_atual:
+            # Virada de dia: o preço do dia anterior passa a ser a base do retorno
+            self.fechamento_anterior = self.preco
+            retorno = (preco / self.fechamento_anterior - 1) * 100
+            for janela in self.janelas.values():
+                janela.adicionar(retorno)
+        else:
+            retorno = (preco / self.fechamento_anterior - 1) * 100
+            for janela in self.janelas.values():
+                if janela.valores:
+                    janela.substituir_ultimo(retorno)
+                else:
+                    janela.adicionar(retorno)
+
+        self.dia_atual = dia
+        self.preco = preco
+        self.cotacoes.append((momento, preco))
+        return self.metricas()
+
+    def metricas(self):
+        """Retorno do dia, volatilidades e retorno acumulado atuais"""
+        resultado = {
+            'preco': self.preco,
+            'retorno_dia': (self.preco / self.fechamento_anterior - 1) * 100,
+            'retorno_acumulado': (self.preco / self.primeiro_fechamento - 1) * 100,
+        }
+        for tamanho, janela in self.janelas.items():
+            resultado[f'volatilidade_{tamanho}'] = janela.desvio_padrao()
+        return resultado
+
+
+class FontePolling:
+    """Busca barras de 1 minuto no provedor de dados a cada `intervalo_s` segundos"""
+
+    def __init__(self, provedor, codigo, intervalo_s=60):
+        self.provedor = provedor
+        self.codigo = codigo
+        self.intervalo_s = intervalo_s
+        self.ultima = None
+
+    def iniciar(self, fila, parar):
+        """Coloca (data/hora, preço) na fila até o evento `parar`"""
+        import pandas as pd
+
+        while not parar.is_set():
+            try:
+                inicio = pd.Timestamp.now(tz='UTC').normalize()
+                barras = self.provedor.historico(self.codigo, inicio=inicio, intervalo='1m')
+                if self.ultima is not None:
+                    barras = barras[barras.index > self.ultima]
+                for momento, preco in barras['Close'].items():
+                    fila.put((momento, preco))
+                if len(barras):
+                    self.ultima = barras.index[-1]
+            except Exception as e:
+                fila.put(e)
+            parar.wait(self.intervalo_s)
+
+
+class FonteWebSocket:
+    """Cotações em tempo real pelo websocket do yfinance (yf.WebSocket)"""
+
+    def __init__(self, codigo):
+        self.codigo = codigo
+
+    def iniciar(self, fila, parar):
+        import pandas as pd
+        import yfinance as yf
+
+        def receber(mensagem):
+            if parar.is_set():
+                raise KeyboardInterrupt
+            if mensagem.get('id') == self.codigo and 'price' in mensagem:
+                momento = pd.Timestamp(int(mensagem['time']), unit='ms', tz='UTC')
+                fila.put((momento, float(mensagem['price'])))
+
+        try:
+            with yf.WebSocket(verbose=False) as ws:
+                ws.subscribe([self.codigo])
+                ws.listen(receber)
+        except KeyboardInterrupt:
+            pass
+        except Exception as e:
+            fila.put(e)
+
+
+def criar_fonte(codigo, provedor, usar_websocket=True, intervalo_s=60):
+    """Usa o websocket do yfinance quando disponível; senão, consulta periódica"""
+    if usar_websocket:
+        try:
+            import yfinance as yf
+            if hasattr(yf, 'WebSocket'):
+                return FonteWebSocket(codigo)
+        except ImportError:
+            pass
+    return FontePolling(provedor, codigo, intervalo_s)
+
+
+def acompanhar(estado, fonte, ao_atualizar, parar=None, intervalo_tela=0.5):
+    """Lê as cotações da fonte em uma thread e chama ao_atualizar(metricas) na thread atual
+
+    Termina quando `ao_atualizar` devolve False, quando `parar` é acionado ou com Ctrl+C.
+    """
+    fila = queue.Queue()
+    parar = parar or threading.Event()
+    leitor = threading.Thread(target=fonte.iniciar, args=(fila, parar), daemon=True)
+    leitor.start()
+
+    try:
+        while not parar.is_set():
+            metricas = None
+            try:
+                item = fila.get(timeout=intervalo_tela)
+                while True:
+                    if isinstance(item, Exception):
+                        print(f"\n⚠️  Erro ao buscar cotação: {item}")
+                    else:
+                        metricas = estado.atualizar(*item)
+                    item = fila.get_nowait()
+            except queue.Empty:
+                pass
+
+            if ao_atualizar(metricas) is False:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        parar.set()
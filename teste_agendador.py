@@ -0,0 +1,268 @@
+"""
+Teste do agendador de consultas (agendador.py) contra um servidor simulado do Yahoo
+O servidor local responde com dados sintéticos, com latência e com HTTP 429 quando
+o cliente passa do limite de requisições por segundo (ou ao acaso, com --falhas).
+
+Cenários, com clientes simultâneos pedindo poucos tickers (muitos pedidos repetidos):
+    - direto: cada pedido vai ao servidor (os 429 viram erros)
+    - agendado: ProvedorAgendado com deduplicação, balde de fichas e novas tentativas
+    - desatualizado: servidor recusando tudo; CachePrecos.obter devolve as barras
+      antigas do cache marcadas como desatualizadas
+
+Exemplos:
+    python teste_agendador.py
+    python teste_agendador.py --clientes 100 --tickers 20 --limite 5 --falhas 0.2
+"""
+
+import argparse
+import json
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import parse_qs, urlencode, urlsplit
+from urllib.request import urlopen
+
+import pandas as pd
+
+from agendador import BaldeDeFichas, ErroLimiteRequisicoes, ProvedorAgendado
+from provedores import ProvedorDados, ProvedorSintetico
+
+
+class ServidorSimulado:
+    """Servidor HTTP local no papel do Yahoo: latência, limite de taxa e 429 ao acaso
+
+    GET /historico?codigo=X&inicio=ISO&fim=ISO&intervalo=1d -> JSON com as barras
+    `estatisticas` conta requisições recebidas, respondidas e recusadas (429).
+    """
+
+    def __init__(self, limite=5.0, latencia=0.1, falhas=0.0, espera_429=1.0, semente=0):
+        self.limite = BaldeDeFichas(limite, limite)
+        self.latencia = latencia
+        self.falhas = falhas
+        self.espera_429 = espera_429
+        self.dados = ProvedorSintetico(anos=2)
+        self.estatisticas = dict.fromkeys(('requisicoes', 'respondidas', 'recusadas'), 0)
+        self._sorteio = random.Random(semente)
+        self._trava = threading.Lock()
+        self._servidor = None
+
+    def _contar(self, nome):
+        with self._trava:
+            self.estatisticas[nome] += 1
+
+    def zerar(self):
+        with self._trava:
+            self.estatisticas = dict.fromkeys(self.estatisticas, 0)
+
+    def _recusar(self):
+        """Sem ficha no limite do servidor (sem esperar) ou falha sorteada"""
+        with self._trava:
+            sorteada = self._sorteio.random() < self.falhas
+        return sorteada or not self.limite.retirar(prazo=time.monotonic())
+
+    def _responder(self, parametros):
+        codigo = parametros['codigo']
+        inicio = pd.Timestamp(parametros['inicio']) if parametros.get('inicio') else None
+        fim = pd.Timestamp(parametros['fim']) if parametros.get('fim') else None
+        dados = self.dados.historico(codigo, inicio, fim, parametros.get('intervalo', '1d'))
+        return {
+            'fuso': str(dados.index.tz),
+            'datas': dados.index.as_unit('ns').asi8.tolist(),
+            'colunas': {coluna: dados[coluna].astype(float).tolist() for coluna in dados.columns},
+        }
+
+    def iniciar(self, host='127.0.0.1', porta=0):
+        """Sobe o servidor em uma thread; devolve a URL base"""
+        simulado = self
+
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                simulado._contar('requisicoes')
+                if simulado.latencia:
+                    time.sleep(simulado.latencia * random.uniform(0.5, 1.5))
+                if simulado._recusar():
+                    simulado._contar('recusadas')
+                    self.send_response(429)
+                    self.send_header('Retry-After', str(simulado.espera_429))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                url = urlsplit(self.path)
+                parametros = {nome: valores[-1] for nome, valores in parse_qs(url.query).items()}
+                corpo = json.dumps(simulado._responder(parametros)).encode('utf-8')
+                simulado._contar('respondidas')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, formato, *args):
+                pass
+
+        class Servidor(ThreadingHTTPServer):
+            request_queue_size = 256  # clientes simultâneos (o padrão, 5, atrasa as conexões)
+            daemon_threads = True
+
+        self._servidor = Servidor((host, porta), Tratador)
+        threading.Thread(target=self._servidor.serve_forever, daemon=True).start()
+        host, porta = self._servidor.server_address[:2]
+        return f"http://{host}:{porta}"
+
+    def encerrar(self):
+        if self._servidor is not None:
+            self._servidor.shutdown()
+            self._servidor.server_close()
+
+
+class ProvedorHTTP(ProvedorDados):
+    """Cliente do servidor simulado (HTTP 429 -> ErroLimiteRequisicoes com o Retry-After)"""
+
+    nome = 'http'
+
+    def __init__(self, url, tempo_limite=10):
+        self.url = url.rstrip('/')
+        self.tempo_limite = tempo_limite
+
+    def historico(self, codigo, inicio=None, fim=None, intervalo='1d'):
+        parametros = {'codigo': codigo, 'intervalo': intervalo,
+                      'inicio': inicio.isoformat() if inicio is not None else '',
+                      'fim': fim.isoformat() if fim is not None else ''}
+        try:
+            with urlopen(f"{self.url}/historico?{urlencode(parametros)}", timeout=self.tempo_limite) as resposta:
+                corpo = json.load(resposta)
+        except HTTPError as e:
+            if e.code == 429:
+                espera = e.headers.get('Retry-After')
+                raise ErroLimiteRequisicoes(f"{codigo}: HTTP 429", espera=float(espera) if espera else None)
+            if e.code >= 500:
+                raise ConnectionError(f"{codigo}: HTTP {e.code}")
+            raise LookupError(f"{codigo}: HTTP {e.code}")
+
+        indice = pd.DatetimeIndex(pd.to_datetime(corpo['datas'], unit='ns', utc=True)).tz_convert(corpo['fuso'])
+        dados = pd.DataFrame(corpo['colunas'], index=indice)
+        dados.index.name = 'Date'
+        return dados
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def executar_cenario(provedor, tickers, clientes=50, rodadas=2, semente=0):
+    """`rodadas` de `clientes` threads pedindo ao mesmo tempo; devolve as estatísticas"""
+    sorteio = random.Random(semente)
+    fim = pd.Timestamp.now(tz='UTC').normalize() + pd.Timedelta(days=2)
+    inicio = fim - pd.DateOffset(months=6)
+    latencias, erros = [], []
+    trava = threading.Lock()
+
+    def cliente(codigo, largada):
+        largada.wait()
+        comeco = time.perf_counter()
+        try:
+            provedor.historico(codigo, inicio, fim)
+        except Exception as e:
+            with trava:
+                erros.append(f"{codigo}: {type(e).__name__}")
+            return
+        with trava:
+            latencias.append(time.perf_counter() - comeco)
+
+    comeco = time.perf_counter()
+    for _ in range(rodadas):
+        largada = threading.Barrier(clientes)
+        threads = [threading.Thread(target=cliente, args=(sorteio.choice(tickers), largada))
+                   for _ in range(clientes)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    return {
+        'pedidos': clientes * rodadas,
+        'sucessos': len(latencias),
+        'erros': erros,
+        'duracao': time.perf_counter() - comeco,
+        'p50': _percentil(latencias, 50) if latencias else float('nan'),
+        'p95': _percentil(latencias, 95) if latencias else float('nan'),
+    }
+
+
+def verificar_desatualizado(url, servidor, codigo='SINT00'):
+    """Com o servidor recusando tudo, obter() deve devolver o cache marcado como desatualizado"""
+    from cache_dados import CachePrecos
+
+    provedor = ProvedorAgendado(ProvedorHTTP(url), taxa=10, capacidade=10, orcamento=3)
+    cache = CachePrecos(tempfile.mkdtemp(prefix='b3_agendador_'), provedor=provedor)
+
+    falhas = servidor.falhas
+    try:
+        servidor.falhas = 0.0
+        cache.obter(codigo, periodo='6mo')
+        servidor.falhas = 1.0
+        return cache.obter(codigo, periodo='6mo', forcar=True)
+    finally:
+        servidor.falhas = falhas
+
+
+def _imprimir(titulo, resultado, servidor, provedor=None):
+    print(f"\n{titulo}")
+    print(f"   ✅ {resultado['sucessos']}/{resultado['pedidos']} pedidos atendidos em {resultado['duracao']:.2f}s "
+          f"(p50 {resultado['p50'] * 1000:.0f} ms, p95 {resultado['p95'] * 1000:.0f} ms)")
+    print(f"   🌐 Servidor: {servidor.estatisticas['requisicoes']} requisições, "
+          f"{servidor.estatisticas['recusadas']} recusadas (429)")
+    if provedor is not None:
+        e = provedor.estatisticas
+        print(f"   🔁 Agendador: {e['deduplicadas']} deduplicadas, {e['enviadas']} enviadas, "
+              f"{e['repetidas']} repetidas, {e['limitadas']} limitadas, {e['falhas']} falhas")
+    if resultado['erros']:
+        print(f"   ❌ {len(resultado['erros'])} erros, por exemplo: {resultado['erros'][:3]}")
+
+
+def main():
+    """Linha de comando do teste do agendador"""
+    parser = argparse.ArgumentParser(description="Teste do agendador contra um servidor simulado com 429")
+    parser.add_argument('--clientes', type=int, default=50, help="Pedidos simultâneos por rodada")
+    parser.add_argument('--rodadas', type=int, default=2)
+    parser.add_argument('--tickers', type=int, default=10, help="Tickers distintos pedidos")
+    parser.add_argument('--limite', type=float, default=5.0, help="Requisições por segundo aceitas pelo servidor")
+    parser.add_argument('--latencia', type=float, default=0.1, help="Latência do servidor, em segundos")
+    parser.add_argument('--falhas', type=float, default=0.1, help="Fração de 429 sorteados")
+    parser.add_argument('--taxa', type=float, default=4.0, help="Requisições por segundo do agendador")
+    parser.add_argument('--orcamento', type=float, default=20.0, help="Orçamento de tempo por consulta (s)")
+    args = parser.parse_args()
+
+    servidor = ServidorSimulado(args.limite, args.latencia, args.falhas)
+    url = servidor.iniciar()
+    tickers = [f"SINT{i:02d}" for i in range(args.tickers)]
+    print(f"🚀 Servidor simulado em {url}: limite {args.limite:g} req/s, "
+          f"latência {args.latencia * 1000:.0f} ms, {args.falhas:.0%} de 429 ao acaso")
+    print(f"   {args.rodadas} rodadas × {args.clientes} pedidos simultâneos de {len(tickers)} tickers")
+
+    try:
+        direto = executar_cenario(ProvedorHTTP(url), tickers, args.clientes, args.rodadas)
+        _imprimir("📡 Sem agendador", direto, servidor)
+
+        servidor.zerar()
+        agendado = ProvedorAgendado(ProvedorHTTP(url), taxa=args.taxa, capacidade=args.taxa,
+                                    orcamento=args.orcamento)
+        resultado = executar_cenario(agendado, tickers, args.clientes, args.rodadas)
+        _imprimir("🗓️  Com agendador", resultado, servidor, agendado)
+
+        dados = verificar_desatualizado(url, servidor)
+        marcado = dados is not None and len(dados) and dados.attrs.get('desatualizado')
+        print(f"\n{'✅' if marcado else '❌'} Servidor recusando tudo: "
+              f"{len(dados) if dados is not None else 0} barras do cache, desatualizado={bool(marcado)}")
+    finally:
+        servidor.encerrar()
+
+    return 0 if not resultado['erros'] and marcado else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""
+Teste de carga da API (servidor_api.py)
+Centenas de clientes simultâneos com conexões keep-alive pedindo resumos, séries e gráficos
+
+Por padrão sobe o servidor no próprio processo, com cache temporário e dados sintéticos
+(ProvedorSintetico com latência simulada), e mostra quantas consultas chegaram ao provedor:
+pedidos simultâneos do mesmo ticker devem gerar uma consulta só.
+
+Exemplos:
+    python teste_carga_api.py --clientes 200 --requisicoes 20
+    python teste_carga_api.py --url http://localhost:8050 --tickers PETR4.SA VALE3.SA
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from urllib.parse import urlsplit
+
+ENDPOINTS = [
+    '/acoes/{codigo}/resumo',
+    '/acoes/{codigo}/series/retornos',
+    '/acoes/{codigo}/series/volatilidade?janela=30',
+    '/acoes/{codigo}/series/retorno_acumulado',
+    '/acoes/{codigo}/series/semanal',
+    '/acoes/{codigo}/series/mensal',
+    '/acoes/{codigo}/indicadores?lista=rsi14,macd,bollinger20',
+]
+GRAFICO = '/acoes/{codigo}/graficos/volatilidade_semana.png'
+
+
+async def _pedir(leitor, escritor, host, caminho):
+    """Um GET na conexão aberta; devolve (status, tamanho do corpo)"""
+    escritor.write(f"GET {caminho} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode('latin-1'))
+    await escritor.drain()
+    status = int((await leitor.readline()).split()[1])
+    tamanho = 0
+    while True:
+        linha = await leitor.readline()
+        if linha in (b'\r\n', b''):
+            break
+        nome, _, valor = linha.decode('latin-1').partition(':')
+        if nome.strip().lower() == 'content-length':
+            tamanho = int(valor)
+    await leitor.readexactly(tamanho)
+    return status, tamanho
+
+
+async def _cliente(host, porta, caminhos, latencias, erros):
+    """Abre uma conexão e faz todos os pedidos por ela, anotando a latência de cada um"""
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        for caminho in caminhos:
+            inicio = time.perf_counter()
+            try:
+                status, _ = await _pedir(leitor, escritor, host, caminho)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError) as e:
+                erros.append(f"{caminho}: {type(e).__name__}")
+                break
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                erros.append(f"{caminho}: HTTP {status}")
+    finally:
+        escritor.close()
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+async def executar_carga(host, porta, tickers, clientes=200, requisicoes=20, graficos=False,
+                         periodo='1y', semente=0):
+    """Dispara `clientes` conexões com `requisicoes` pedidos cada; devolve as estatísticas"""
+    sorteio = random.Random(semente)
+    endpoints = ENDPOINTS + ([GRAFICO] if graficos else [])
+    planos = [
+        [endpoint.format(codigo=sorteio.choice(tickers))
+         + ('&' if '?' in endpoint else '?') + f"periodo={periodo}"
+         for endpoint in (sorteio.choice(endpoints) for _ in range(requisicoes))]
+        for _ in range(clientes)
+    ]
+    latencias, erros = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(host, porta, plano, latencias, erros) for plano in planos))
+    duracao = time.perf_counter() - inicio
+    return {
+        'requisicoes': len(latencias),
+        'erros': erros,
+        'duracao': duracao,
+        'vazao': len(latencias) / duracao if duracao else 0.0,
+        'p50': _percentil(latencias, 50) if latencias else float('nan'),
+        'p95': _percentil(latencias, 95) if latencias else float('nan'),
+        'p99': _percentil(latencias, 99) if latencias else float('nan'),
+    }
+
+
+async def _executar(args):
+    servico = servidor = provedor = None
+    if args.url:
+        url = urlsplit(args.url)
+        host, porta = url.hostname, url.port or 80
+        tickers = args.tickers or ['PETR4.SA', 'VALE3.SA', 'ITUB4.SA', 'BBDC4.SA']
+    else:
+        from cache_dados import CachePrecos
+        from provedores import ProvedorSintetico
+        from servidor_api import ServicoAnalise, iniciar_servidor
+
+        provedor = ProvedorSintetico(anos=2, latencia=args.latencia)
+        diretorio = tempfile.mkdtemp(prefix='b3_carga_')
+        servico = ServicoAnalise(cache=CachePrecos(diretorio, provedor=provedor))
+        servidor = await iniciar_servidor(servico, '127.0.0.1', 0)
+        host, porta = servidor.sockets[0].getsockname()[:2]
+        tickers = args.tickers or [f"SINT{i:02d}" for i in range(20)]
+
+    print(f"🚀 {args.clientes} clientes × {args.requisicoes} pedidos em http://{host}:{porta} "
+          f"({len(tickers)} tickers{', com gráficos' if args.graficos else ''})")
+    try:
+        resultado = await executar_carga(host, porta, tickers, args.clientes, args.requisicoes,
+                                         args.graficos, args.periodo)
+    finally:
+        if servidor is not None:
+            servidor.close()
+            await servidor.wait_closed()
+            servico.encerrar()
+
+    print(f"✅ {resultado['requisicoes']} respostas em {resultado['duracao']:.2f}s "
+          f"({resultado['vazao']:.0f} req/s)")
+    print(f"⏱️  Latência p50 {resultado['p50'] * 1000:.1f} ms | "
+          f"p95 {resultado['p95'] * 1000:.1f} ms | p99 {resultado['p99'] * 1000:.1f} ms")
+    if provedor is not None:
+        print(f"🌐 Consultas ao provedor: {provedor.chamadas} "
+              f"(cargas da API: {servico.cargas}, tickers: {len(tickers)})")
+    if resultado['erros']:
+        print(f"❌ {len(resultado['erros'])} erros, por exemplo: {resultado['erros'][:5]}")
+        return 1
+    return 0
+
+
+def main():
+    """Linha de comando do teste de carga"""
+    parser = argparse.ArgumentParser(description="Teste de carga da API de análise")
+    parser.add_argument('--url', help="Servidor já em execução (padrão: sobe um local com dados sintéticos)")
+    parser.add_argument('--clientes', type=int, default=200, help="Conexões simultâneas")
+    parser.add_argument('--requisicoes', type=int, default=20, help="Pedidos por conexão")
+    parser.add_argument('--tickers', nargs='+', help="Tickers consultados")
+    parser.add_argument('--periodo', default='1y')
+    parser.add_argument('--latencia', type=float, default=0.05,
+                        help="Latência simulada do provedor sintético, em segundos")
+    parser.add_argument('--graficos', action='store_true', help="Inclui pedidos de gráficos PNG")
+    args = parser.parse_args()
+    return asyncio.run(_executar(args))
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,208 @@
+"""
+Universo de tickers (ações, BDRs, ETFs e FIIs) lido de um arquivo CSV com metadados
+Colunas: codigo, nome, tipo (acao/bdr/etf/fii), setor, destaque (posição nas listas principais)
+
+O arquivo padrão é universo_b3.csv; outro arquivo pode ser indicado em B3_UNIVERSO.
+Os índices (por ticker, prefixo do nome e setor) são montados uma vez na carga,
+com o módulo csv (sem pandas), para que milhares de tickers não atrasem os menus.
+"""
+
+import csv
+import os
+import unicodedata
+from bisect import bisect_left
+from collections import namedtuple
+
+ARQUIVO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'universo_b3.csv')
+
+TIPOS = {
+    'acao': 'Ações',
+    'bdr': 'BDRs (empresas estrangeiras)',
+    'etf': 'ETFs',
+    'fii': 'Fundos imobiliários',
+}
+
+Empresa = namedtuple('Empresa', 'codigo nome tipo setor destaque')
+
+
+def normalizar(texto):
+    """Minúsculas e sem acentos, para buscas ('Itaú' encontra 'itau')"""
+    decomposto = unicodedata.normalize('NFKD', texto.strip().lower())
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def _chave_codigo(codigo):
+    """Ticker sem o sufixo da bolsa ('PETR4.SA' -> 'petr4')"""
+    return normalizar(codigo.split('.')[0])
+
+
+class IndicePrefixos:
+    """Lista ordenada de (chave, posição) consultada por busca binária"""
+
+    def __init__(self, pares):
+        pares = sorted(pares)
+        self.chaves = [chave for chave, _ in pares]
+        self.posicoes = [posicao for _, posicao in pares]
+
+    def buscar(self, prefixo):
+        """Posições cujas chaves começam com `prefixo`"""
+        i = bisect_left(self.chaves, prefixo)
+        while i < len(self.chaves) and self.chaves[i].startswith(prefixo):
+            yield self.posicoes[i]
+            i += 1
+
+
+class Universo:
+    """Empresas do universo com índices por ticker, tipo, setor e prefixo de ticker/nome
+
+    Ordem das listas: empresas em destaque primeiro (pela posição), depois por nome.
+    """
+
+    def __init__(self, empresas):
+        self.empresas = sorted(empresas, key=lambda e: (e.destaque is None, e.destaque or 0, normalizar(e.nome)))
+        self._por_codigo = {e.codigo: e for e in self.empresas}
+        self._por_tipo = {}
+        self._por_setor = {}
+        for empresa in self.empresas:
+            self._por_tipo.setdefault(empresa.tipo, []).append(empresa)
+            self._por_setor.setdefault(empresa.setor, []).append(empresa)
+
+        self._indice_codigos = IndicePrefixos(
+            (_chave_codigo(e.codigo), i) for i, e in enumerate(self.empresas))
+        # Nome completo e cada palavra do nome ('unibanco' encontra 'Itaú Unibanco')
+        self._indice_nomes = IndicePrefixos(
+            (palavra, i) for i, e in enumerate(self.empresas)
+            for palavra in {normalizar(e.nome), *normalizar(e.nome).split()})
+        self._setores_normalizados = {normalizar(setor): setor for setor in self._por_setor}
+
+    @classmethod
+    def de_arquivo(cls, caminho=None):
+        """Lê o CSV do universo (padrão: B3_UNIVERSO ou universo_b3.csv)"""
+        caminho = caminho or os.environ.get('B3_UNIVERSO') or ARQUIVO_PADRAO
+        empresas = []
+        with open(caminho, encoding='utf-8', newline='') as arquivo:
+            for linha in csv.DictReader(arquivo):
+                codigo = (linha.get('codigo') or '').strip().upper()
+                if not codigo or codigo.startswith('#'):
+                    continue
+                destaque = (linha.get('destaque') or '').strip()
+                empresas.append(Empresa(
+                    codigo=codigo,
+                    nome=(linha.get('nome') or codigo).strip(),
+                    tipo=(linha.get('tipo') or 'acao').strip().lower(),
+                    setor=(linha.get('setor') or 'Outros').strip(),
+                    destaque=int(destaque) if destaque else None,
+                ))
+        return cls(empresas)
+
+    def __len__(self):
+        return len(self.empresas)
+
+    def __iter__(self):
+        return iter(self.empresas)
+
+    def __contains__(self, codigo):
+        return self.obter(codigo) is not None
+
+    def obter(self, codigo):
+        """Empresa do ticker (aceita sem o sufixo: 'PETR4' ou 'PETR4.SA'), ou None"""
+        codigo = codigo.strip().upper()
+        return self._por_codigo.get(codigo) or self._por_codigo.get(codigo + '.SA')
+
+    def nome(self, codigo):
+        """Nome da empresa do ticker (o próprio ticker se não estiver no universo)"""
+        empresa = self.obter(codigo)
+        return empresa.nome if empresa is not None else codigo
+
+    def codigos(self):
+        return [e.codigo for e in self.empresas]
+
+    def por_tipo(self, tipo):
+        return list(self._por_tipo.get(tipo, []))
+
+    def por_setor(self, setor):
+        return list(self._por_setor.get(setor, []))
+
+    def tipos(self):
+        """[(tipo, quantidade)] na ordem de TIPOS"""
+        ordem = list(TIPOS)
+        return sorted(((tipo, len(lista)) for tipo, lista in self._por_tipo.items()),
+                      key=lambda par: ordem.index(par[0]) if par[0] in ordem else len(ordem))
+
+    def setores(self, tipo=None):
+        """[(setor, quantidade)] em ordem alfabética, opcionalmente só de um tipo"""
+        contagem = {}
+        for empresa in self._por_tipo.get(tipo, []) if tipo else self.empresas:
+            contagem[empresa.setor] = contagem.get(empresa.setor, 0) + 1
+        return sorted(contagem.items(), key=lambda par: normalizar(par[0]))
+
+    def destaques(self, tipo=None):
+        """Empresas com posição de destaque (as listas principais dos menus)"""
+        empresas = self._por_tipo.get(tipo, []) if tipo else self.empresas
+        return [e for e in empresas if e.destaque is not None]
+
+    def buscar(self, texto, limite=None):
+        """Empresas cujo ticker, nome (ou palavra do nome) ou setor começam com `texto`
+
+        Ordem: ticker exato, prefixo do ticker, prefixo do nome, setor.
+        """
+        chave = normalizar(texto)
+        if not chave:
+            return []
+
+        posicoes = list(self._indice_codigos.buscar(_chave_codigo(texto)))
+        posicoes += list(self._indice_nomes.buscar(chave))
+        vistos = set()
+        resultado = []
+        exata = self.obter(texto)
+        if exata is not None:
+            resultado.append(exata)
+            vistos.add(exata.codigo)
+        for posicao in dict.fromkeys(posicoes):
+            empresa = self.empresas[posicao]
+            if empresa.codigo not in vistos:
+                vistos.add(empresa.codigo)
+                resultado.append(empresa)
+        for setor_normalizado, setor in self._setores_normalizados.items():
+            if setor_normalizado.startswith(chave):
+                for empresa in self._por_setor[setor]:
+                    if empresa.codigo not in vistos:
+                        vistos.add(empresa.codigo)
+                        resultado.append(empresa)
+        return resultado[:limite] if limite else resultado
+
+
+_universos = {}
+
+
+def carregar_universo(caminho=None):
+    """Universo do arquivo, lido uma única vez por processo"""
+    caminho = caminho or os.environ.get('B3_UNIVERSO') or ARQUIVO_PADRAO
+    if caminho not in _universos:
+        _universos[caminho] = Universo.de_arquivo(caminho)
+    return _universos[caminho]
+
+
+if __name__ == "__main__":
+    # Tempo de carga e de busca para um universo de 2.000 tickers
+    import tempfile
+    import time
+
+    with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as f:
+        f.write('codigo,nome,tipo,setor,destaque\n')
+        for i in range(2000):
+            f.write(f"SINT{i:04d}.SA,Empresa Sintética {i},{list(TIPOS)[i % 4]},Setor {i % 40},\n")
+
+    inicio = time.perf_counter()
+    universo = Universo.de_arquivo(f.name)
+    carga = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for i in range(1000):
+        universo.buscar(f"sint{i % 100:02d}")
+        universo.buscar('empresa sin')
+    busca = (time.perf_counter() - inicio) / 2000
+    os.remove(f.name)
+
+    print(f"Tickers: {len(universo)}")
+    print(f"Carga do arquivo e índices: {carga * 1000:.1f} ms")
+    print(f"Busca por prefixo: {busca * 1e6:.0f} µs")